@@ -0,0 +1,105 @@
+"""
+Recall-vs-latency benchmark of the FaissVectorStore index backends.
+
+Builds Flat, HNSW, IVF and IVF-PQ indexes (via index_factory.build_index) over
+synthetic clustered 384-d vectors (MiniLM's dimension) and reports, per corpus
+size and backend: build time, index size, mean/p99 query latency and
+recall@k against exact Flat search. Vectors are prepared the way the store
+prepares them (prepare_vectors: unit length for the default cosine metric),
+and the ground truth uses the same metric.
+
+    python benchmarks/ann_backends.py                       # 10k, 100k
+    python benchmarks/ann_backends.py --sizes 10000 100000 1000000
+    python benchmarks/ann_backends.py --ef-search 32 64 128 --nprobe 8 16 32
+    python benchmarks/ann_backends.py --metric l2            # raw-distance layout of older indexes
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from index_factory import METRICS, IndexConfig, apply_search_params, build_index, prepare_vectors  # noqa: E402
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int = 0):
+    """Gaussian clusters, roughly like topic-grouped sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    n_clusters = max(16, n // 500)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, n + n_queries)
+    data = centers[labels] + 0.35 * rng.standard_normal((n + n_queries, dim)).astype("float32")
+    return data[:n], data[n:]
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def time_queries(index, queries: np.ndarray, k: int):
+    latencies = []
+    results = np.empty((len(queries), k), dtype="int64")
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results[i] = ids[0]
+    return results, np.array(latencies)
+
+
+def run(sizes, backends, dim, n_queries, k, ef_values, nprobe_values, metric):
+    print(f"{'n':>9} {'backend':<8} {'param':<12} {'build_s':>8} {'size_MB':>8} "
+          f"{'mean_ms':>8} {'p99_ms':>8} {'recall@' + str(k):>9}")
+    for n in sizes:
+        data, queries = synthetic_corpus(n, dim, n_queries)
+        data = prepare_vectors(data, IndexConfig(metric=metric))
+        queries = prepare_vectors(queries, IndexConfig(metric=metric))
+        ids = np.arange(n, dtype="int64")
+        exact = faiss.IndexFlat(dim, IndexConfig(metric=metric).faiss_metric)
+        exact.add(data)
+        _, truth = exact.search(queries, k)
+
+        for backend in backends:
+            config = IndexConfig(backend=backend, metric=metric)
+            start = time.perf_counter()
+            index = build_index(dim, config, data)
+            index.add_with_ids(data, ids)
+            build_s = time.perf_counter() - start
+            size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+            if backend == "hnsw":
+                sweeps = [("efSearch", v) for v in ef_values]
+            elif backend in ("ivf", "ivfpq"):
+                sweeps = [("nprobe", v) for v in nprobe_values]
+            else:
+                sweeps = [("-", None)]
+
+            for name, value in sweeps:
+                if name == "efSearch":
+                    config.ef_search = value
+                elif name == "nprobe":
+                    config.nprobe = value
+                apply_search_params(index, config)
+                found, lat = time_queries(index, queries, k)
+                param = "-" if value is None else f"{name}={value}"
+                print(f"{n:>9} {config.resolved['backend']:<8} {param:<12} {build_s:>8.2f} {size_mb:>8.1f} "
+                      f"{lat.mean():>8.3f} {np.percentile(lat, 99):>8.3f} {recall_at_k(found, truth):>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", default=["flat", "hnsw", "ivf", "ivfpq"])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--metric", choices=METRICS, default="cosine")
+    args = parser.parse_args()
+    run(args.sizes, args.backends, args.dim, args.queries, args.k, args.ef_search, args.nprobe, args.metric)
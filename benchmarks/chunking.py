@@ -0,0 +1,123 @@
+"""
+TokenChunker vs the character-length recursive splitter it replaced.
+
+Both splitters chunk the same raw texts (data/MyData.md by default, plus any
+--files), then for each one:
+  chunks       chunk count and mean/max size in model tokens
+  truncated    chunks longer than the model's window, and the share of all tokens
+               the model never sees because of it
+  chunk_s      splitting time        embed_s   time to embed every chunk
+  recall@k     dense retrieval: queries are corpus sentences with ~30% of their
+               words dropped; a hit is a top-k chunk containing the whole sentence
+  fits         share of those sentences that lie inside any one chunk (the ceiling)
+
+    python benchmarks/chunking.py
+    python benchmarks/chunking.py --files docs/*.pdf --queries 300 --k 3
+    python benchmarks/chunking.py --scale 200          # repeat MyData.md for a multi-MB text
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chunker import SPECIAL_TOKENS, TokenChunker  # noqa: E402
+from load_data import iter_documents  # noqa: E402
+from model_registry import acquire_model  # noqa: E402
+
+_SENTENCE = re.compile(r"[^.!?\n]{40,}[.!?]?")
+
+
+def load_texts(files, scale: int):
+    texts = []
+    for path in files:
+        if path.endswith((".md", ".txt")):
+            with open(path, "r", encoding="utf-8") as f:
+                texts.append((path, f.read()))
+        else:
+            texts.extend((path, doc.page_content) for doc in iter_documents(path))
+    return [(name, "\n\n".join([text] * scale)) for name, text in texts]
+
+
+def make_queries(texts, n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    spans = [(t, m.start(), m.end()) for t, (_, text) in enumerate(texts) for m in _SENTENCE.finditer(text)
+             if len(m.group().split()) >= 8]
+    queries = []
+    for i in rng.choice(len(spans), size=min(n, len(spans)), replace=False):
+        t, start, end = spans[i]
+        words = texts[t][1][start:end].split()
+        keep = rng.random(len(words)) > 0.3
+        queries.append((" ".join(w for w, k in zip(words, keep) if k), t, start, end))
+    return queries
+
+
+def recursive_chunks(text: str, chunk_size: int, chunk_overlap: int):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len,
+                                              separators=["\n\n", "\n", " ", ""], add_start_index=True)
+    return [(d.metadata["start_index"], d.metadata["start_index"] + len(d.page_content))
+            for d in splitter.create_documents([text])]
+
+
+def token_chunks(chunker: TokenChunker, text: str):
+    return [(c.start, c.end) for c in chunker.chunk_text(text)]
+
+
+def evaluate(name, split, texts, queries, model, chunker, k: int):
+    start = time.perf_counter()
+    spans = [(t, s, e) for t, (_, text) in enumerate(texts) for s, e in split(text)]
+    chunk_s = time.perf_counter() - start
+    chunk_texts = [texts[t][1][s:e] for t, s, e in spans]
+
+    window = model.max_seq_length - SPECIAL_TOKENS
+    tokens = np.array([len(o) for o in chunker.tokenizer.offsets(chunk_texts)])
+    lost = np.maximum(tokens - window, 0)
+
+    start = time.perf_counter()
+    vectors = model.encode(chunk_texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+    embed_s = time.perf_counter() - start
+
+    query_vectors = model.encode([q for q, *_ in queries], normalize_embeddings=True, show_progress_bar=False)
+    top = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :k]
+    # By text, not offsets: with --scale the same sentence is in several places
+    answers = [texts[t][1][s:e] for _, t, s, e in queries]
+    hits = [any(answer in chunk_texts[c] for c in row) for row, answer in zip(top, answers)]
+    # Upper bound: how many answers fit inside some chunk at all
+    containable = [any(answer in chunk for chunk in chunk_texts) for answer in answers]
+
+    print(f"{name:<22} {len(spans):>7} {tokens.mean():>7.0f} {tokens.max():>7} {(lost > 0).sum():>9} "
+          f"{lost.sum() / tokens.sum():>8.1%} {chunk_s:>8.3f} {embed_s:>8.2f} {np.mean(hits):>9.3f} {np.mean(containable):>9.3f}")
+
+
+def run(args):
+    texts = load_texts([os.path.join(ROOT, "data", "MyData.md")] + args.files, args.scale)
+    queries = make_queries(texts, args.queries)
+    model = acquire_model(args.model)
+    chunker = TokenChunker(args.model)
+    size = sum(len(t) for _, t in texts)
+    print(f"[INFO] {len(texts)} texts, {size / 1e6:.2f}M chars, {len(queries)} queries, "
+          f"{args.model} window {model.max_seq_length} tokens")
+
+    print(f"\n{'splitter':<22} {'chunks':>7} {'mean_tk':>7} {'max_tk':>7} {'truncated':>9} {'tk_lost':>8} "
+          f"{'chunk_s':>8} {'embed_s':>8} {'recall@' + str(args.k):>9} {'fits':>9}")
+    for chunk_size in (800, 1200):
+        evaluate(f"recursive {chunk_size}/200 ch", lambda text, cs=chunk_size: recursive_chunks(text, cs, 200),
+                 texts, queries, model, chunker, args.k)
+    evaluate(f"token {chunker.chunk_size}/{chunker.chunk_overlap} tk", lambda text: token_chunks(chunker, text),
+             texts, queries, model, chunker, args.k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="*", default=[], help="Extra documents (PDF, DOCX, TXT, MD, CSV)")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat each text this many times")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    run(parser.parse_args())
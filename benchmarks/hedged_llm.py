@@ -0,0 +1,73 @@
+"""
+Time-to-first-token of HedgedLLM against the local Groq stub.
+
+Scenarios (primary / fallback): healthy, slow primary, failing primary. Each runs
+without hedging (hedge_after=inf, i.e. classic sequential fallback) and with
+hedging, sending --requests concurrent streams over the shared connection pool.
+
+    python benchmarks/hedged_llm.py
+    python benchmarks/hedged_llm.py --requests 50 --hedge-after 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import HedgedLLM  # noqa: E402
+from stub_groq import StubGroqServer, StubModel  # noqa: E402
+
+PRIMARY, FALLBACK = "llama-3.3-70b-versatile", "llama-3.1-8b-instant"
+SCENARIOS = {
+    "healthy": {PRIMARY: StubModel(ttft=0.2), FALLBACK: StubModel(ttft=0.1)},
+    "slow-primary": {PRIMARY: StubModel(ttft=3.0), FALLBACK: StubModel(ttft=0.2)},
+    "failing-primary": {PRIMARY: StubModel(ttft=1.0, fail="error"), FALLBACK: StubModel(ttft=0.2)},
+}
+
+
+async def one_request(llm: HedgedLLM):
+    start = time.perf_counter()
+    ttft = None
+    async for _ in llm.astream("ping"):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+    return ttft, time.perf_counter() - start
+
+
+async def run_scenario(models, hedge_after: float, n_requests: int, rounds: int):
+    server = await StubGroqServer(models).start()
+    llm = HedgedLLM([PRIMARY, FALLBACK], "stub", base_url=server.base_url, hedge_after=hedge_after)
+    ttfts, totals = [], []
+    try:
+        for _ in range(rounds):
+            results = await asyncio.gather(*[one_request(llm) for _ in range(n_requests)])
+            ttfts.extend(r[0] for r in results)
+            totals.extend(r[1] for r in results)
+    finally:
+        await llm.client.aclose()
+        await server.stop()
+    return np.array(ttfts), np.array(totals), server, llm.stats.snapshot()
+
+
+async def main(n_requests: int, rounds: int, hedge_after: float):
+    print(f"{'scenario':<16} {'hedge':<6} {'ttft_ms':>8} {'p95_ms':>8} {'total_ms':>9} {'conns':>6}  requests per model")
+    for name, models in SCENARIOS.items():
+        for label, deadline in (("off", float("inf")), ("on", hedge_after)):
+            ttft, total, server, _ = await run_scenario(models, deadline, n_requests, rounds)
+            per_model = ", ".join(f"{m.split('-')[1]}={c}" for m, c in sorted(server.requests.items()))
+            print(f"{name:<16} {label:<6} {ttft.mean() * 1000:>8.0f} {np.percentile(ttft, 95) * 1000:>8.0f} "
+                  f"{total.mean() * 1000:>9.0f} {server.connections:>6}  {per_model}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10, help="Concurrent streams per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--hedge-after", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds, args.hedge_after))
@@ -0,0 +1,106 @@
+"""
+Dense-only vs hybrid (dense + BM25, reciprocal rank fusion) retrieval.
+
+Indexes the given documents with FaissVectorStore, then asks one known-item
+question per distinctive term (names, tools, acronyms that occur in only a few
+chunks), e.g. "What about SFCS?". A question is answered at k if a chunk
+containing the term is in the top k. Reports recall@k and the prompt tokens the
+top-k context costs, plus the smallest k at which hybrid matches dense recall at
+the app's default top_k.
+
+    python benchmarks/hybrid_retrieval.py                      # data/MyData.md
+    python benchmarks/hybrid_retrieval.py --docs data/ other.pdf --default-k 6
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from bm25 import tokenize  # noqa: E402
+from bulk_ingest import discover_files  # noqa: E402
+from chunker import get_tokenizer  # noqa: E402
+from load_data import load_documents  # noqa: E402
+from vector_database import FaissVectorStore  # noqa: E402
+
+TEMPLATES = ["What about {}?", "Tell me about your work with {}", "{} experience"]
+
+
+def token_counter(store: FaissVectorStore):
+    """The embedding model's own tokenizer (tokenizer.json, see chunker.get_tokenizer)."""
+    tokenizer = get_tokenizer(store.embedding_model)[0]
+    return lambda text: len(tokenizer.offsets([text])[0])
+
+
+def known_item_queries(store: FaissVectorStore, max_df: int, limit: int):
+    """(question, relevant chunk IDs) for terms that appear in at most `max_df` chunks."""
+    postings = {}
+    for cid in store.metadata:
+        for term in set(tokenize(store.metadata[cid]["text"])):
+            postings.setdefault(term, set()).add(cid)
+    terms = sorted(t for t, ids in postings.items() if len(ids) <= max_df and len(t) > 2 and not t.isdigit())
+    rng = np.random.default_rng(0)
+    rng.shuffle(terms)
+    return [(TEMPLATES[i % len(TEMPLATES)].format(t), postings[t]) for i, t in enumerate(terms[:limit])]
+
+
+def run(paths, max_k: int, default_k: int, max_df: int, limit: int):
+    docs = []
+    for path in discover_files(paths):
+        docs.extend(load_documents(path))
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FaissVectorStore(tmp)
+        store.build_from_documents(docs)
+        count_tokens = token_counter(store)
+        queries = known_item_queries(store, max_df, limit)
+        print(f"\n{len(store.metadata)} chunks, {len(queries)} known-item questions\n")
+
+        results = {}
+        for label, hybrid in (("dense", False), ("hybrid", True)):
+            hits = np.zeros((len(queries), max_k), dtype=bool)
+            tokens = np.zeros((len(queries), max_k))
+            latencies = []
+            for qi, (question, relevant) in enumerate(queries):
+                emb = store.embed_query(question)
+                start = time.perf_counter()
+                found = store.query(question, top_k=max_k, query_embedding=emb, hybrid=hybrid)
+                latencies.append((time.perf_counter() - start) * 1000)
+                running, seen = 0, False
+                for k in range(max_k):
+                    if k < len(found):
+                        running += count_tokens(found[k]["metadata"]["text"])
+                        seen = seen or found[k]["id"] in relevant
+                    hits[qi, k], tokens[qi, k] = seen, running
+            results[label] = (hits.mean(axis=0), tokens.mean(axis=0), np.mean(latencies))
+
+        print(f"{'k':>3} {'dense_recall':>12} {'hybrid_recall':>13} {'dense_tokens':>12} {'hybrid_tokens':>13}")
+        for k in range(max_k):
+            print(f"{k + 1:>3} {results['dense'][0][k]:>12.3f} {results['hybrid'][0][k]:>13.3f} "
+                  f"{results['dense'][1][k]:>12.0f} {results['hybrid'][1][k]:>13.0f}")
+        print(f"\nmean retrieval latency: dense {results['dense'][2]:.2f} ms, hybrid {results['hybrid'][2]:.2f} ms")
+
+        target = results["dense"][0][default_k - 1]
+        reach = np.flatnonzero(results["hybrid"][0] >= target)
+        if len(reach):
+            k = int(reach[0])
+            saved = 1 - results["hybrid"][1][k] / results["dense"][1][default_k - 1]
+            print(f"hybrid matches dense recall@{default_k} ({target:.3f}) at k={k + 1}: "
+                  f"{results['hybrid'][1][k]:.0f} vs {results['dense'][1][default_k - 1]:.0f} context tokens ({saved:.0%} fewer)")
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", nargs="+", default=[os.path.join(ROOT, "data", "MyData.md")])
+    parser.add_argument("--max-k", type=int, default=8)
+    parser.add_argument("--default-k", type=int, default=6, help="top_k the app uses today")
+    parser.add_argument("--max-df", type=int, default=2, help="A term is distinctive if in at most this many chunks")
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+    run(args.docs, args.max_k, args.default_k, args.max_df, args.queries)
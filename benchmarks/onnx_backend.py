@@ -0,0 +1,117 @@
+"""
+Parity and speed of the embedding backends (torch reference, onnx, onnx-int8).
+
+For each backend: load time (first start, which includes the one-time export,
+and a warm start from the export), cosine similarity against the torch vectors
+on the same texts, top-k agreement of retrieval against torch, ingestion
+throughput (batched chunk encoding) and single-query latency.
+
+Exits non-zero when a backend's minimum cosine similarity falls below its
+threshold, so it doubles as the parity check:
+
+    python benchmarks/onnx_backend.py
+    python benchmarks/onnx_backend.py --backends onnx-int8 --min-cosine-int8 0.98 --chunks 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from embedding import make_splitter  # noqa: E402
+from embedding_backends import load_sentence_transformer  # noqa: E402
+
+QUERIES = [
+    "What projects have you built with ROS?",
+    "Tell me about your experience at Tata Electronics",
+    "Which computer vision models have you deployed?",
+    "What is your educational background?",
+    "How did you improve production yield?",
+    "What programming languages do you know?",
+]
+
+
+def corpus(n_chunks: int):
+    text = open(os.path.join(ROOT, "data", "MyData.md"), encoding="utf-8").read()
+    chunks = make_splitter().split_text(text)
+    # Repeat with a varying prefix so the texts stay distinct
+    return [f"[{i // len(chunks)}] {chunks[i % len(chunks)]}" for i in range(n_chunks)]
+
+
+def unit(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def timed_load(model_name: str, backend: str):
+    start = time.perf_counter()
+    model = load_sentence_transformer(model_name, backend=backend)
+    return model, time.perf_counter() - start
+
+
+def run(model_name: str, backends, n_chunks: int, n_queries: int, batch_size: int, k: int, thresholds):
+    chunks = corpus(n_chunks)
+    queries = [QUERIES[i % len(QUERIES)] + f" ({i})" for i in range(n_queries)]
+
+    reference = None
+    failed = []
+    print(f"{'backend':<10} {'load_s':>7} {'warm_s':>7} {'min_cos':>8} {'mean_cos':>8} {'top' + str(k):>6} "
+          f"{'chunks/s':>9} {'q_p50_ms':>9} {'q_p99_ms':>9}")
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        model, load_s = timed_load(model_name, backend)
+        _, warm_s = timed_load(model_name, backend)
+        model.encode(chunks[:batch_size], batch_size=batch_size)  # warm up
+
+        start = time.perf_counter()
+        doc_vecs = model.encode(chunks, batch_size=batch_size)
+        chunks_per_s = len(chunks) / (time.perf_counter() - start)
+
+        latencies, query_vecs = [], []
+        for q in queries:
+            start = time.perf_counter()
+            query_vecs.append(model.encode([q])[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+        query_vecs = np.array(query_vecs)
+
+        if reference is None:
+            reference = (unit(doc_vecs), unit(query_vecs))
+            min_cos = mean_cos = agreement = 1.0
+        else:
+            ref_docs, ref_queries = reference
+            cos = np.concatenate([
+                np.sum(unit(doc_vecs) * ref_docs, axis=1),
+                np.sum(unit(query_vecs) * ref_queries, axis=1),
+            ])
+            min_cos, mean_cos = float(cos.min()), float(cos.mean())
+            # Does the backend retrieve the same top-k chunks as torch?
+            ref_top = np.argsort(-(ref_queries @ ref_docs.T), axis=1)[:, :k]
+            top = np.argsort(-(unit(query_vecs) @ unit(doc_vecs).T), axis=1)[:, :k]
+            agreement = np.mean([len(set(a) & set(b)) / k for a, b in zip(top, ref_top)])
+            if min_cos < thresholds[backend]:
+                failed.append(f"{backend}: min cosine {min_cos:.4f} < {thresholds[backend]}")
+
+        print(f"{backend:<10} {load_s:>7.2f} {warm_s:>7.2f} {min_cos:>8.4f} {mean_cos:>8.4f} {agreement:>6.3f} "
+              f"{chunks_per_s:>9.1f} {np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 99):>9.2f}")
+
+    if failed:
+        print("\n❌ Parity check failed:\n  " + "\n  ".join(failed))
+        sys.exit(1)
+    print("\n✅ Parity check passed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-cosine-onnx", type=float, default=0.9999)
+    parser.add_argument("--min-cosine-int8", type=float, default=0.99)
+    args = parser.parse_args()
+    run(args.model, args.backends, args.chunks, args.queries, args.batch_size, args.k,
+        {"onnx": args.min_cosine_onnx, "onnx-int8": args.min_cosine_int8})
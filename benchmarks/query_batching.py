@@ -0,0 +1,85 @@
+"""
+Load test of query embedding with and without micro-batching.
+
+--clients threads each send queries back to back for --seconds. "direct"
+calls model.encode([query]) per request (the old embed_query); "batched" goes
+through EmbeddingService with each --window-ms value. Reports QPS,
+p50/p99 latency and the mean batch size / queue depth the service saw.
+
+    python benchmarks/query_batching.py
+    python benchmarks/query_batching.py --clients 1 8 32 --window-ms 2 5 --max-batch 32
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from embedding_service import EmbeddingService  # noqa: E402
+from model_registry import acquire_model  # noqa: E402
+
+QUERIES = [
+    "What projects have you built with ROS?",
+    "Tell me about your experience at Tata Electronics",
+    "Which computer vision models have you deployed on edge devices?",
+    "What is your educational background?",
+    "Summarize the uploaded document in three bullet points",
+    "How did you improve production yield?",
+    "What programming languages do you know?",
+    "Describe the humanoid robot project",
+]
+
+
+def load(encode, clients: int, seconds: float):
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + seconds
+
+    def client(i):
+        n = i
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            encode([QUERIES[n % len(QUERIES)]])
+            latencies[i].append(time.perf_counter() - start)
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    begin = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - begin
+    lat = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return len(lat) / elapsed, np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+def run(model_name: str, clients_list, windows, max_batch: int, seconds: float):
+    model = acquire_model(model_name)
+    model.encode(QUERIES)  # warm up
+
+    print(f"{'clients':>7} {'mode':<14} {'qps':>8} {'p50_ms':>8} {'p99_ms':>8} {'mean_batch':>10} {'max_depth':>9}")
+    for clients in clients_list:
+        qps, p50, p99 = load(lambda texts: model.encode(texts, show_progress_bar=False), clients, seconds)
+        print(f"{clients:>7} {'direct':<14} {qps:>8.1f} {p50:>8.2f} {p99:>8.2f} {'-':>10} {'-':>9}")
+        for window in windows:
+            service = EmbeddingService(model_name, max_batch_size=max_batch, max_wait_ms=window)
+            qps, p50, p99 = load(service.encode, clients, seconds)
+            m = service.metrics()
+            service.close()
+            print(f"{clients:>7} {f'batched {window:g}ms':<14} {qps:>8.1f} {p50:>8.2f} {p99:>8.2f} "
+                  f"{m['mean_batch']:>10.1f} {m['max_queue_depth']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[2.0, 5.0])
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    run(args.model, args.clients, args.window_ms, args.max_batch, args.seconds)
@@ -0,0 +1,164 @@
+"""
+Load test for the headless server (src/server.py) against the stub LLM.
+
+Starts stub_groq in-process, launches `python src/server.py` with GROQ_BASE_URL
+pointing at it, then drives --clients concurrent SSE clients for --duration
+seconds. Each client sends POST /query in a loop (a 503 is counted and retried
+after a short sleep, like a well-behaved client honouring Retry-After).
+Reports sustained QPS, TTFT/total latency percentiles as seen by the client,
+and how many requests were shed.
+
+    python benchmarks/server_load.py
+    python benchmarks/server_load.py --clients 64 --max-concurrent 16 --max-queued 16 --duration 30
+    python benchmarks/server_load.py --url http://127.0.0.1:8000   # an already running server
+
+The query cache is disabled in the spawned server so every request retrieves
+and streams; run from the repo root (the server loads MyData.md and the model).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_groq import StubGroqServer, StubModel  # noqa: E402
+
+QUERIES = [
+    "What projects have you built with ROS?",
+    "Tell me about your experience at Tata Electronics",
+    "Which computer vision models have you deployed?",
+    "What is your educational background?",
+    "How did you improve production yield?",
+    "What programming languages do you know?",
+]
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{url}/health")).json().get("status") == "ok":
+                return
+        except (httpx.HTTPError, ValueError):
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"❌ Server at {url} did not become ready in {timeout:.0f}s")
+
+
+async def one_query(client: httpx.AsyncClient, url: str, query: str, stats: dict):
+    try:
+        return await _one_query(client, url, query, stats)
+    except httpx.TransportError:
+        stats["errors"] += 1
+        return 0.0
+
+
+async def _one_query(client: httpx.AsyncClient, url: str, query: str, stats: dict):
+    start = time.perf_counter()
+    ttft = None
+    async with client.stream("POST", f"{url}/query", json={"query": query, "mode": "profile"}) as response:
+        if response.status_code == 503:
+            await response.aread()
+            stats["rejected"] += 1
+            return float(response.headers.get("retry-after", "1"))
+        if response.status_code != 200:
+            stats["errors"] += 1
+            return 0.0
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+                if event == "token" and ttft is None:
+                    ttft = time.perf_counter() - start
+            elif line.startswith("data: ") and event == "error":
+                stats["errors"] += 1
+                return 0.0
+    stats["ttft"].append(ttft or 0.0)
+    stats["total"].append(time.perf_counter() - start)
+    return 0.0
+
+
+async def client_loop(client, url: str, deadline: float, offset: int, stats: dict, backoff: float):
+    i = offset
+    while time.monotonic() < deadline:
+        retry_after = await one_query(client, url, QUERIES[i % len(QUERIES)], stats)
+        i += 1
+        if retry_after:
+            await asyncio.sleep(min(retry_after, backoff))
+
+
+async def drive(url: str, clients: int, duration: float, backoff: float, ready_timeout: float) -> dict:
+    stats = {"ttft": [], "total": [], "rejected": 0, "errors": 0}
+    limits = httpx.Limits(max_connections=clients + 4, max_keepalive_connections=clients + 4)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(120.0), limits=limits) as client:
+        await wait_ready(client, url, ready_timeout)
+        # Warm-up: first request pays model/LLM connection setup
+        await one_query(client, url, QUERIES[0], {"ttft": [], "total": [], "rejected": 0, "errors": 0})
+        start = time.monotonic()
+        await asyncio.gather(*(client_loop(client, url, start + duration, c, stats, backoff) for c in range(clients)))
+        elapsed = time.monotonic() - start
+        health = (await client.get(f"{url}/health")).json()
+
+    ttft, total = np.array(stats["ttft"]) * 1000, np.array(stats["total"]) * 1000
+    result = {
+        "clients": clients, "duration_s": round(elapsed, 2),
+        "completed": len(total), "rejected_503": stats["rejected"], "errors": stats["errors"],
+        "qps": round(len(total) / elapsed, 2),
+        "server_max_concurrent": health.get("max_concurrent"), "server_max_queued": health.get("max_queued"),
+    }
+    for name, values in (("ttft", ttft), ("total", total)):
+        if len(values):
+            for p in (50, 95, 99):
+                result[f"{name}_p{p}_ms"] = round(float(np.percentile(values, p)), 1)
+    return result
+
+
+async def main(args):
+    url = args.url
+    server = None
+    stub = None
+    if url is None:
+        stub = await StubGroqServer({"llama-3.3-70b-versatile": StubModel(ttft=args.ttft, token_delay=args.token_delay)}).start()
+        env = dict(os.environ, GROQ_BASE_URL=stub.base_url, GROQ_API_KEY="stub", QUERY_CACHE_SIZE="0",
+                   MAX_CONCURRENT_QUERIES=str(args.max_concurrent), MAX_QUEUED_QUERIES=str(args.max_queued),
+                   QUERY_QUEUE_TIMEOUT=str(args.queue_timeout))
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "src", "server.py"), "--host", "127.0.0.1",
+             "--port", str(args.port)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL if args.quiet else None,
+        )
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        result = await drive(url, args.clients, args.duration, args.backoff, args.ready_timeout)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if stub is not None:
+            await stub.stop()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Test an already running server instead of spawning one")
+    parser.add_argument("--port", type=int, default=8017)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--max-concurrent", type=int, default=16)
+    parser.add_argument("--max-queued", type=int, default=64)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stub LLM time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Stub LLM delay per token (s)")
+    parser.add_argument("--backoff", type=float, default=0.2, help="Max sleep after a 503 (s)")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--quiet", action="store_true", help="Hide the server's own output")
+    asyncio.run(main(parser.parse_args()))
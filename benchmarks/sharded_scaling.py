@@ -0,0 +1,113 @@
+"""
+ShardedVectorStore scaling: ingest throughput and query latency from 1 to 8 shards.
+
+Uses synthetic clustered 384-d vectors (embedding cost is the same for any shard
+count, so it is left out) and, for every shard count:
+  ingest     add all vectors in --batch-size batches       -> vectors/s
+  query      --queries sequential top-k searches            -> p50/p99 ms
+  load       the same queries from --concurrency threads    -> QPS
+  recall     overlap with a single in-process FaissVectorStore's top-k
+The single store is reported first as the baseline ("1 proc"). Sharding only helps
+when there are cores to run shards on: with fewer cores than shards, expect
+per-query IPC overhead rather than speed-up.
+
+    python benchmarks/sharded_scaling.py
+    python benchmarks/sharded_scaling.py --vectors 500000 --shards 1 2 4 8 --backend flat
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from index_factory import IndexConfig  # noqa: E402
+from sharded_store import ShardedVectorStore  # noqa: E402
+from vector_database import FaissVectorStore  # noqa: E402
+
+
+def synthetic(n: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, n // 500), dim)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Sparse 40-bit IDs, like chunk_id() hashes
+    ids = rng.choice(1 << 40, size=n, replace=False)
+    metas = [{"source": f"doc{i // 100}", "page": i % 100, "text": f"chunk {i}"} for i in range(n)]
+    return vectors, ids.astype("int64"), metas
+
+
+def measure(store, vectors, ids, metas, queries, k: int, batch_size: int, concurrency: int):
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        store.add_embeddings(vectors[i:i + batch_size], metas[i:i + batch_size], ids[i:i + batch_size].tolist())
+    ingest_s = time.perf_counter() - start
+
+    search = lambda q: store.search(q, top_k=k)
+    search(queries[0])
+    latencies, results = [], []
+    for q in queries:
+        t = time.perf_counter()
+        results.append(search(q))
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(search, queries))
+    qps = len(queries) / (time.perf_counter() - start)
+    return {
+        "ingest_per_s": len(vectors) / ingest_s,
+        "p50_ms": float(np.percentile(latencies, 50)), "p99_ms": float(np.percentile(latencies, 99)),
+        "qps": qps, "results": [[r["id"] for r in res] for res in results],
+    }
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rag_sharded_")
+    vectors, ids, metas = synthetic(args.vectors, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)] + 0.1 * rng.standard_normal((args.queries, args.dim)).astype("float32")
+    queries = [q[None, :] for q in queries]
+    print(f"[INFO] {args.vectors} vectors x {args.dim}d, {args.queries} queries, top-{args.k}, "
+          f"{os.cpu_count()} CPUs, backend {args.backend}")
+
+    rows = []
+    single = FaissVectorStore(os.path.join(workdir, "single"), hybrid=False, index_config=IndexConfig(backend=args.backend))
+    baseline = measure(single, vectors, ids, metas, queries, args.k, args.batch_size, args.concurrency)
+    rows.append(("1 proc", baseline))
+    truth = baseline["results"]
+
+    for n in args.shards:
+        store = ShardedVectorStore(os.path.join(workdir, f"sharded-{n}"), shards=n, placement=args.placement,
+                                   hybrid=False, index_config=IndexConfig(backend=args.backend))
+        try:
+            rows.append((f"{n} shards", measure(store, vectors, ids, metas, queries, args.k, args.batch_size, args.concurrency)))
+        finally:
+            store.close()
+
+    print(f"\n{'store':<10} {'ingest/s':>10} {'p50_ms':>8} {'p99_ms':>8} {'qps':>8} {'recall@' + str(args.k):>9}")
+    for name, row in rows:
+        recall = np.mean([len(set(r) & set(t)) / max(len(t), 1) for r, t in zip(row["results"], truth)])
+        print(f"{name:<10} {row['ingest_per_s']:>10.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+              f"{row['qps']:>8.1f} {recall:>9.3f}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--placement", default="hash", choices=["hash", "round_robin"])
+    parser.add_argument("--backend", default="flat", help="Index backend per shard (flat, hnsw, ivf, ...)")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    run(parser.parse_args())
@@ -0,0 +1,116 @@
+"""
+Small-corpus fast path vs retrieval: per-request latency and CPU time.
+
+Builds an engine over a temporary profile index (data/MyData.md), answers the
+same --queries questions against the local LLM stub twice, and reads each
+request's trace:
+  full_context   FULL_CONTEXT_BUDGET large enough for the whole profile:
+                 no query embedding, no search, a prompt prefix built once
+  retrieval      FULL_CONTEXT_BUDGET=0: embed, hybrid search, context build
+Then --grow copies of the profile are added to the same store and the default
+budget is restored, to show retrieval taking over once the corpus no longer fits.
+
+  prep_ms     everything before the LLM is called (total minus llm.generate)
+  cpu_ms      process CPU time of the request (see RAGSearch.search_and_answer)
+  total_ms    whole request, against a stub with --ttft / --token-delay
+
+The query cache is disabled so every request does the full work.
+
+    python benchmarks/small_corpus.py
+    python benchmarks/small_corpus.py --queries 100 --budget 6000 --grow 20
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_groq import StubGroqServer, StubModel  # noqa: E402
+
+QUERIES = [
+    "What projects have you built with ROS?",
+    "Tell me about your experience at Tata Electronics",
+    "Which computer vision models have you deployed?",
+    "What is your educational background?",
+    "How did you improve production yield?",
+    "What programming languages do you know?",
+]
+
+
+def run_queries(engine, queries, traces):
+    traces.clear()
+    for q in queries:
+        for _ in engine.search_and_answer(q, mode="profile"):
+            pass
+    return [t for t in traces if t["name"] == "rag.request"]
+
+
+def summarize(name, records):
+    total = np.array([r["duration_ms"] for r in records])
+    prep = np.array([r["duration_ms"] - r["stages_ms"].get("llm.generate", 0.0) for r in records])
+    cpu = np.array([r["attrs"]["cpu_ms"] for r in records])
+    paths = sorted({r["attrs"].get("path") for r in records})
+    embeds = sum("query.embed" in r["stages_ms"] for r in records)
+    tokens = np.mean([r["attrs"].get("prompt_tokens", 0) for r in records])
+    print(f"{name:<14} {'/'.join(paths):<14} {np.percentile(prep, 50):>8.2f} {np.percentile(prep, 95):>8.2f} "
+          f"{np.percentile(cpu, 50):>8.2f} {np.percentile(cpu, 95):>8.2f} {np.percentile(total, 50):>9.1f} "
+          f"{tokens:>8.0f} {embeds:>7}")
+
+
+def run(args):
+    from llm_client import background_loop
+    stub = StubGroqServer({"llama-3.3-70b-versatile": StubModel(ttft=args.ttft, token_delay=args.token_delay)})
+    stub = asyncio.run_coroutine_threadsafe(stub.start(), background_loop()).result()
+    os.environ.update(GROQ_BASE_URL=stub.base_url, GROQ_API_KEY=os.getenv("GROQ_API_KEY", "stub"),
+                      QUERY_CACHE_SIZE="0", FULL_CONTEXT_BUDGET=str(args.budget))
+
+    import telemetry
+    from chat import RAGSearch
+    from langchain_core.documents import Document
+
+    workdir = tempfile.mkdtemp(prefix="rag_full_context_")
+    os.chdir(ROOT)  # the engine reads data/MyData.md
+    traces = []
+    telemetry.get_telemetry().add_sink(traces.append)
+    engine = RAGSearch(os.path.join(workdir, "profile"), os.path.join(workdir, "user"), startup_mode="eager")
+    queries = [QUERIES[i % len(QUERIES)] + f" ({i})" for i in range(args.queries)]
+    try:
+        run_queries(engine, queries[:3], traces)  # warm up both paths' first-use costs
+        engine.full_context.token_budget = 0
+        run_queries(engine, queries[:3], traces)
+
+        print(f"\n{'run':<14} {'path':<14} {'prep_p50':>8} {'prep_p95':>8} {'cpu_p50':>8} {'cpu_p95':>8} "
+              f"{'total_p50':>9} {'prompt':>8} {'embeds':>7}   (ms, prompt tokens)")
+        engine.full_context.token_budget = args.budget
+        summarize("full_context", run_queries(engine, queries, traces))
+        engine.full_context.token_budget = 0
+        summarize("retrieval", run_queries(engine, queries, traces))
+
+        if args.grow:
+            with open(engine.profile_path, encoding="utf-8") as f:
+                text = f.read()
+            engine.profile_store.upsert_documents(
+                [Document(page_content=f"Copy {i}\n\n{text}", metadata={"source": f"MyData_{i}.md"}) for i in range(args.grow)])
+            engine.full_context.token_budget = args.budget
+            summarize(f"grown x{args.grow + 1}", run_queries(engine, queries, traces))
+    finally:
+        engine.llm.close()  # the stub waits for its keep-alive connections to close
+        asyncio.run_coroutine_threadsafe(stub.stop(), background_loop()).result()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=3000, help="FULL_CONTEXT_BUDGET for the fast path (tokens)")
+    parser.add_argument("--grow", type=int, default=4, help="Profile copies added to show the fallback (0 skips)")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Stub LLM time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Stub LLM delay per token (s)")
+    run(parser.parse_args())
@@ -0,0 +1,60 @@
+"""
+Boot-time and RSS report for the embedding model registry.
+
+Simulates one app boot plus one user upload (profile store, user store,
+two build pipelines and a rebuilt user store) and prints wall time and
+resident memory for:
+  --mode legacy : one SentenceTransformer per store/pipeline (old behaviour)
+  --mode shared : every component goes through model_registry (current)
+
+Run each mode in a fresh process so the numbers do not leak into each other:
+    python benchmarks/startup_memory.py --mode legacy
+    python benchmarks/startup_memory.py --mode shared
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+MODEL = "all-MiniLM-L6-v2"
+# profile store, profile build pipeline, user store, user build pipeline, user store re-created on upload
+LOADS_PER_BOOT_AND_UPLOAD = 5
+
+
+def rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        # ru_maxrss is KiB on Linux; this is a peak, not current, value
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(mode: str):
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    handles = []
+    if mode == "legacy":
+        from sentence_transformers import SentenceTransformer
+        for _ in range(LOADS_PER_BOOT_AND_UPLOAD):
+            handles.append(SentenceTransformer(MODEL))
+    else:
+        from model_registry import acquire_model, get_registry
+        for _ in range(LOADS_PER_BOOT_AND_UPLOAD):
+            handles.append(acquire_model(MODEL))
+        print(f"[INFO] Registry refcounts: {get_registry().stats()}")
+    elapsed = time.perf_counter() - start
+
+    handles[0].encode(["warm-up query"])
+    distinct = len({id(h) for h in handles})
+    print(f"mode={mode} model_instances={distinct} load_time={elapsed:.2f}s "
+          f"rss_before={base_rss:.0f}MB rss_after={rss_mb():.0f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["legacy", "shared"], default="shared")
+    run(parser.parse_args().mode)
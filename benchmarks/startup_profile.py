@@ -0,0 +1,88 @@
+"""
+Import-time and boot-time report for the RAG engine.
+
+1. `python -X importtime -c "import chat"`: the slowest modules by cumulative
+   import time, and whether torch / sentence_transformers / langchain loaders /
+   the LLM client were pulled in at import.
+2. A fresh process per startup mode (fast, lazy, eager) timing: import chat,
+   RAGSearch() until ready, and the first query embedding (which pays for the
+   model if it is not warm yet).
+
+Run from the project root, after `python src/build_snapshot.py`:
+
+    python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --modes fast eager --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+HEAVY = ["torch", "sentence_transformers", "transformers", "langchain_community", "langchain_groq", "httpx", "faiss"]
+
+BOOT_SCRIPT = r"""
+import json, os, sys, time
+sys.path.insert(0, {src!r})
+t0 = time.perf_counter()
+import chat
+t1 = time.perf_counter()
+loaded_at_import = [m for m in {heavy!r} if m in sys.modules]
+engine = chat.RAGSearch(startup_mode={mode!r})
+t2 = time.perf_counter()
+engine.profile_store.embed_query("What projects have you worked on?")
+t3 = time.perf_counter()
+print("BOOT " + json.dumps({{
+    "import_s": t1 - t0, "init_s": t2 - t1, "first_query_embed_s": t3 - t2,
+    "loaded_at_import": loaded_at_import, "timings": engine.boot_timings,
+}}))
+"""
+
+
+def import_report(top: int):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import chat"],
+        cwd=SRC, capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=SRC),
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), int(match.group(1)), len(match.group(3)), match.group(4)))
+    total = next((cum for cum, _, _, name in rows if name == "chat"), 0)
+    print(f"== import chat: {total / 1e6:.2f}s cumulative ==")
+    print(f"{'cumulative_ms':>13} {'self_ms':>8}  module")
+    for cumulative, self_us, _, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>13.1f} {self_us / 1000:>8.1f}  {name}")
+    imported = {name for _, _, _, name in rows}
+    print("heavy modules imported: " + (", ".join(m for m in HEAVY if m in imported) or "none"))
+
+
+def boot_report(modes):
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "profiling-only")
+    print(f"\n== boot ==\n{'mode':<6} {'import_s':>8} {'init_s':>7} {'profile_s':>9} {'1st_embed_s':>11}  imported at startup")
+    for mode in modes:
+        result = subprocess.run(
+            [sys.executable, "-c", BOOT_SCRIPT.format(src=SRC, heavy=HEAVY, mode=mode)],
+            cwd=ROOT, capture_output=True, text=True, env=env,
+        )
+        line = next((l for l in result.stdout.splitlines() if l.startswith("BOOT ")), None)
+        if line is None:
+            print(f"{mode:<6} failed:\n{result.stderr[-2000:]}")
+            continue
+        r = json.loads(line[5:])
+        print(f"{mode:<6} {r['import_s']:>8.2f} {r['init_s']:>7.2f} {r['timings'].get('profile_s', 0):>9.2f} "
+              f"{r['first_query_embed_s']:>11.2f}  {', '.join(r['loaded_at_import']) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=12, help="Slowest imports to list")
+    parser.add_argument("--modes", nargs="+", default=["fast", "lazy", "eager"])
+    args = parser.parse_args()
+    import_report(args.top)
+    boot_report(args.modes)
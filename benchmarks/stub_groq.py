@@ -0,0 +1,161 @@
+"""
+Local stand-in for the Groq streaming chat completions API.
+
+Speaks just enough HTTP/1.1 (keep-alive, chunked SSE responses) for
+llm_client.GroqStreamClient and the hedging benchmark. Each model has a
+configurable time-to-first-token, per-token delay and failure mode, so slow or
+broken primaries can be reproduced without an API key.
+
+    python benchmarks/stub_groq.py --port 8765 --model llama-3.3-70b-versatile:2.0 --model llama-3.1-8b-instant:0.2
+    GROQ_BASE_URL=http://127.0.0.1:8765/v1 GROQ_API_KEY=stub streamlit run src/app.py
+
+A model spec is name:ttft[:token_delay[:fail]] where fail is "error" (HTTP 500)
+or "hang" (never answers).
+"""
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+DEFAULT_ANSWER = (
+    "This is a stubbed answer streamed token by token so time to first token and "
+    "throughput can be measured without calling the real API."
+)
+
+
+@dataclass
+class StubModel:
+    ttft: float = 0.1
+    token_delay: float = 0.01
+    fail: str = ""
+
+
+def parse_model_spec(spec: str):
+    parts = spec.split(":")
+    name = parts[0]
+    model = StubModel(
+        ttft=float(parts[1]) if len(parts) > 1 else 0.1,
+        token_delay=float(parts[2]) if len(parts) > 2 else 0.01,
+        fail=parts[3] if len(parts) > 3 else "",
+    )
+    return name, model
+
+
+class StubGroqServer:
+    def __init__(self, models: Dict[str, StubModel], answer: str = DEFAULT_ANSWER,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.models = models
+        self.answer = answer
+        self.host = host
+        self.port = port
+        self.requests: Dict[str, int] = {}
+        self.connections = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        return method, path, body
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body = request
+                if method != "POST" or not path.endswith("/chat/completions"):
+                    await self._send_json(writer, 404, {"error": {"message": "not found"}})
+                    continue
+                await self._completion(writer, json.loads(body or b"{}"))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_json(self, writer, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} Error\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _chunk(self, writer, data: bytes):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+    async def _completion(self, writer, payload: dict):
+        name = payload.get("model", "")
+        self.requests[name] = self.requests.get(name, 0) + 1
+        model = self.models.get(name)
+        if model is None:
+            await self._send_json(writer, 404, {"error": {"message": f"model {name} not found"}})
+            return
+
+        await asyncio.sleep(model.ttft)
+        if model.fail == "error":
+            await self._send_json(writer, 500, {"error": {"message": "stub failure"}})
+            return
+        if model.fail == "hang":
+            await asyncio.sleep(3600)
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        created = int(time.time())
+        words = self.answer.split(" ")
+        limit = payload.get("max_tokens") or len(words)
+        for i, word in enumerate(words[:limit]):
+            event = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": name,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            await self._chunk(writer, f"data: {json.dumps(event)}\n\n".encode())
+            if model.token_delay:
+                await asyncio.sleep(model.token_delay)
+        await self._chunk(writer, b"data: [DONE]\n\n")
+        await self._chunk(writer, b"")
+
+
+async def serve(models: Dict[str, StubModel], host: str, port: int):
+    server = await StubGroqServer(models, host=host, port=port).start()
+    print(f"🧪 [Stub] Groq stub listening on {server.base_url} ({', '.join(models)})")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", action="append", default=[], help="name:ttft[:token_delay[:fail]]")
+    args = parser.parse_args()
+    specs = args.model or ["llama-3.3-70b-versatile:0.3", "llama-3.1-8b-instant:0.1", "mixtral-8x7b-32768:0.2"]
+    try:
+        asyncio.run(serve(dict(parse_model_spec(s) for s in specs), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,347 @@
+"""
+Reproducible benchmark suite: ingestion, retrieval and answer latency.
+
+Each corpus runs in a fresh process (so peak RSS is per corpus) and reports:
+  load       PDF parsing through load_data (generated PDFs only)
+  chunk      EmbeddingPipeline.chunk_documents
+  build      embedding and index add, timed by the telemetry spans of upsert_documents
+  save/load  FaissVectorStore.save() and a cold FaissVectorStore.load()
+  query      store.query() per top_k, including the query embedding
+  search     the same with a precomputed embedding (index + BM25 cost only)
+  answer     retrieve + context build + LLM stream against the local Groq stub
+             (benchmarks/stub_groq.py): time to first token and total time
+  rss        peak resident memory of the corpus process
+
+Corpora are built on the fly: "md:N" is data/MyData.md scaled to N copies (as
+in-memory documents), "pdf:N" is an N-page PDF written from the same text. The
+embedding cache is disabled so embedding is really measured.
+
+Results are one flat JSON dict of metrics plus run metadata (commit, model,
+backends, machine). With --baseline, every metric is compared against an older
+result file and the run exits non-zero if any got worse by more than
+--threshold (ignoring differences below a small absolute noise floor):
+
+    python benchmarks/suite.py --out benchmarks/results/main.json
+    python benchmarks/suite.py --baseline benchmarks/results/main.json --threshold 0.2
+    python benchmarks/suite.py --corpora md:1 md:20 pdf:50 --top-k 1 5 20 --queries 200
+    python benchmarks/suite.py --compare benchmarks/results/main.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "What projects have you built with ROS?",
+    "Tell me about your experience at Tata Electronics",
+    "Which computer vision models have you deployed?",
+    "What is your educational background?",
+    "How did you improve production yield?",
+    "What programming languages do you know?",
+]
+STUB_MODEL = "llama-3.3-70b-versatile"
+
+# Metric suffix -> (higher is better, absolute noise floor for regressions)
+UNITS = {
+    "_ms": (False, 0.5),
+    "_s": (False, 0.005),
+    "_mb": (False, 10.0),
+    "_per_s": (True, 0.0),
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def profile_text() -> str:
+    return open(os.path.join(ROOT, "data", "MyData.md"), encoding="utf-8").read()
+
+
+def markdown_corpus(copies: int):
+    from langchain_core.documents import Document
+    text = profile_text()
+    # Distinct sources and a varying first line keep chunk IDs and texts distinct
+    return [Document(page_content=f"Copy {i}\n\n{text}", metadata={"source": f"MyData_{i}.md"}) for i in range(copies)]
+
+
+def _pdf_escape(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages):
+    """Minimal text-only PDF (Helvetica, one content stream per page); pages are lists of lines."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 12 TL 50 790 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def pdf_corpus(n_pages: int, workdir: str):
+    """Write an n-page PDF of the profile text, then load it the way uploads are loaded."""
+    from load_data import load_documents
+    lines = [l[:95] for l in profile_text().splitlines() if l.strip()]
+    pages = [[f"Page {p + 1}"] + [lines[(p * 60 + i) % len(lines)] for i in range(60)] for p in range(n_pages)]
+    path = os.path.join(workdir, f"bench_{n_pages}p.pdf")
+    write_pdf(path, pages)
+    start = time.perf_counter()
+    docs = load_documents(path)
+    load_s = time.perf_counter() - start
+    if len(docs) != n_pages:
+        raise RuntimeError(f"Loaded {len(docs)} pages from {path}, expected {n_pages}")
+    return docs, load_s
+
+
+def latency_stats(prefix: str, seconds) -> dict:
+    ms = np.array(seconds) * 1000
+    return {f"{prefix}.p50_ms": float(np.percentile(ms, 50)), f"{prefix}.p95_ms": float(np.percentile(ms, 95)),
+            f"{prefix}.p99_ms": float(np.percentile(ms, 99))}
+
+
+def start_stub(ttft: float, token_delay: float):
+    import asyncio
+    from llm_client import background_loop
+    from stub_groq import StubGroqServer, StubModel
+    server = StubGroqServer({STUB_MODEL: StubModel(ttft=ttft, token_delay=token_delay)})
+    return asyncio.run_coroutine_threadsafe(server.start(), background_loop()).result()
+
+
+def run_corpus(spec: str, args) -> dict:
+    import telemetry
+    from context_builder import ContextBuilder
+    from llm_client import HedgedLLM
+    from model_registry import acquire_model, release_model
+    from vector_database import FaissVectorStore
+
+    kind, size = spec.split(":")
+    size = int(size)
+    metrics = {}
+    workdir = tempfile.mkdtemp(prefix="rag_bench_")
+
+    if kind == "md":
+        docs = markdown_corpus(size)
+    elif kind == "pdf":
+        docs, load_s = pdf_corpus(size, workdir)
+        metrics["load_s"] = load_s
+    else:
+        raise ValueError(f"Unknown corpus kind: {kind} (expected md:N or pdf:N)")
+
+    store = FaissVectorStore(os.path.join(workdir, "store"), args.model)
+    pipe = store.embedding_pipeline()
+    start = time.perf_counter()
+    chunks = pipe.chunk_documents(docs)
+    chunk_s = time.perf_counter() - start
+    pipe.close()
+    metrics.update({"chunks": len(chunks), "chunk_s": chunk_s, "chunk.chunks_per_s": len(chunks) / chunk_s})
+
+    acquire_model(args.model)  # load the model outside the timed build
+    with telemetry.trace("bench.build") as build:
+        store.upsert_documents(docs)
+    stages = build.stages
+    metrics.update({
+        "build_s": build.duration,
+        "build.embed_s": stages.get("index.embed", 0.0),
+        "build.index_add_s": stages.get("index.add", 0.0),
+        "build.chunks_per_s": len(chunks) / build.duration,
+        "index_vectors": int(store.index.ntotal),
+    })
+
+    start = time.perf_counter()
+    store.save()
+    metrics["save_s"] = time.perf_counter() - start
+    store.close()
+    release_model(args.model)
+
+    start = time.perf_counter()
+    store = FaissVectorStore(store.persist_dir, args.model)
+    store.load()
+    metrics["load_index_s"] = time.perf_counter() - start
+
+    queries = [QUERIES[i % len(QUERIES)] + f" ({i})" for i in range(args.queries)]
+    store.query(queries[0], top_k=max(args.top_k))  # warm up the model and the batcher
+    for k in args.top_k:
+        seconds = []
+        for q in queries:
+            t = time.perf_counter()
+            store.query(q, top_k=k)
+            seconds.append(time.perf_counter() - t)
+        metrics.update(latency_stats(f"query.k{k}", seconds))
+        embeddings = [store.embed_query(q) for q in queries]
+        seconds = []
+        for q, emb in zip(queries, embeddings):
+            t = time.perf_counter()
+            store.query(q, top_k=k, query_embedding=emb)
+            seconds.append(time.perf_counter() - t)
+        metrics.update(latency_stats(f"search.k{k}", seconds))
+
+    if args.answers:
+        server = start_stub(args.stub_ttft, args.stub_token_delay)
+        llm = HedgedLLM([STUB_MODEL], "stub", base_url=server.base_url)
+        builder = ContextBuilder()
+        ttfts, totals = [], []
+        for q in queries[:args.answers]:
+            t = time.perf_counter()
+            built = builder.build(store.query(q, top_k=6))
+            first = None
+            for _ in llm.stream(f"CONTEXT:\n{built.text}\n\nUSER QUESTION: {q}\n\nANSWER:"):
+                first = first or time.perf_counter() - t
+            ttfts.append(first)
+            totals.append(time.perf_counter() - t)
+        llm.close()
+        metrics.update(latency_stats("answer.ttft", ttfts))
+        metrics.update(latency_stats("answer.total", totals))
+
+    store.close()
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return metrics
+
+
+def run_meta(args) -> dict:
+    from embedding_backends import default_backend
+
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "model": args.model,
+        "embedding_backend": default_backend(),
+        "index_backend": "auto",
+        "query_batch_window_ms": float(os.getenv("QUERY_BATCH_WINDOW_MS", "3")),
+        "stub_ttft_s": args.stub_ttft,
+        "args": {k: v for k, v in vars(args).items() if k not in ("worker", "compare")},
+    }
+
+
+def run_all(args) -> dict:
+    results = {"meta": run_meta(args), "metrics": {}}
+    for spec in args.corpora:
+        print(f"▶️  {spec} ...", flush=True)
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", spec] + worker_args(args)
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+        if proc.returncode != 0 or line is None:
+            raise SystemExit(f"❌ {spec} failed:\n{proc.stderr[-3000:]}")
+        for name, value in json.loads(line[7:]).items():
+            results["metrics"][f"{spec}.{name}"] = value
+    return results
+
+
+def worker_args(args) -> list:
+    return ["--model", args.model, "--queries", str(args.queries), "--answers", str(args.answers),
+            "--stub-ttft", str(args.stub_ttft), "--stub-token-delay", str(args.stub_token_delay),
+            "--top-k", *map(str, args.top_k)]
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Rows of (metric, old, new, change, regressed); only metrics with a known unit are judged."""
+    rows = []
+    old_metrics, new_metrics = baseline["metrics"], current["metrics"]
+    for name in sorted(set(old_metrics) & set(new_metrics)):
+        unit = next((u for u in sorted(UNITS, key=len, reverse=True) if name.endswith(u)), None)
+        old, new = old_metrics[name], new_metrics[name]
+        if unit is None or not old:
+            continue
+        higher_is_better, floor = UNITS[unit]
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        regressed = worse > threshold and abs(new - old) > floor
+        rows.append((name, old, new, change, regressed))
+    return rows
+
+
+def report(rows, threshold: float) -> bool:
+    print(f"\n{'metric':<42} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, old, new, change, regressed in rows:
+        flag = "  ❌" if regressed else ""
+        print(f"{name:<42} {old:>11.4g} {new:>11.4g} {change:>+7.1%}{flag}")
+    regressions = [r for r in rows if r[4]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {threshold:.0%}.")
+        return False
+    print(f"\n✅ No regressions beyond {threshold:.0%}.")
+    return True
+
+
+def print_metrics(metrics: dict):
+    for name, value in metrics.items():
+        print(f"{name:<42} {value:>12.4g}" if isinstance(value, float) else f"{name:<42} {value:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpora", nargs="+", default=["md:1", "md:20", "pdf:20"])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--queries", type=int, default=100, help="Queries per top_k")
+    parser.add_argument("--answers", type=int, default=20, help="Answers streamed from the stub (0 to skip)")
+    parser.add_argument("--stub-ttft", type=float, default=0.05)
+    parser.add_argument("--stub-token-delay", type=float, default=0.002)
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Only compare two result files")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process: one corpus; the embedding cache would hide the embedding cost
+        os.environ["EMBEDDING_CACHE_DIR"] = ""
+        print("RESULT " + json.dumps(run_corpus(args.worker, args)))
+        sys.exit(0)
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            sys.exit(0 if report(compare(json.load(f), json.load(g), args.threshold), args.threshold) else 1)
+
+    results = run_all(args)
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"{results['meta']['commit'] or 'run'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print_metrics(results["metrics"])
+    print(f"\n💾 Results written to {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            sys.exit(0 if report(compare(json.load(f), results, args.threshold), args.threshold) else 1)
@@ -0,0 +1,59 @@
+"""
+Accuracy and size of the FaissVectorStore storage modes.
+
+Compares the legacy layout (raw L2, float32) with cosine / inner-product
+indexes holding float32, float16 (SQfp16) or int8 (SQ8) codes. Ground truth is
+exact cosine search; recall@k shows how much compression costs.
+
+    python benchmarks/vector_compression.py
+    python benchmarks/vector_compression.py --n 200000 --backend hnsw
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from index_factory import IndexConfig, build_index, prepare_vectors  # noqa: E402
+from ann_backends import recall_at_k, synthetic_corpus  # noqa: E402
+
+MODES = [("l2", "float32"), ("cosine", "float32"), ("cosine", "float16"), ("cosine", "int8")]
+
+
+def run(n: int, dim: int, n_queries: int, k: int, backend: str):
+    data, queries = synthetic_corpus(n, dim, n_queries)
+    truth_cfg = IndexConfig(metric="cosine")
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(prepare_vectors(data, truth_cfg))
+    _, truth = exact.search(prepare_vectors(queries, truth_cfg), k)
+
+    print(f"{'metric':<7} {'storage':<8} {'factory':<16} {'size_MB':>8} {'ratio':>6} {'mean_ms':>8} {'recall@' + str(k):>9}")
+    baseline_size = None
+    for metric, storage in MODES:
+        config = IndexConfig(backend=backend, metric=metric, storage=storage)
+        vectors = prepare_vectors(data, config)
+        index = build_index(dim, config, vectors)
+        index.add_with_ids(vectors, np.arange(n, dtype="int64"))
+        size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+        baseline_size = baseline_size or size_mb
+
+        start = time.perf_counter()
+        _, found = index.search(prepare_vectors(queries, config), k)
+        mean_ms = (time.perf_counter() - start) * 1000 / n_queries
+        print(f"{metric:<7} {storage:<8} {config.resolved['factory']:<16} {size_mb:>8.1f} "
+              f"{baseline_size / size_mb:>5.1f}x {mean_ms:>8.3f} {recall_at_k(found, truth):>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backend", default="flat", choices=["flat", "hnsw", "ivf"])
+    args = parser.parse_args()
+    run(args.n, args.dim, args.queries, args.k, args.backend)
@@ -1,5 +1,6 @@
+import os
 import streamlit as st
-import time
+import uuid
 
 st.set_page_config(
     page_title="Chetan's AI Portfolio",
@@ -119,14 +120,19 @@ st.divider()
 
 # --- 4. LAZY LOAD THE BACKEND (SHOW LOADING) ---
 
+@st.cache_resource(show_spinner=False)
+def load_engine():
+    # One engine per server process, shared by every browser session
+    from chat import get_engine
+    return get_engine()
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 if "bot" not in st.session_state:
     with st.status("🚀 Booting up AI Brain...", expanded=True) as status:
         st.write("Loading Vector Database...")
-        # Import inside the block to delay the heavy hit
-        from chat import RAGSearch 
-        st.session_state.bot = RAGSearch()
-        st.write("Connecting to LLM...")
-        time.sleep(0.5) # Fake tiny delay for UX smooth feel
+        st.session_state.bot = load_engine()
         status.update(label="✅ System Ready!", state="complete", expanded=False)
 
 
@@ -136,17 +142,67 @@ if "messages" not in st.session_state:
 # --- 5. LOGIC & INTERACTION (The rest runs normally) ---
 
 if uploaded_file and mode == "📄 Analyze Document":
-    # Check if new file
+    # Check if new file: it is queued for background indexing and the page stays usable
     if "last_file" not in st.session_state or st.session_state.last_file != uploaded_file.name:
-        with st.spinner("🧠 Indexing document..."):
-            success, msg = st.session_state.bot.process_user_upload(uploaded_file)
-            if success:
-                st.toast("Document Ready!", icon="✅")
-                st.session_state.last_file = uploaded_file.name
-                # Add a system welcome message
-                st.session_state.messages.append({"role": "assistant", "content": f"I've read **{uploaded_file.name}**. What would you like to know?"})
-            else:
-                st.error(msg)
+        job = st.session_state.bot.submit_upload(uploaded_file, session_id=st.session_state.session_id)
+        st.session_state.index_job = job.job_id
+        st.session_state.last_file = uploaded_file.name
+
+
+@st.fragment(run_every=1.0)
+def indexing_status():
+    # Polls the session's indexing job; only this fragment reruns, not the whole page
+    job_id = st.session_state.get("index_job")
+    job = st.session_state.bot.index_jobs.get(job_id) if job_id else None
+    if job is None:
+        return
+    snap = job.snapshot()
+    if not job.done:
+        p = snap["progress"]
+        # Pages are known for PDFs; otherwise just count chunks
+        if p.get("total_pages"):
+            fraction = min(p["pages"] / p["total_pages"], 1.0)
+            label = f"🧠 Indexing page {p['pages']}/{p['total_pages']} ({p['chunks']} chunks) - you can already ask questions"
+        elif p:
+            fraction = 0.0
+            label = f"🧠 Indexing... {p['chunks']} chunks embedded - you can already ask questions"
+        else:
+            fraction = 0.0
+            label = "🧠 Reading document..."
+        st.progress(fraction, text=label)
+        if st.button("Cancel indexing", key=f"cancel-{job_id}"):
+            st.session_state.bot.index_jobs.cancel(job_id)
+        return
+
+    del st.session_state.index_job
+    if snap["status"] == "done":
+        st.toast("Document Ready!", icon="✅")
+        # Add a system welcome message
+        st.session_state.messages.append({"role": "assistant", "content": f"I've read **{snap['name']}**. What would you like to know?"})
+        st.rerun()
+    elif snap["status"] == "cancelled":
+        st.toast(snap["message"], icon="🛑")
+    else:
+        st.toast(snap["message"], icon="🚨")
+
+
+if mode == "📄 Analyze Document":
+    indexing_status()
+
+    # Switch between this session's already-indexed uploads without re-embedding
+    session_docs = st.session_state.bot.user_stores.documents(st.session_state.session_id)
+    if len(session_docs) > 1:
+        doc_ids = list(session_docs)
+        active = st.session_state.bot.user_stores.active_document(st.session_state.session_id)
+        with st.sidebar:
+            chosen = st.selectbox(
+                "Active document",
+                doc_ids,
+                index=doc_ids.index(active) if active in doc_ids else 0,
+                format_func=lambda d: session_docs[d],
+            )
+        if chosen != active:
+            st.session_state.bot.user_stores.activate(st.session_state.session_id, chosen)
 
 
 for message in st.session_state.messages:
@@ -186,9 +242,27 @@ if user_input:
             # Pass history for memory
             stream = st.session_state.bot.search_and_answer(
                 user_input,
-                mode=current_mode
+                mode=current_mode,
+                session_id=st.session_state.session_id
             )
             response = st.write_stream(stream)
         
         # 4. Save to History
-        st.session_state.messages.append({"role": "assistant", "content": response})
\ No newline at end of file
+        st.session_state.messages.append({"role": "assistant", "content": response})
+
+# --- 6. DEBUG PANEL (RAG_DEBUG_PANEL=1) ---
+if os.getenv("RAG_DEBUG_PANEL", "0") == "1":
+    import telemetry
+
+    with st.sidebar:
+        st.divider()
+        with st.expander("🩺 Request timings", expanded=False):
+            traces = telemetry.get_telemetry().recent_traces()
+            if traces:
+                last = traces[-1]
+                st.caption(f"Last request: {last['duration_ms']:.0f} ms ({last['attrs'].get('cache', '-')})")
+                st.bar_chart(last["stages_ms"])
+                st.json(last["attrs"], expanded=False)
+            else:
+                st.caption("No requests yet.")
+            st.json(telemetry.get_telemetry().registry.snapshot(), expanded=False)
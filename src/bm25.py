@@ -0,0 +1,178 @@
+import io
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[+#]+|(?:[.\-][a-z0-9]+)+)?")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its me my of on or our so that the their this "
+    "to was were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; keeps names like "c++", "yolov8", "llama-3.1" and "ros2" intact."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, keyed by the same chunk IDs as the FAISS index.
+
+    Everything lives in flat numpy arrays:
+      forward index   doc_indptr / doc_terms / doc_tfs   (CSR, one row per document)
+      inverted index  post_indptr / post_docs / post_tfs (CSR, one row per term)
+    Adds append to the forward index and deletes clear an `alive` flag; the inverted
+    index is re-derived from the forward one (one argsort) on the next search or save.
+    A query touches only the posting lists of its own terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.doc_ids = np.zeros(0, dtype="int64")
+        self.doc_lens = np.zeros(0, dtype="int32")
+        self.alive = np.zeros(0, dtype=bool)
+        self.doc_indptr = np.zeros(1, dtype="int64")
+        self.doc_terms = np.zeros(0, dtype="int32")
+        self.doc_tfs = np.zeros(0, dtype="uint16")
+        self.post_indptr = np.zeros(1, dtype="int64")
+        self.post_docs = np.zeros(0, dtype="int32")
+        self.post_tfs = np.zeros(0, dtype="uint16")
+        self._row: Dict[int, int] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    # --- mutation ----------------------------------------------------------
+
+    def add(self, ids: Iterable[int], texts: Iterable[str]):
+        lens, indptr, terms, tfs, new_ids = [], [], [], [], []
+        offset = int(self.doc_indptr[-1])
+        for cid, text in zip(ids, texts):
+            cid = int(cid)
+            if cid in self._row:
+                self.alive[self._row[cid]] = False
+            tokens = tokenize(text)
+            counts = Counter(tokens)
+            self._row[cid] = len(self.doc_ids) + len(new_ids)
+            new_ids.append(cid)
+            lens.append(len(tokens))
+            terms.extend([self.vocab.setdefault(token, len(self.vocab)) for token in counts])
+            tfs.extend(counts.values())
+            offset += len(counts)
+            indptr.append(offset)
+        if not new_ids:
+            return
+        self.doc_ids = np.concatenate([self.doc_ids, np.asarray(new_ids, dtype="int64")])
+        self.doc_lens = np.concatenate([self.doc_lens, np.asarray(lens, dtype="int32")])
+        self.alive = np.concatenate([self.alive, np.ones(len(new_ids), dtype=bool)])
+        self.doc_indptr = np.concatenate([self.doc_indptr, np.asarray(indptr, dtype="int64")])
+        self.doc_terms = np.concatenate([self.doc_terms, np.asarray(terms, dtype="int32")])
+        self.doc_tfs = np.concatenate([self.doc_tfs, np.minimum(tfs, 65535).astype("uint16")])
+        self._dirty = True
+
+    def remove(self, ids: Iterable[int]):
+        for cid in ids:
+            row = self._row.pop(int(cid), None)
+            if row is not None:
+                self.alive[row] = False
+                self._dirty = True
+
+    def _compact(self):
+        """Drop dead documents from the forward index and rebuild the inverted index."""
+        if not self._dirty:
+            return
+        if not self.alive.all():
+            keep = np.flatnonzero(self.alive)
+            counts = np.diff(self.doc_indptr)[keep]
+            entry_mask = np.repeat(self.alive, np.diff(self.doc_indptr))
+            self.doc_ids = self.doc_ids[keep]
+            self.doc_lens = self.doc_lens[keep]
+            self.doc_terms = self.doc_terms[entry_mask]
+            self.doc_tfs = self.doc_tfs[entry_mask]
+            self.doc_indptr = np.concatenate([[0], np.cumsum(counts)]).astype("int64")
+            self.alive = np.ones(len(keep), dtype=bool)
+            self._row = {int(cid): i for i, cid in enumerate(self.doc_ids)}
+
+        # Transpose forward -> inverted: sort entries by term, postings stay in doc order
+        entry_docs = np.repeat(np.arange(len(self.doc_ids), dtype="int32"), np.diff(self.doc_indptr))
+        order = np.argsort(self.doc_terms, kind="stable")
+        self.post_docs = entry_docs[order]
+        self.post_tfs = self.doc_tfs[order]
+        df = np.bincount(self.doc_terms, minlength=len(self.vocab))
+        self.post_indptr = np.concatenate([[0], np.cumsum(df)]).astype("int64")
+        self._dirty = False
+
+    # --- search ------------------------------------------------------------
+
+    def search(self, query: str, top_k: int = 10, allowed: np.ndarray = None) -> List[Tuple[int, float]]:
+        """
+        Return [(chunk_id, bm25_score)] best first; documents sharing no term are left out.
+        `allowed` (chunk IDs) restricts the results to those documents.
+        """
+        self._compact()
+        n_docs = len(self.doc_ids)
+        if n_docs == 0:
+            return []
+        terms = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not terms:
+            return []
+
+        avg_len = float(self.doc_lens.mean()) or 1.0
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lens / avg_len)
+        scores = np.zeros(n_docs, dtype="float32")
+        for term in terms:
+            start, end = self.post_indptr[term], self.post_indptr[term + 1]
+            if start == end:
+                continue
+            docs, tfs = self.post_docs[start:end], self.post_tfs[start:end].astype("float32")
+            idf = math.log(1 + (n_docs - (end - start) + 0.5) / ((end - start) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+
+        if allowed is not None:
+            scores[~np.isin(self.doc_ids, allowed)] = 0.0
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(self.doc_ids[i]), float(scores[i])) for i in matched]
+
+    # --- persistence -------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        self._compact()
+        vocab = np.array(sorted(self.vocab, key=self.vocab.get), dtype=str)
+        buf = io.BytesIO()
+        np.savez(
+            buf, params=np.array([self.k1, self.b]), vocab=vocab, doc_ids=self.doc_ids, doc_lens=self.doc_lens,
+            doc_indptr=self.doc_indptr, doc_terms=self.doc_terms, doc_tfs=self.doc_tfs,
+            post_indptr=self.post_indptr, post_docs=self.post_docs, post_tfs=self.post_tfs,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            index = cls(k1=float(data["params"][0]), b=float(data["params"][1]))
+            index.vocab = {term: i for i, term in enumerate(data["vocab"].tolist())}
+            for name in ("doc_ids", "doc_lens", "doc_indptr", "doc_terms", "doc_tfs",
+                         "post_indptr", "post_docs", "post_tfs"):
+                setattr(index, name, data[name])
+        index.alive = np.ones(len(index.doc_ids), dtype=bool)
+        index._row = {int(cid): i for i, cid in enumerate(index.doc_ids)}
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Merge ranked ID lists: score(d) = sum over lists of 1 / (k + rank). Best first."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking):
+            fused[cid] = fused.get(cid, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])
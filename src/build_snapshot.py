@@ -0,0 +1,46 @@
+"""
+Build-time snapshot of everything the app would otherwise build on first boot.
+
+Run once while building the image/container, after the code and data/MyData.md are in place:
+
+    python src/build_snapshot.py
+    python src/build_snapshot.py --profile data/MyData.md --out faiss_profile
+
+It (1) syncs the profile index into --out, so the app's startup just loads it,
+(2) downloads the embedding model into the Hugging Face cache (or exports ONNX
+when EMBEDDING_BACKEND is onnx/onnx-int8), and (3) pre-fills the embedding cache
+with the profile chunks. No GROQ_API_KEY is needed.
+"""
+import argparse
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="data/MyData.md", help="Profile document to index")
+    parser.add_argument("--out", default="faiss_profile", help="Profile store directory")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--skip-model", action="store_true", help="Do not prefetch the embedding model")
+    args = parser.parse_args()
+
+    from chat import sync_profile
+    from model_registry import acquire_model, release_model
+    from vector_database import FaissVectorStore
+
+    start = time.perf_counter()
+    if not args.skip_model:
+        acquire_model(args.model)
+        release_model(args.model)
+        print(f"📦 [Snapshot] Embedding model ready ({time.perf_counter() - start:.1f}s)")
+
+    store = FaissVectorStore(args.out, args.model)
+    changed = sync_profile(store, args.profile)
+    store.close()
+    if store.index is None:
+        raise SystemExit(f"❌ [Snapshot] No profile index built from {args.profile}")
+    print(f"✅ [Snapshot] {args.out}: {store.index.ntotal} chunks, version {store.version} "
+          f"({'rebuilt' if changed else 'already current'}) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
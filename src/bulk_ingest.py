@@ -0,0 +1,152 @@
+"""
+Bulk ingestion of a folder of documents into one FaissVectorStore.
+
+Parsing (PDF, DOCX, CSV, Markdown, text) and splitting run in a process pool, one
+file per task. Chunks flow back through a bounded queue to a single embedding
+thread that batches across files, so the encoder always sees full batches, and
+that thread is the only writer to the store.
+
+    python src/bulk_ingest.py data/ --out faiss_bulk --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, List, Optional
+
+from embedding import make_splitter
+from load_data import iter_documents
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".csv", ".txt", ".md")
+_DONE = object()
+
+
+def discover_files(paths: Iterable[str], extensions=SUPPORTED_EXTENSIONS) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() in extensions:
+                    files.append(os.path.join(root, name))
+    return files
+
+
+def parse_file(path: str, chunk_size: int, chunk_overlap: int, model_name: str):
+    """Worker-process task: load and split one file. Returns (path, pages, chunks)."""
+    splitter = make_splitter(chunk_size, chunk_overlap, model_name)
+    pages, chunks = 0, []
+    for doc in iter_documents(path):
+        pages += 1
+        chunks.extend(splitter.split_documents([doc]))
+    return path, pages, chunks
+
+
+class BulkIngestor:
+    def __init__(self, store: "FaissVectorStore", workers: Optional[int] = None,
+                 batch_size: int = 256, queue_size: int = 8):
+        self.store = store
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        # Bounded: if embedding falls behind, parsed files wait here instead of piling up in RAM
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.stats = {"files": 0, "failed": 0, "pages": 0, "chunks": 0, "added": 0}
+
+    def _embed_worker(self, errors: list):
+        emb_pipe = self.store.embedding_pipeline()
+        seen, batch = {}, []
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    break
+                batch.extend(item)
+                while len(batch) >= self.batch_size:
+                    self.stats["added"] += self.store.add_chunk_batch(batch[:self.batch_size], emb_pipe, seen)
+                    batch = batch[self.batch_size:]
+            if batch:
+                self.stats["added"] += self.store.add_chunk_batch(batch, emb_pipe, seen)
+        except Exception as e:
+            errors.append(e)
+            # Keep draining so the producer never blocks on a dead consumer
+            while self._queue.get() is not _DONE:
+                pass
+        finally:
+            emb_pipe.close()
+
+    def run(self, files: List[str]) -> dict:
+        start = time.perf_counter()
+        errors = []
+        embedder = threading.Thread(target=self._embed_worker, args=(errors,), name="bulk-embedder")
+        embedder.start()
+        try:
+            # spawn, not fork: the parent already holds torch/faiss thread pools
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                futures = [pool.submit(parse_file, f, self.store.chunk_size, self.store.chunk_overlap, self.store.embedding_model) for f in files]
+                for future in as_completed(futures):
+                    try:
+                        path, pages, chunks = future.result()
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        print(f"❌ [Bulk] Parse failed: {e}")
+                        continue
+                    self.stats["files"] += 1
+                    self.stats["pages"] += pages
+                    self.stats["chunks"] += len(chunks)
+                    if chunks:
+                        self._queue.put(chunks)
+                    print(f"📄 [Bulk] {os.path.basename(path)}: {pages} pages, {len(chunks)} chunks")
+        finally:
+            self._queue.put(_DONE)
+            embedder.join()
+        if errors:
+            raise errors[0]
+
+        self.store.finalize()
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] = elapsed
+        self.stats["files_per_s"] = self.stats["files"] / elapsed if elapsed else 0.0
+        self.stats["pages_per_s"] = self.stats["pages"] / elapsed if elapsed else 0.0
+        self.stats["chunks_per_s"] = self.stats["chunks"] / elapsed if elapsed else 0.0
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or folders to index")
+    parser.add_argument("--out", default="faiss_bulk", help="Store directory")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPUs - 1)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch")
+    parser.add_argument("--backend", default="auto", help="Index backend: auto, flat, hnsw, ivf, ivfpq")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    files = discover_files(args.paths)
+    if not files:
+        print("⚠️ [Bulk] No supported files found.")
+        return
+    print(f"📂 [Bulk] Indexing {len(files)} files into '{args.out}' with {args.workers or 'auto'} workers...")
+
+    # Only the parent needs FAISS and the model; parser processes stay light
+    from index_factory import IndexConfig
+    from vector_database import FaissVectorStore
+
+    store = FaissVectorStore(args.out, args.model, index_config=IndexConfig(backend=args.backend))
+    store.load()
+    stats = BulkIngestor(store, workers=args.workers, batch_size=args.batch_size).run(files)
+    store.close()
+    print(
+        f"✅ [Bulk] {stats['files']} files ({stats['failed']} failed), {stats['pages']} pages, "
+        f"{stats['chunks']} chunks ({stats['added']} new) in {stats['seconds']:.1f}s -> "
+        f"{stats['files_per_s']:.2f} files/s, {stats['pages_per_s']:.1f} pages/s, {stats['chunks_per_s']:.1f} chunks/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
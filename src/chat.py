@@ -1,118 +1,325 @@
 import os
 import shutil
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from load_data import load_documents      
+from load_data import load_documents, iter_documents, file_digest
 from vector_database import FaissVectorStore  
+from user_stores import UserStoreManager
+from query_cache import QueryCache
+from embedding_service import get_embedding_service
+from context_builder import ContextBuilder, make_token_counter
+from full_context import FullContextCache
+from index_jobs import DONE, IndexJob, IndexJobQueue
+import telemetry
+from telemetry import TOKEN_BUCKETS
 
 load_dotenv()
 
+def sync_profile(store: FaissVectorStore, profile_path: str) -> bool:
+    """
+    Load `store` and bring it in line with the profile file. Returns True if the index changed.
+    A snapshot built by build_snapshot.py from the same file loads without touching the model.
+    """
+    loaded = store.load()
+    if not os.path.exists(profile_path):
+        if not loaded:
+            print(f"❌ Error: Profile file not found at {profile_path}")
+        return False
+
+    source_hash = file_digest(profile_path, length=64)
+    if loaded and store.manifest["sources"].get(profile_path) == source_hash:
+        print("✅ Loading existing Profile DB (No changes detected).")
+        return False
+
+    print(f"🔄 Syncing profile file: {profile_path}")
+    try:
+        docs = load_documents(profile_path)
+    except Exception:
+        # Syncing a half-read file would delete the chunks it failed to read; keep the old index
+        print("⚠️ Profile file could not be read; keeping the existing Profile DB.")
+        return False
+    added, removed = store.sync_documents(docs, {profile_path: source_hash})
+    print(f"✅ Profile DB updated successfully! (+{added} / -{removed} chunks)")
+    return True
+
+
 class RAGSearch:
-    def __init__(self, persist_dir_profile: str = "faiss_profile", persist_dir_user: str = "faiss_user"):
+    """
+    Process-wide RAG engine. The profile index and the LLM client are read-only and
+    shared by every caller; user uploads live in per-session stores (see UserStoreManager).
+    Use get_engine() rather than constructing this per session.
+
+    startup_mode:
+      "fast"  - load the prebuilt profile snapshot only; the embedding model warms up in a
+                background thread, document loaders load on first upload and the LLM
+                client on first answer (default)
+      "lazy"  - as "fast", without the background warm-up
+      "eager" - load the embedding model and the LLM client before returning
+    """
+    def __init__(self, persist_dir_profile: str = "faiss_profile", persist_dir_user: str = "faiss_user",
+                 max_user_sessions: int = 32, user_idle_ttl: float = 3600, user_disk_ttl: float = 24 * 3600,
+                 startup_mode: str = "fast"):
         print("🛡️ [Init] Initializing RAG Engines...")
+        boot_start = time.perf_counter()
+        self.startup_mode = startup_mode
+        self.boot_timings = {}
+        if not os.getenv("GROQ_API_KEY"):
+            raise ValueError("❌ GROQ_API_KEY not found.")
         
         self.embedding_model = "all-MiniLM-L6-v2"
         self.user_db_path = persist_dir_user
+        # Chunks embedded per batch during uploads; bounds ingestion memory
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+        # Answers keyed by (store, query, mode, index version); see QueryCache
+        self.query_cache = QueryCache(
+            max_entries=int(os.getenv("QUERY_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+            similarity_threshold=float(os.getenv("QUERY_CACHE_SIMILARITY", "0.93")),
+        )
 
         # --- BRAIN 1: YOUR PROFILE (Permanent) ---
         self.profile_store = FaissVectorStore(persist_dir_profile, self.embedding_model)
-        my_profile_path = "data/MyData.md"
-        profile_db_exists = os.path.exists(os.path.join(persist_dir_profile, "faiss.index"))
-        
-        should_rebuild = False
-        
-        if profile_db_exists and os.path.exists(my_profile_path):
-            file_mtime = os.path.getmtime(my_profile_path)
-            db_mtime = os.path.getmtime(persist_dir_profile)
-            
-            if file_mtime > db_mtime:
-                print("🔄 Detect change in MyData.md. Rebuilding database...")
-                should_rebuild = True
-        
-        if not profile_db_exists or should_rebuild:
-            if os.path.exists(my_profile_path):
-                print(f"📂 Loading profile file: {my_profile_path}")
-                if should_rebuild:
-                    self.profile_store.clear()
-                    self.profile_store = FaissVectorStore(persist_dir_profile, self.embedding_model)
-
-                docs = load_documents(my_profile_path)
-                self.profile_store.build_from_documents(docs)
-                print("✅ Profile DB updated successfully!")
-            else:
-                print(f"❌ Error: Profile file not found at {my_profile_path}")
-        else:
-            print("✅ Loading existing Profile DB (No changes detected).")
-            self.profile_store.load()
+        self.profile_path = "data/MyData.md"
+        phase = time.perf_counter()
+        self.refresh_profile()
+        self.boot_timings["profile_s"] = time.perf_counter() - phase
+
+        # --- BRAIN 2: USER UPLOADS (Per session, LRU-bounded) ---
+        phase = time.perf_counter()
+        self.user_stores = UserStoreManager(
+            persist_dir_user, self.embedding_model,
+            max_sessions=max_user_sessions, idle_ttl=user_idle_ttl, disk_ttl=user_disk_ttl
+        )
+        self.boot_timings["user_stores_s"] = time.perf_counter() - phase
+        # Uploads are indexed on background workers; the UI polls the job
+        self.index_jobs = IndexJobQueue(workers=int(os.getenv("INDEX_WORKERS", "2")))
+
+        # Prompt context is packed into this many tokens (counted with a real tokenizer)
+        self.context_builder = ContextBuilder(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+            # tokenizer.json only: counting must not load the embedding model (see make_token_counter)
+            token_counter=make_token_counter(model_name=self.embedding_model),
+        )
+        # A store whose whole text fits this many tokens is answered from all of it, skipping
+        # embedding and search (see full_context.py); 0 always retrieves
+        self.full_context = FullContextCache(
+            self.context_builder, token_budget=int(os.getenv("FULL_CONTEXT_BUDGET", "3000")),
+        )
 
-        # --- BRAIN 2: USER UPLOAD (Temporary) ---
-        self.user_store = FaissVectorStore(persist_dir_user, self.embedding_model)
-        if os.path.exists(os.path.join(persist_dir_user, "faiss.index")):
-            self.user_store.load()
+        # --- BRAIN 3: THE LLM (built on first answer) ---
+        self._llm = None
+        self._llm_lock = threading.Lock()
 
-        # --- BRAIN 3: THE LLM ---
-        self.llm = self._initialize_robust_llm()
+        if startup_mode == "eager":
+            phase = time.perf_counter()
+            self.warm_up()
+            self._llm = self._initialize_robust_llm()
+            self.boot_timings["warm_up_s"] = time.perf_counter() - phase
+        elif startup_mode == "fast":
+            threading.Thread(target=self.warm_up, name="engine-warm-up", daemon=True).start()
+
+        self.boot_timings["total_s"] = time.perf_counter() - boot_start
+        print(f"✅ [Init] Engine ready in {self.boot_timings['total_s']:.2f}s ({startup_mode} start: "
+              f"profile {self.boot_timings['profile_s']:.2f}s, user stores {self.boot_timings['user_stores_s']:.2f}s)")
+
+    def warm_up(self):
+        """Load the embedding model and run one encode so the first query does not pay for it."""
+        start = time.perf_counter()
+        try:
+            get_embedding_service(self.embedding_model).encode(["warm up"])
+        except Exception as e:
+            print(f"⚠️ [Init] Embedding warm-up failed: {e}")
+            return
+        self.boot_timings["model_warm_s"] = time.perf_counter() - start
+        print(f"🔥 [Init] Embedding model warm in {self.boot_timings['model_warm_s']:.2f}s")
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = self._initialize_robust_llm()
+        return self._llm
+
+    def refresh_profile(self):
+        """
+        Bring the profile index in line with MyData.md.
+        Change detection uses the file's content hash recorded in the manifest (not mtimes),
+        and only added/removed/edited chunks are embedded or deleted.
+        """
+        if sync_profile(self.profile_store, self.profile_path):
+            # New index version: cached profile answers are stale
+            self.query_cache.invalidate("profile")
 
     def _initialize_robust_llm(self, temperature=0.1):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key: raise ValueError("❌ GROQ_API_KEY not found.")
-
-        config = {
-            "temperature": temperature,
-            "max_tokens": 512,
-            "api_key": api_key,
-            "max_retries": 1,
-            "model_kwargs": {"top_p": 0.9}
-        }
-
-        # Priority List
+        # Priority List: always tried in this order; observed TTFT only sets when to hedge
         primary_model = "llama-3.3-70b-versatile"
         fallback_models = ["llama-3.1-8b-instant", "mixtral-8x7b-32768"]
 
-        print(f"🤖 [LLM] Primary: {primary_model}")
-        
-        primary = ChatGroq(model=primary_model, **config)
-        fallbacks = [ChatGroq(model=m, **config) for m in fallback_models]
-        
-        return primary.with_fallbacks(fallbacks)
+        print(f"🤖 [LLM] Primary: {primary_model} (hedge after {os.getenv('LLM_HEDGE_AFTER', '1.5')}s)")
 
-    def process_user_upload(self, file_path_or_obj):
-        print("📂 [Upload] Processing new user file...")
-        
-        # 1. Wipe old data
-        self.user_store.clear()
-        
-        # 2. Re-initialize
-        self.user_store = FaissVectorStore(self.user_db_path, self.embedding_model)
-        
-        # 3. Load & Build
-        original_name = file_path_or_obj.name
-        docs = load_documents(file_path_or_obj)
-        if docs:
-            for doc in docs:
-                doc.metadata["source"] = original_name
-                if "page" not in doc.metadata:
-                    doc.metadata["page"] = 1
-
-            self.user_store.build_from_documents(docs)
-            return True, f"Successfully indexed {original_name}"
-        return False, "Failed to extract text from file."
-
-    def search_and_answer(self, query: str, top_k: int = 6, mode: str = "profile"):
+        # One pooled async client; a slow model is hedged with the next one instead of waited out
+        from llm_client import llm_from_env
+        return llm_from_env([primary_model] + fallback_models, temperature=temperature)
+
+    def submit_upload(self, file_path_or_obj, session_id: str = "default", name: str = None,
+                      delete_after: bool = False) -> IndexJob:
+        """
+        Queue a file path or Streamlit upload for background indexing and return its job.
+        The same file is never indexed twice: an already-indexed file is just activated, and a
+        file already queued returns that job. A new file cancels the session's previous job.
+        `name` overrides the displayed file name; with `delete_after`, a path is a temp file
+        handed over to this call and removed once it is no longer needed.
+        """
+        original_name = os.path.basename(name or getattr(file_path_or_obj, "name", file_path_or_obj))
+        doc_id = file_digest(file_path_or_obj)
+        key = f"{session_id}:{doc_id}"
+        if doc_id is None:
+            job = IndexJob.completed(key, original_name, "Failed to read the uploaded file.", status="failed")
+            self.index_jobs.track(job)
+        elif self.user_stores.is_indexed(session_id, doc_id):
+            print(f"♻️ [Upload] {original_name} already indexed ({doc_id}), reusing it.")
+            job = IndexJob.completed(key, original_name, f"Switched to {original_name}", group=session_id)
+            # Cancels the session's in-flight upload first, so it cannot finish and switch back
+            self.index_jobs.track(job)
+            self.user_stores.activate(session_id, doc_id)
+        else:
+            existing = self.index_jobs.find(key)
+            if existing is None or existing.done or existing.cancelled:
+                # The upload object belongs to this Streamlit run; the worker reads a private copy
+                path, spooled = self._spool(file_path_or_obj)
+                job = self.index_jobs.submit(
+                    key, original_name,
+                    lambda job: self._index_upload(job, path, session_id, doc_id, original_name,
+                                                   spooled or delete_after),
+                    group=session_id,
+                )
+                print(f"📥 [Upload] Queued {original_name} for session {session_id} ({job.job_id})")
+                return job
+            job = existing
+        if delete_after and isinstance(file_path_or_obj, str) and os.path.exists(file_path_or_obj):
+            os.remove(file_path_or_obj)
+        return job
+
+    @staticmethod
+    def _spool(file_path_or_obj):
+        if isinstance(file_path_or_obj, str):
+            return file_path_or_obj, False
+        suffix = os.path.splitext(file_path_or_obj.name)[1]
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            file_path_or_obj.seek(0)
+            shutil.copyfileobj(file_path_or_obj, tmp, 1 << 20)
+        return tmp.name, True
+
+    def _index_upload(self, job: IndexJob, path: str, session_id: str, doc_id: str, original_name: str,
+                      spooled: bool = False, progress_callback=None) -> str:
+        try:
+            job.check()
+            # One build at a time per session; a replaced job stops at its next batch
+            with self.user_stores.session_lock(session_id):
+                job.check()
+                # Registered (and active) before the first batch: committed batches are searchable at once
+                user_store = self.user_stores.begin(session_id, doc_id, original_name)
+
+                def tagged(docs):
+                    for doc in docs:
+                        doc.metadata["source"] = original_name
+                        if "page" not in doc.metadata:
+                            # 0-based, like PyPDFLoader pages: cited as "Pg 1"
+                            doc.metadata["page"] = 0
+                        yield doc
+
+                def on_batch(progress):
+                    job.update(**progress)
+                    if progress_callback:
+                        progress_callback(progress)
+                    job.check()
+
+                try:
+                    # Stream pages -> chunks -> embedding batches -> index
+                    user_store.build_from_stream(
+                        tagged(iter_documents(path)),
+                        batch_size=self.ingest_batch_size,
+                        progress_callback=on_batch,
+                    )
+                    # Replaced after its last batch: it must not become the active document
+                    job.check()
+                except BaseException:
+                    self.user_stores.abort(session_id, doc_id)
+                    raise
+                if user_store.index is None:
+                    self.user_stores.abort(session_id, doc_id)
+                    raise ValueError("Failed to extract text from file.")
+                self.user_stores.register(session_id, doc_id, original_name)
+                return f"Successfully indexed {original_name}"
+        finally:
+            if spooled and os.path.exists(path):
+                os.remove(path)
+
+    def process_user_upload(self, file_path_or_obj, session_id: str = "default", progress_callback=None):
+        """Index an upload in the calling thread; returns (success, message)."""
+        print(f"📂 [Upload] Processing new user file for session {session_id}...")
+        original_name = os.path.basename(getattr(file_path_or_obj, "name", file_path_or_obj))
+        doc_id = file_digest(file_path_or_obj)
+        if doc_id is None:
+            return False, "Failed to read the uploaded file."
+        if self.user_stores.activate(session_id, doc_id):
+            print(f"♻️ [Upload] {original_name} already indexed ({doc_id}), reusing it.")
+            return True, f"Switched to {original_name}"
+
+        path, spooled = self._spool(file_path_or_obj)
+        job = IndexJob(f"{session_id}:{doc_id}", original_name, group=session_id,
+                       fn=lambda job: self._index_upload(job, path, session_id, doc_id, original_name, spooled,
+                                                         progress_callback))
+        job.run()
+        return job.status == DONE, job.message
+
+    def search_and_answer(self, query: str, top_k: int = 6, mode: str = "profile",
+                          session_id: str = "default", doc_id: str = None):
         """
         mode="profile" -> Searches ONLY Profile DB. Acts as Chetan.
-        mode="document" -> Searches ONLY User DB. Acts as Analyst.
+        mode="document" -> Searches ONLY the session's User DB (active document unless doc_id is given). Acts as Analyst.
         """
-        docs = []
+        # One trace per request; every stage below (and in the stores) records into it
+        with telemetry.trace("rag.request", mode=mode, top_k=top_k) as request:
+            telemetry.inc("rag_requests_total", mode=mode)
+            # CPU is process time while this request runs, not while the caller holds a token;
+            # it includes the embedding batcher and LLM loop threads working for it (and, under
+            # concurrency, for other requests at the same moment)
+            cpu = 0.0
+            answer = self._answer(query, top_k, mode, session_id, doc_id)
+            try:
+                while True:
+                    resumed = time.process_time()
+                    try:
+                        token = next(answer)
+                    except StopIteration:
+                        break
+                    finally:
+                        cpu += time.process_time() - resumed
+                    yield token
+            finally:
+                answer.close()
+                path = request.attrs.get("path", "none")
+                request.set(cpu_ms=round(cpu * 1000, 2))
+                telemetry.observe("rag_request_cpu_seconds", cpu, path=path)
+                telemetry.observe("rag_request_seconds", time.perf_counter() - request.start, path=path)
+
+    def _answer(self, query: str, top_k: int, mode: str, session_id: str, doc_id: str):
+        request = telemetry.get_telemetry().current()
+        store = None
+        indexing = False
         active_persona_prompt = ""
         
         # MODE 1: CHAT WITH CHETAN (Profile DB)
         if mode == "profile":
             if not self.profile_store.index:
-                return "My profile database isn't ready. Please check logs."
-            
-            # Simple, Direct Search
-            docs = self.profile_store.query(query, top_k=top_k)
+                yield "My profile database isn't ready. Please check logs."
+                return
+            store = self.profile_store
             
             active_persona_prompt = (
                 "You are Chetan Kamatagi. Answer in the first person ('I', 'my'). "
@@ -122,11 +329,23 @@ class RAGSearch:
 
         # MODE 2: CHAT WITH DOCUMENT (User DB)
         elif mode == "document":
-            if not self.user_store.index:
-                return "Please upload a document first so I can analyze it."
-            
-            # Simple, Direct Search (No summarization hacks needed)
-            docs = self.user_store.query(query, top_k=top_k)
+            user_store = self.user_stores.get(session_id, doc_id)
+            job = self.index_jobs.latest(session_id)
+            pending = job is not None and not job.done
+            # Is the document being asked about the one still being indexed?
+            indexing = pending and job.key == f"{session_id}:{doc_id or self.user_stores.active_document(session_id)}"
+            if user_store is None or not user_store.index:
+                if pending:
+                    yield f"⏳ Still reading **{job.name}**. Ask again in a moment, once the first pages are indexed."
+                else:
+                    yield "Please upload a document first so I can analyze it."
+                return
+            store = user_store
+            if indexing:
+                pages = job.progress.get("pages", 0)
+                total = job.progress.get("total_pages")
+                read = f"{pages}/{total} pages" if total else f"{pages} pages"
+                yield f"⏳ _{job.name} is still being indexed ({read} so far); this answer covers only those._\n\n"
             
             active_persona_prompt = (
                 "You are a helpful AI Assistant analyzing a document uploaded by the user. "
@@ -134,39 +353,131 @@ class RAGSearch:
                 "Do not assume the persona of the document's author."
             )
 
-        # GENERATION
-        if not docs:
+        if store is None:
             yield "I couldn't find relevant information in the selected source."
             return
 
-        texts = []
+        # SMALL CORPUS: the whole store fits the prompt, so there is nothing to retrieve
+        full = self.full_context.get(store)
+        request.set(path="full_context" if full is not None else "retrieval")
+
+        # ANSWER CACHE: exact match costs nothing; a near-duplicate costs one query encode.
+        # Versions of unsaved stores repeat across stores ("unsaved+3"), so entries are also
+        # namespaced by the store's own directory: one session never sees another's answers.
+        namespace = store.persist_dir
+        index_version = f"{store.version}:full" if full is not None else f"{store.version}:k{top_k}"
+        with telemetry.span("cache.lookup"):
+            cached = self.query_cache.get_exact(query, mode, index_version, namespace=namespace)
+        cache_kind = "exact"
+        query_emb = None
+        if cached is None and full is None:
+            query_emb = store.embed_query(query)
+            with telemetry.span("cache.lookup"):
+                cached = self.query_cache.get_similar(query_emb, mode, index_version, namespace=namespace)
+            cache_kind = "similar"
+        if cached is not None:
+            telemetry.inc("rag_cache_hits_total", kind=cache_kind)
+            request.set(cache=cache_kind)
+            yield from self.query_cache.replay(cached)
+            return
+        telemetry.inc("rag_cache_misses_total")
+        request.set(cache="miss")
+
+        if full is not None:
+            # No embedding, search or packing: the prefix was built once for this store version
+            with telemetry.span("context.full"):
+                prompt_prefix = full.prefix(active_persona_prompt)
+            blocks = full.blocks
+            telemetry.observe("rag_context_tokens", full.stats["tokens_packed"], TOKEN_BUCKETS)
+            request.set(chunks=full.stats["chunks_in"], context_tokens=full.stats["tokens_packed"])
+        else:
+            # Simple, Direct Search (No summarization hacks needed)
+            with telemetry.span("retrieve", top_k=top_k):
+                docs = store.query(query, top_k=top_k, query_embedding=query_emb)
+
+            # GENERATION
+            if not docs:
+                yield "I couldn't find relevant information in the selected source."
+                return
+
+            # Stitch overlapping chunks, drop near-duplicates, pack into the token budget
+            with telemetry.span("context.build"):
+                built = self.context_builder.build(docs)
+            stats = built.stats
+            telemetry.observe("rag_context_tokens", stats["tokens_packed"], TOKEN_BUCKETS)
+            telemetry.inc("rag_context_tokens_saved_total", stats["tokens_saved"])
+            request.set(chunks=stats["chunks_in"], context_tokens=stats["tokens_packed"])
+            print(f"[INFO] Context: {stats['chunks_in']} chunks -> {stats['blocks_out']} blocks, "
+                  f"{stats['tokens_raw']} -> {stats['tokens_packed']} tokens (saved {stats['tokens_saved']})")
+
+            context = built.text
+            prompt_prefix = f"{active_persona_prompt}\n\nCONTEXT:\n{context}\n\n"
+            blocks = built.blocks
+
         source_list = []
-        for r in docs:
-            meta = r.get('metadata', {})
-            texts.append(meta.get('text', ''))
-            src = meta.get('source', 'Unknown')
-            page = meta.get('page', 0) + 1
-            source_list.append(f"{os.path.basename(src)} (Pg {page + 1})")
+        for block in blocks:
+            src = block.source
+            page = block.page + 1  # stored 0-based
+            source_list.append(f"{os.path.basename(src)} (Pg {page})")
         
-        context = "\n\n".join(texts)
         unique_sources = sorted(list(set(source_list)))
-        system_prompt = (
-            f"{active_persona_prompt}\n\n"
-            f"CONTEXT:\n{context}\n\n"
-            f"USER QUESTION: {query}\n\n"
-            "ANSWER:"
-        )
+        # The question goes last, so everything before it is a prefix shared across questions
+        question = f"USER QUESTION: {query}\n\nANSWER:"
+        system_prompt = prompt_prefix + question
 
+        if full is not None:
+            # The corpus was counted once when the prefix was built; count only the rest
+            prompt_tokens = full.stats["tokens_packed"] + self.context_builder.count_tokens(
+                f"{active_persona_prompt}\n\nCONTEXT:\n\n\n{question}")
+        else:
+            prompt_tokens = self.context_builder.count_tokens(system_prompt)
+        telemetry.observe("rag_prompt_tokens", prompt_tokens, TOKEN_BUCKETS)
+        request.set(prompt_tokens=prompt_tokens)
+
+        answer = []
         try:
-            for chunk in self.llm.stream(system_prompt):
-                if chunk.content:
-                    yield chunk.content
-            yield f"\n\n---\n**📚 References:** {', '.join(unique_refs)}"
+            with telemetry.span("llm.generate") as generate:
+                for token in self.llm.stream(system_prompt):
+                    if not answer:
+                        ttft = time.perf_counter() - generate.start
+                        telemetry.observe("rag_llm_ttft_seconds", ttft)
+                        request.set(ttft_ms=round(ttft * 1000, 1))
+                    answer.append(token)
+                    yield token
+                generate.set(tokens=len(answer))
+            references = f"\n\n---\n**📚 References:** {', '.join(unique_sources)}"
+            answer.append(references)
+            yield references
         except Exception as e:
-            return f"❌ Error: {e}"
+            yield f"❌ Error: {e}"
+            return
+        # Only complete, successful answers over a finished, saved index are replayed later
+        if not indexing and not store.unsaved:
+            self.query_cache.put(query, mode, index_version, "".join(answer), embedding=query_emb,
+                                 namespace=namespace)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RAGSearch:
+    """Return the process-wide engine, building it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RAGSearch(
+                    max_user_sessions=int(os.getenv("MAX_USER_SESSIONS", "32")),
+                    user_idle_ttl=float(os.getenv("USER_STORE_IDLE_TTL", "3600")),
+                    user_disk_ttl=float(os.getenv("USER_STORE_DISK_TTL", str(24 * 3600))),
+                    startup_mode=os.getenv("STARTUP_MODE", "fast"),
+                )
+    return _engine
+
 
 if __name__ == "__main__":
-    bot = RAGSearch()
+    bot = get_engine()
     
     # --- TEST 1: PROFILE ---
     print("\nTest 1 (Profile):")
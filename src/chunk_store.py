@@ -0,0 +1,152 @@
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+# One row per chunk, sorted by id so lookups are a binary search over a memory map
+ROW_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("text_off", "<i8"),
+    ("text_len", "<i4"),
+    ("meta_off", "<i8"),
+    ("meta_len", "<i4"),
+])
+
+
+def _open_blob(path: str):
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore:
+    """
+    Columnar, memory-mapped chunk metadata keyed by chunk ID.
+
+    A saved generation is three files in the store directory:
+      <gen>.rows.npy  - ROW_DTYPE table sorted by id (np.load mmap_mode="r")
+      <gen>.text      - UTF-8 chunk texts, back to back
+      <gen>.meta      - JSON metadata records (everything except "text"), back to back
+    Opening is O(1): nothing is decoded until get() asks for a specific ID.
+    Writes go to an in-memory overlay and are merged into a new generation by save().
+    Behaves like a dict of chunk ID -> metadata (with "text") for FaissVectorStore.
+    """
+
+    def __init__(self):
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._text = b""
+        self._meta = b""
+        # Overlay: new/replaced records, and base IDs hidden by a delete or a replace
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._masked = set()
+        self.generation: Optional[str] = None
+
+    @classmethod
+    def open(cls, directory: str, generation: str) -> "ChunkStore":
+        store = cls()
+        base = os.path.join(directory, generation)
+        store._rows = np.load(f"{base}.rows.npy", mmap_mode="r")
+        store._text = _open_blob(f"{base}.text")
+        store._meta = _open_blob(f"{base}.meta")
+        store.generation = generation
+        return store
+
+    # --- lookups -----------------------------------------------------------
+
+    def _row(self, chunk_id: int) -> Optional[int]:
+        ids = self._rows["id"]
+        pos = int(np.searchsorted(ids, chunk_id))
+        if pos < len(ids) and ids[pos] == chunk_id:
+            return pos
+        return None
+
+    def _decode(self, pos: int) -> Dict[str, Any]:
+        row = self._rows[pos]
+        meta = json.loads(bytes(self._meta[row["meta_off"]:row["meta_off"] + row["meta_len"]]))
+        meta["text"] = bytes(self._text[row["text_off"]:row["text_off"] + row["text_len"]]).decode("utf-8")
+        return meta
+
+    def get(self, chunk_id: int, default=None) -> Optional[Dict[str, Any]]:
+        chunk_id = int(chunk_id)
+        if chunk_id in self._pending:
+            return self._pending[chunk_id]
+        if chunk_id in self._masked:
+            return default
+        pos = self._row(chunk_id)
+        return default if pos is None else self._decode(pos)
+
+    def __getitem__(self, chunk_id: int) -> Dict[str, Any]:
+        meta = self.get(chunk_id)
+        if meta is None:
+            raise KeyError(chunk_id)
+        return meta
+
+    def __contains__(self, chunk_id) -> bool:
+        chunk_id = int(chunk_id)
+        if chunk_id in self._pending:
+            return True
+        return chunk_id not in self._masked and self._row(chunk_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        for chunk_id in self._rows["id"]:
+            chunk_id = int(chunk_id)
+            if chunk_id not in self._masked:
+                yield chunk_id
+        yield from list(self._pending)
+
+    def __len__(self) -> int:
+        return len(self._rows) - len(self._masked) + len(self._pending)
+
+    # --- mutation ----------------------------------------------------------
+
+    def __setitem__(self, chunk_id: int, meta: Dict[str, Any]):
+        chunk_id = int(chunk_id)
+        if self._row(chunk_id) is not None:
+            self._masked.add(chunk_id)
+        self._pending[chunk_id] = meta
+
+    def pop(self, chunk_id: int, default=None):
+        chunk_id = int(chunk_id)
+        meta = self.get(chunk_id, default)
+        self._pending.pop(chunk_id, None)
+        if self._row(chunk_id) is not None:
+            self._masked.add(chunk_id)
+        return meta
+
+    def save(self, directory: str, generation: str):
+        """Write a compacted generation (base rows + overlay, sorted by id)."""
+        base = os.path.join(directory, generation)
+        base_ids = np.asarray(self._rows["id"])
+        if self._masked:
+            base_ids = base_ids[~np.isin(base_ids, np.fromiter(self._masked, dtype="int64"))]
+        all_ids = np.sort(np.concatenate([base_ids, np.fromiter(self._pending, dtype="int64", count=len(self._pending))]))
+        rows = np.zeros(len(all_ids), dtype=ROW_DTYPE)
+        text_off = meta_off = 0
+        with open(f"{base}.text", "wb") as text_f, open(f"{base}.meta", "wb") as meta_f:
+            for i, cid in enumerate(all_ids.tolist()):
+                if cid in self._pending:
+                    meta = dict(self._pending[cid])
+                    text = meta.pop("text", "").encode("utf-8")
+                    meta_bytes = json.dumps(meta, default=str).encode("utf-8")
+                else:
+                    # Copy untouched records byte-for-byte, no decode
+                    row = self._rows[self._row(cid)]
+                    text = bytes(self._text[row["text_off"]:row["text_off"] + row["text_len"]])
+                    meta_bytes = bytes(self._meta[row["meta_off"]:row["meta_off"] + row["meta_len"]])
+                text_f.write(text)
+                meta_f.write(meta_bytes)
+                rows[i] = (cid, text_off, len(text), meta_off, len(meta_bytes))
+                text_off += len(text)
+                meta_off += len(meta_bytes)
+        np.save(f"{base}.rows.npy", rows)
+        return ChunkStore.open(directory, generation)
+
+    @staticmethod
+    def remove_generation(directory: str, generation: str):
+        for suffix in (".rows.npy", ".text", ".meta"):
+            path = os.path.join(directory, generation + suffix)
+            if os.path.exists(path):
+                os.remove(path)
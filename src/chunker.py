@@ -0,0 +1,256 @@
+"""
+Token-based, structure-aware chunking.
+
+Chunk sizes are counted in tokens of the embedding model's own tokenizer, so a
+chunk is never longer than what the model embeds (MiniLM truncates at 256
+word pieces, and anything past that was silently dropped from the vector).
+
+Splitting follows the document's structure:
+  - A chunk never spans two documents, so PDF pages (one document each) stay separate.
+  - Markdown headings start a new section; small consecutive sections are packed
+    into one chunk, and each chunk records the heading path it starts under.
+  - Inside a section that is too long, chunks end at the strongest boundary in
+    the second half of the window: paragraph > line > sentence > word. A chunk
+    never ends inside a word.
+
+Every text is tokenized once (the Rust `tokenizers` library, with offsets) and
+windows are cut over the token offsets, so multi-megabyte texts split in linear
+time. Each chunk is an exact slice of its document; its metadata records
+start_index / end_index (characters), tokens and section for citations.
+
+Only tokenizer.json is loaded (no transformers/torch import), so the chunker
+is cheap to build in ingestion worker processes.
+"""
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# One default for every ingestion path (FaissVectorStore, EmbeddingPipeline, bulk ingest)
+CHUNK_TOKENS = 224
+CHUNK_OVERLAP_TOKENS = 32
+# Tokens the model adds around every input ([CLS] ... [SEP])
+SPECIAL_TOKENS = 2
+
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+_REGEX_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Strength of the boundary before a token; a window prefers the strongest, then the latest
+PARAGRAPH, LINE, SENTENCE, WORD, INSIDE_WORD = 4, 3, 2, 1, 0
+
+
+class Chunk(NamedTuple):
+    start: int
+    end: int
+    tokens: int
+    section: str
+
+
+class _RegexTokenizer:
+    """Fallback when the model's tokenizer.json is unavailable: words and punctuation as tokens."""
+
+    def offsets(self, texts: List[str]) -> List[np.ndarray]:
+        return [np.array([m.span() for m in _REGEX_TOKEN.finditer(t)], dtype="int64").reshape(-1, 2) for t in texts]
+
+
+class _HFTokenizer:
+    def __init__(self, path: str):
+        from tokenizers import Tokenizer
+        self.tokenizer = Tokenizer.from_file(path)
+        # tokenizer.json may carry the model's truncation/padding; counting needs neither
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+
+    def offsets(self, texts: List[str]) -> List[np.ndarray]:
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [np.array(e.offsets, dtype="int64").reshape(-1, 2) for e in encodings]
+
+
+def _model_file(model_name: str, filename: str) -> Optional[str]:
+    """A file of a local model directory, or of the sentence-transformers repo in the HF cache."""
+    local = os.path.join(model_name, filename)
+    if os.path.isfile(local):
+        return local
+    try:
+        from huggingface_hub import hf_hub_download
+        repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        return hf_hub_download(repo, filename)
+    except Exception:
+        return None
+
+
+def _model_max_tokens(model_name: str) -> Optional[int]:
+    for filename, key in (("sentence_bert_config.json", "max_seq_length"), ("tokenizer_config.json", "model_max_length")):
+        path = _model_file(model_name, filename)
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f).get(key)
+            if isinstance(value, int) and value < 100_000:
+                return value
+    return None
+
+
+_tokenizers: Dict[str, Tuple[Any, Optional[int]]] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(model_name: str):
+    """(tokenizer, max_seq_length) for `model_name`, loaded once per process."""
+    with _tokenizers_lock:
+        if model_name not in _tokenizers:
+            path = _model_file(model_name, "tokenizer.json")
+            try:
+                tokenizer = _HFTokenizer(path) if path else None
+            except Exception as e:
+                print(f"[WARN] Could not load tokenizer for {model_name}: {e}")
+                tokenizer = None
+            if tokenizer is None:
+                print(f"[WARN] No tokenizer.json for {model_name}; chunk sizes are estimated from words.")
+                tokenizer = _RegexTokenizer()
+            _tokenizers[model_name] = (tokenizer, _model_max_tokens(model_name))
+        return _tokenizers[model_name]
+
+
+def markdown_sections(text: str) -> List[Tuple[int, int, str]]:
+    """(start, end, heading path) per section; a section runs from its heading to the next one."""
+    sections, path = [], []
+    start, title = 0, ""
+    for match in _HEADING.finditer(text):
+        if match.start() > start:
+            sections.append((start, match.start(), title))
+        level = len(match.group(1))
+        path = path[:level - 1] + [""] * max(0, level - 1 - len(path)) + [match.group(2).strip()]
+        title = " > ".join(p for p in path if p)
+        start = match.start()
+    if start < len(text):
+        sections.append((start, len(text), title))
+    # A heading with no body of its own ("## Projects" right before "### 1. ...") introduces
+    # the next section: move it there instead of leaving it at the end of the previous chunk
+    merged, carry = [], None
+    for s, e, t in sections:
+        if carry is not None:
+            s, carry = carry, None
+        body = text[s:e].split("\n", 1)[1] if "\n" in text[s:e] else ""
+        if _HEADING.match(text, s) and not body.strip(" \t\n-*_") and (s, e, t) != sections[-1]:
+            carry = s
+            continue
+        merged.append((s, e, t))
+    return merged
+
+
+def _boundary_strength(text: str, offsets: np.ndarray) -> np.ndarray:
+    """Strength of the boundary before each token (see PARAGRAPH ... INSIDE_WORD), vectorised."""
+    n = len(offsets)
+    strength = np.full(n, INSIDE_WORD, dtype="int8")
+    if n == 0:
+        return strength
+    strength[0] = PARAGRAPH
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    newlines = np.concatenate([[0], np.cumsum(codes == ord("\n"))])
+    starts, ends = offsets[1:, 0], offsets[:-1, 1]
+    # Only a gap (whitespace) between two tokens is a place a chunk may end
+    gap = starts > ends
+    breaks = newlines[starts] - newlines[ends]
+    sentence_end = np.isin(codes[np.maximum(ends - 1, 0)], [ord(c) for c in ".!?;:"])
+    strength[1:] = np.select(
+        [gap & (breaks > 1), gap & (breaks == 1), gap & sentence_end, gap],
+        [PARAGRAPH, LINE, SENTENCE, WORD], INSIDE_WORD,
+    )
+    return strength
+
+
+class TokenChunker:
+    """
+    Split documents into chunks of at most `chunk_size` model tokens, with `chunk_overlap`
+    tokens repeated between consecutive chunks of the same section.
+    Drop-in for the text splitter: split_documents() / split_text().
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = CHUNK_TOKENS,
+                 chunk_overlap: int = CHUNK_OVERLAP_TOKENS, markdown: bool = True):
+        self.model_name = model_name
+        self.tokenizer, max_seq_length = get_tokenizer(model_name)
+        if max_seq_length and chunk_size > max_seq_length - SPECIAL_TOKENS:
+            print(f"[WARN] chunk_size {chunk_size} exceeds {model_name}'s {max_seq_length}-token window; "
+                  f"using {max_seq_length - SPECIAL_TOKENS}.")
+            chunk_size = max_seq_length - SPECIAL_TOKENS
+        self.chunk_size = chunk_size
+        self.chunk_overlap = min(chunk_overlap, chunk_size // 2)
+        self.markdown = markdown
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer.offsets([text])[0])
+
+    def chunk_text(self, text: str) -> List[Chunk]:
+        """Chunk boundaries (character offsets into `text`)."""
+        sections = markdown_sections(text) if self.markdown else [(0, len(text), "")]
+        sections = [(s, e, title) for s, e, title in sections if text[s:e].strip()]
+        if not sections:
+            return []
+        token_offsets = self.tokenizer.offsets([text[s:e] for s, e, _ in sections])
+
+        chunks: List[Chunk] = []
+        pending: Optional[Chunk] = None
+        for (start, end, title), offsets in zip(sections, token_offsets):
+            if len(offsets) <= self.chunk_size:
+                # Whole section fits: pack it with the previous small section(s) when both fit
+                section = Chunk(start + int(offsets[0, 0]), start + int(offsets[-1, 1]), len(offsets), title)
+                if pending is not None and pending.tokens + section.tokens <= self.chunk_size:
+                    pending = Chunk(pending.start, section.end, pending.tokens + section.tokens, pending.section)
+                else:
+                    if pending is not None:
+                        chunks.append(pending)
+                    pending = section
+                continue
+            if pending is not None:
+                chunks.append(pending)
+                pending = None
+            chunks.extend(self._windows(text, start, offsets, title))
+        if pending is not None:
+            chunks.append(pending)
+        return chunks
+
+    def _windows(self, text: str, base: int, offsets: np.ndarray, title: str) -> Iterator[Chunk]:
+        section_text = text[base:base + int(offsets[-1, 1])]
+        strength = _boundary_strength(section_text, offsets)
+        n, size, overlap = len(offsets), self.chunk_size, self.chunk_overlap
+        begin = 0
+        while begin < n:
+            stop = n
+            if begin + size < n:
+                # Best boundary in the second half of the window; the latest among equals
+                lo, hi = begin + size // 2, begin + size
+                window = strength[lo:hi + 1]
+                best = window.max()
+                stop = lo + int(np.nonzero(window == best)[0][-1])
+                if best == INSIDE_WORD:
+                    stop = hi
+            yield Chunk(base + int(offsets[begin, 0]), base + int(offsets[stop - 1, 1]), stop - begin, title)
+            if stop >= n:
+                break
+            # The overlap starts at the strongest boundary within the last `overlap` tokens
+            # (earliest among equals), never inside a word or before the previous chunk's start
+            lo = max(stop - overlap, begin + 1)
+            window = strength[lo:stop]
+            if len(window) and window.max() >= WORD:
+                begin = lo + int(np.argmax(window == window.max()))
+            else:
+                begin = stop
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[c.start:c.end] for c in self.chunk_text(text)]
+
+    def split_documents(self, documents: Iterable[Any]) -> List[Any]:
+        chunks = []
+        for doc in documents:
+            text = doc.page_content
+            for c in self.chunk_text(text):
+                metadata = dict(doc.metadata, start_index=c.start, end_index=c.end, tokens=c.tokens)
+                if c.section:
+                    metadata["section"] = c.section
+                # Same Document class as the loader produced; no langchain import needed here
+                chunks.append(type(doc)(page_content=text[c.start:c.end], metadata=metadata))
+        return chunks
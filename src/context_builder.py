@@ -0,0 +1,244 @@
+import copy
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+_WORD = re.compile(r"\w+")
+
+
+def make_token_counter(model_name: str = None, model: Any = None) -> Callable[[str], int]:
+    """
+    Count tokens with a real tokenizer: tiktoken's cl100k_base if installed (close to
+    the Llama 3 vocabulary Groq serves), else the embedding model's tokenizer, else a
+    4-characters-per-token estimate.
+    With `model_name`, only the model's tokenizer.json is loaded (chunker.get_tokenizer),
+    on the first count: counting never loads the embedding model itself (torch).
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        pass
+    if model_name is not None:
+        resolved = []
+
+        def count(text: str) -> int:
+            if not resolved:
+                from chunker import get_tokenizer
+                resolved.append(get_tokenizer(model_name)[0])
+            return len(resolved[0].offsets([text])[0])
+        return count
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        # A private copy: HF fast tokenizers fail ("Already borrowed") when threads share one and
+        # switch its truncation settings, which model.encode() and this counter would otherwise do
+        tokenizer = copy.deepcopy(tokenizer)
+        lock = threading.Lock()
+
+        def count_hf(text: str) -> int:
+            with lock:
+                return len(tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+        return count_hf
+    return lambda text: max(1, len(text) // 4)
+
+
+@dataclass
+class Block:
+    """One contiguous piece of context: one chunk, or several merged chunks of the same page."""
+    text: str
+    source: str
+    page: Any
+    rank: int
+    chunks: int = 1
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    blocks: List[Block]
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+def _page_order(page: Any) -> tuple:
+    """Sort key for page numbers: numeric pages in numeric order (2 before 10), anything else after."""
+    try:
+        return 0, int(page), ""
+    except (TypeError, ValueError):
+        return 1, 0, str(page)
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if < min_overlap)."""
+    probe = right[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = left.find(probe)
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextBuilder:
+    """
+    Turns ranked search hits into the CONTEXT section of the prompt.
+
+    1. Chunks of the same source/page that overlap (the splitter repeats up to
+       chunk_overlap tokens) or contain one another are stitched into one block.
+    2. A block is dropped as a near-duplicate when at least `dedup_threshold` of its
+       word 3-grams already appear in a better-ranked block.
+    3. Blocks are packed best-rank first into `token_budget` tokens; a block that does
+       not fit is skipped so a smaller, lower-ranked one can still use the room.
+    """
+
+    def __init__(self, token_budget: int = 1500, token_counter: Callable[[str], int] = None,
+                 dedup_threshold: float = 0.8, min_overlap: int = 20, separator: str = "\n\n"):
+        self.token_budget = token_budget
+        self.count_tokens = token_counter or make_token_counter()
+        self.dedup_threshold = dedup_threshold
+        self.min_overlap = min_overlap
+        self.separator = separator
+
+    def _merge(self, blocks: List[Block]) -> List[Block]:
+        groups: Dict[tuple, List[Block]] = {}
+        for block in blocks:
+            groups.setdefault((block.source, block.page), []).append(block)
+
+        merged = []
+        for group in groups.values():
+            changed = True
+            while changed:
+                changed = False
+                for i in range(len(group)):
+                    for j in range(len(group)):
+                        if i == j:
+                            continue
+                        a, b = group[i], group[j]
+                        if b.text in a.text:
+                            text = a.text
+                        else:
+                            n = _overlap(a.text, b.text, self.min_overlap)
+                            if not n:
+                                continue
+                            text = a.text + b.text[n:]
+                        group[i] = Block(text, a.source, a.page, min(a.rank, b.rank), a.chunks + b.chunks)
+                        del group[j]
+                        changed = True
+                        break
+                    if changed:
+                        break
+            merged.extend(group)
+        return sorted(merged, key=lambda b: b.rank)
+
+    def _dedup(self, blocks: List[Block]) -> List[Block]:
+        kept, kept_shingles = [], []
+        for block in blocks:
+            shingles = _shingles(block.text)
+            duplicate = any(
+                len(shingles & other) / len(shingles) >= self.dedup_threshold
+                for other in kept_shingles
+            )
+            if not duplicate:
+                kept.append(block)
+                kept_shingles.append(shingles)
+        return kept
+
+    def _truncate(self, block: Block, budget: int) -> Block:
+        text = block.text
+        while text and self.count_tokens(text) > budget:
+            text = text[:int(len(text) * 0.9)]
+        return Block(text, block.source, block.page, block.rank, block.chunks)
+
+    def build(self, hits: List[Dict[str, Any]], token_budget: Optional[int] = None) -> BuiltContext:
+        """`hits` are FaissVectorStore.query() results, best first."""
+        budget = self.token_budget if token_budget is None else token_budget
+        blocks = []
+        for rank, hit in enumerate(hits):
+            meta = hit.get("metadata", {})
+            text = meta.get("text", "")
+            if text.strip():
+                blocks.append(Block(text, meta.get("source", "Unknown"), meta.get("page", 0), rank))
+        # What joining every hit (the old prompt) would have cost
+        sep_tokens = self.count_tokens(self.separator)
+        raw_tokens = sum(self.count_tokens(b.text) for b in blocks) + sep_tokens * max(0, len(blocks) - 1)
+
+        merged = self._merge(blocks)
+        unique = self._dedup(merged)
+
+        packed, used = [], 0
+        for block in unique:
+            cost = self.count_tokens(block.text) + (sep_tokens if packed else 0)
+            if used + cost <= budget:
+                packed.append(block)
+                used += cost
+
+        if not packed and unique:
+            # Even the best block is over budget: keep its head rather than send no context
+            packed = [self._truncate(unique[0], budget)]
+            used = self.count_tokens(packed[0].text)
+
+        stats = {
+            "chunks_in": len(blocks),
+            "merged": len(blocks) - len(merged),
+            "deduplicated": len(merged) - len(unique),
+            "dropped": len(unique) - len(packed),
+            "blocks_out": len(packed),
+            "tokens_raw": raw_tokens,
+            "tokens_packed": used,
+            "tokens_saved": raw_tokens - used,
+        }
+        return BuiltContext(self.separator.join(b.text for b in packed), packed, stats)
+
+    def build_full(self, chunks: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Optional[BuiltContext]:
+        """
+        The whole corpus as context: `chunks` (chunk metadata, any order) stitched back into
+        one block per source/page, in document order. None when it does not fit the budget.
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        pages: Dict[tuple, List[Dict[str, Any]]] = {}
+        for meta in chunks:
+            if meta.get("text", "").strip():
+                pages.setdefault((str(meta.get("source", "Unknown")), meta.get("page", 0)), []).append(meta)
+
+        blocks = []
+        for (source, page), metas in sorted(pages.items(), key=lambda item: (item[0][0], _page_order(item[0][1]))):
+            metas.sort(key=lambda m: m.get("start_index", -1))
+            text, end = "", None
+            for meta in metas:
+                piece, start = meta["text"], meta.get("start_index")
+                if end is not None and start is not None and start >= 0:
+                    # Character offsets say exactly how much the splitter repeated
+                    if start + len(piece) <= end:
+                        continue
+                    text += piece[end - start:] if start < end else self.separator + piece
+                elif text:
+                    n = _overlap(text, piece, self.min_overlap)
+                    text += piece[n:] if n else self.separator + piece
+                else:
+                    text = piece
+                end = start + len(piece) if start is not None and start >= 0 else None
+            blocks.append(Block(text, source, page, len(blocks), len(metas)))
+
+        context = self.separator.join(b.text for b in blocks)
+        tokens = self.count_tokens(context) if context else 0
+        if not blocks or tokens > budget:
+            return None
+        raw_tokens = sum(self.count_tokens(m["text"]) for metas in pages.values() for m in metas)
+        stats = {
+            "chunks_in": sum(b.chunks for b in blocks),
+            "blocks_out": len(blocks),
+            "tokens_raw": raw_tokens,
+            "tokens_packed": tokens,
+            "tokens_saved": raw_tokens - tokens,
+        }
+        return BuiltContext(context, blocks, stats)
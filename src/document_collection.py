@@ -0,0 +1,260 @@
+"""
+Many documents in one FaissVectorStore, with metadata-filtered retrieval.
+
+Every chunk's document ID, source name, file type, page and upload time are
+mirrored into MetadataColumns: numpy arrays aligned with the chunk IDs, saved
+next to the index as columns.npz. A filter is evaluated over those columns in
+one vectorised pass, and only the matching chunk IDs are handed to
+FaissVectorStore.query(allowed_ids=...), which restricts FAISS and BM25 to
+them. Scoping a question to one upload, a page range or "PDFs added this week"
+is then a single search, not one index per document and a fan-out.
+
+    collection = DocumentCollection("faiss_collection")
+    doc_id = collection.add_document("reports/q3.pdf")
+    collection.query("revenue by region", top_k=5, doc_ids=doc_id, pages=(0, 9))
+"""
+import io
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+import telemetry
+from load_data import file_digest, iter_documents
+from vector_database import FaissVectorStore, atomic_write
+
+Values = Union[str, Iterable[str], None]
+
+
+def _as_list(values: Values) -> Optional[List[str]]:
+    if values is None:
+        return None
+    return [values] if isinstance(values, str) else list(values)
+
+
+class MetadataColumns:
+    """Per-chunk filter columns; strings are dictionary-encoded so filters compare int codes."""
+
+    CATEGORICAL = ("doc_id", "source", "file_type")
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype="int64")
+        self.codes = {name: np.zeros(0, dtype="int32") for name in self.CATEGORICAL}
+        self.values: Dict[str, List[str]] = {name: [] for name in self.CATEGORICAL}
+        self._lookup: Dict[str, Dict[str, int]] = {name: {} for name in self.CATEGORICAL}
+        self.page = np.zeros(0, dtype="int32")
+        self.added_at = np.zeros(0, dtype="float64")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _code(self, name: str, value: Any) -> int:
+        value = "" if value is None else str(value)
+        lookup = self._lookup[name]
+        if value not in lookup:
+            lookup[value] = len(self.values[name])
+            self.values[name].append(value)
+        return lookup[value]
+
+    def append(self, ids: Iterable[int], metas: Iterable[Dict[str, Any]]):
+        ids = np.asarray(list(ids), dtype="int64")
+        metas = list(metas)
+        self.ids = np.concatenate([self.ids, ids])
+        for name in self.CATEGORICAL:
+            fresh = np.array([self._code(name, m.get(name)) for m in metas], dtype="int32")
+            self.codes[name] = np.concatenate([self.codes[name], fresh])
+        self.page = np.concatenate([self.page, np.array([int(m.get("page") or 0) for m in metas], dtype="int32")])
+        self.added_at = np.concatenate([
+            self.added_at, np.array([float(m.get("added_at") or 0.0) for m in metas], dtype="float64"),
+        ])
+
+    def remove(self, ids: Iterable[int]):
+        keep = ~np.isin(self.ids, np.asarray(list(ids), dtype="int64"))
+        self.ids = self.ids[keep]
+        for name in self.CATEGORICAL:
+            self.codes[name] = self.codes[name][keep]
+        self.page = self.page[keep]
+        self.added_at = self.added_at[keep]
+
+    def _match(self, name: str, values: List[str]) -> np.ndarray:
+        wanted = [self._lookup[name][v] for v in values if v in self._lookup[name]]
+        return np.isin(self.codes[name], np.asarray(wanted, dtype="int32"))
+
+    def mask(self, doc_ids: Values = None, sources: Values = None, file_types: Values = None,
+             pages: Tuple[int, int] = None, added_after: float = None, added_before: float = None) -> np.ndarray:
+        """Boolean row mask; every given filter must hold (pages is an inclusive range)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for name, values in (("doc_id", doc_ids), ("source", sources), ("file_type", file_types)):
+            values = _as_list(values)
+            if values is not None:
+                if name == "file_type":
+                    values = [v.lstrip(".").lower() for v in values]
+                mask &= self._match(name, values)
+        if pages is not None:
+            mask &= (self.page >= pages[0]) & (self.page <= pages[1])
+        if added_after is not None:
+            mask &= self.added_at >= added_after
+        if added_before is not None:
+            mask &= self.added_at < added_before
+        return mask
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        arrays = {f"code_{name}": codes for name, codes in self.codes.items()}
+        arrays.update({f"values_{name}": np.array(values, dtype=str) for name, values in self.values.items()})
+        np.savez(buf, ids=self.ids, page=self.page, added_at=self.added_at, **arrays)
+        return buf.getvalue()
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataColumns":
+        columns = cls()
+        with np.load(path) as data:
+            columns.ids = data["ids"]
+            columns.page = data["page"]
+            columns.added_at = data["added_at"]
+            for name in cls.CATEGORICAL:
+                columns.codes[name] = data[f"code_{name}"]
+                columns.values[name] = [str(v) for v in data[f"values_{name}"]]
+                columns._lookup[name] = {v: i for i, v in enumerate(columns.values[name])}
+        return columns
+
+
+class DocumentCollection:
+    """
+    A persistent knowledge base of many documents in one FaissVectorStore.
+    Documents are keyed by content hash (file_digest), so re-adding the same bytes is a no-op.
+    """
+
+    def __init__(self, persist_dir: str = "faiss_collection", embedding_model: str = "all-MiniLM-L6-v2",
+                 ingest_batch_size: int = 64, **store_kwargs):
+        self.store = FaissVectorStore(persist_dir, embedding_model, **store_kwargs)
+        self.ingest_batch_size = ingest_batch_size
+        # doc_id -> {"name", "file_type", "added_at", "chunks"}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.columns = MetadataColumns()
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def persist_dir(self) -> str:
+        return self.store.persist_dir
+
+    @property
+    def columns_path(self) -> str:
+        return os.path.join(self.persist_dir, "columns.npz")
+
+    @property
+    def catalog_path(self) -> str:
+        return os.path.join(self.persist_dir, "collection.json")
+
+    def load(self):
+        if os.path.exists(os.path.join(self.persist_dir, "faiss.index")):
+            self.store.load()
+        if os.path.exists(self.catalog_path):
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                self.documents = json.load(f).get("documents", {})
+        if os.path.exists(self.columns_path):
+            self.columns = MetadataColumns.load(self.columns_path)
+        # Repairs columns that are missing or older than the index (e.g. a crash between the two saves)
+        self.sync_columns()
+
+    def save(self):
+        self.store.save()
+        self._save_columns()
+
+    def _save_columns(self):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        atomic_write(self.columns_path, self.columns.to_bytes())
+        atomic_write(self.catalog_path, json.dumps({"documents": self.documents}).encode("utf-8"))
+
+    def sync_columns(self) -> Tuple[int, int]:
+        """Bring the columns in line with the store's chunks; returns (added, removed)."""
+        ids = np.fromiter(iter(self.store.metadata), dtype="int64", count=len(self.store.metadata))
+        stale = np.setdiff1d(self.columns.ids, ids)
+        fresh = np.setdiff1d(ids, self.columns.ids)
+        if len(stale):
+            self.columns.remove(stale)
+        if len(fresh):
+            self.columns.append(fresh, (self.store.metadata[int(cid)] for cid in fresh))
+        return len(fresh), len(stale)
+
+    def add_document(self, source, name: str = None,
+                     progress_callback: Callable[[dict], None] = None) -> Optional[str]:
+        """Index a file path or Streamlit upload; returns its doc_id (None if nothing could be read)."""
+        doc_id = file_digest(source)
+        if doc_id is None:
+            return None
+        name = os.path.basename(name or getattr(source, "name", source))
+        with self._lock:
+            if doc_id in self.documents:
+                print(f"♻️ [Collection] {name} already indexed ({doc_id}).")
+                return doc_id
+
+            file_type = os.path.splitext(name)[1].lstrip(".").lower()
+            added_at = time.time()
+
+            def tagged(pages):
+                for page in pages:
+                    page.metadata.update(source=name, doc_id=doc_id, file_type=file_type, added_at=added_at)
+                    page.metadata.setdefault("page", 0)
+                    yield page
+
+            try:
+                with telemetry.span("collection.add", file_type=file_type):
+                    chunks = self.store.build_from_stream(
+                        tagged(iter_documents(source)), batch_size=self.ingest_batch_size,
+                        progress_callback=progress_callback,
+                    )
+            except BaseException:
+                # A file that failed part-way leaves no chunks behind
+                self.store.delete([cid for cid in self.store.metadata if self.store.metadata[cid].get("doc_id") == doc_id])
+                raise
+            if not chunks:
+                return None
+            self.documents[doc_id] = {"name": name, "file_type": file_type, "added_at": added_at, "chunks": chunks}
+            self.sync_columns()
+            # build_from_stream has already saved the index
+            self._save_columns()
+            print(f"✅ [Collection] Added {name} ({chunks} chunks, {len(self.documents)} documents)")
+            return doc_id
+
+    def remove_document(self, doc_id: str) -> bool:
+        with self._lock:
+            if doc_id not in self.documents:
+                return False
+            ids = self.columns.ids[self.columns.mask(doc_ids=doc_id)]
+            self.store.delete(ids.tolist())
+            self.columns.remove(ids)
+            self.documents.pop(doc_id)
+            self.save()
+            return True
+
+    def allowed_ids(self, **filters) -> Optional[np.ndarray]:
+        """Chunk IDs matching `filters` (see MetadataColumns.mask); None when nothing is filtered."""
+        if not any(v is not None for v in filters.values()):
+            return None
+        return self.columns.ids[self.columns.mask(**filters)]
+
+    def query(self, query_text: str, top_k: int = 5, query_embedding: np.ndarray = None,
+              doc_ids: Values = None, sources: Values = None, file_types: Values = None,
+              pages: Tuple[int, int] = None, added_after: float = None, added_before: float = None,
+              **query_kwargs) -> List[Dict[str, Any]]:
+        """FaissVectorStore.query() over only the chunks that match every given filter."""
+        with telemetry.span("collection.filter") as span:
+            allowed = self.allowed_ids(doc_ids=doc_ids, sources=sources, file_types=file_types,
+                                       pages=pages, added_after=added_after, added_before=added_before)
+            span.set(matched=len(self.columns) if allowed is None else len(allowed))
+        if allowed is not None and len(allowed) == 0:
+            return []
+        return self.store.query(query_text, top_k=top_k, query_embedding=query_embedding,
+                                allowed_ids=allowed, **query_kwargs)
+
+    @property
+    def version(self) -> str:
+        return self.store.version
+
+    def close(self):
+        self.store.close()
@@ -1,31 +1,95 @@
-from typing import List, Any
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+from typing import Any, Iterable, Iterator, List
 import numpy as np
 from load_data import load_documents
+from model_registry import acquire_model, release_model
+from embedding_cache import get_embedding_cache, text_key
+from embedding_backends import cache_name
+from chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, TokenChunker
+import telemetry
+
+def make_splitter(chunk_size: int = CHUNK_TOKENS, chunk_overlap: int = CHUNK_OVERLAP_TOKENS,
+                  model_name: str = "all-MiniLM-L6-v2") -> TokenChunker:
+    """
+    The splitter every ingestion path uses. Sizes are in `model_name` tokens; only the
+    tokenizer is loaded (not the model), so it is safe in worker processes.
+    """
+    return TokenChunker(model_name, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
 class EmbeddingPipeline:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = 1200, chunk_overlap: int = 200):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", chunk_size: int = CHUNK_TOKENS,
+                 chunk_overlap: int = CHUNK_OVERLAP_TOKENS, cache_dir: str = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.model = SentenceTransformer(model_name)
-        print(f"[INFO] Loaded embedding model: {model_name}")
+        self.model_name = model_name
+        # Embedding cache location; None is the shared EMBEDDING_CACHE_DIR
+        self.cache_dir = cache_dir
+        # Shared with every other store/pipeline using the same model
+        self.model = acquire_model(model_name)
+
+    def close(self):
+        if self.model is not None:
+            release_model(self.model_name)
+            self.model = None
+
+    def _splitter(self):
+        return make_splitter(self.chunk_size, self.chunk_overlap, self.model_name)
 
     def chunk_documents(self, documents: List[Any]) -> List[Any]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        chunks = splitter.split_documents(documents)
+        chunks = self._splitter().split_documents(documents)
         print(f"[INFO] Split {len(documents)} documents into {len(chunks)} chunks.")
         return chunks
 
-    def embed_chunks(self, chunks: List[Any]) -> np.ndarray:
+    def iter_chunks(self, documents: Iterable[Any]) -> Iterator[Any]:
+        """Split documents one at a time as they arrive (e.g. from load_data.iter_documents)."""
+        splitter = self._splitter()
+        for doc in documents:
+            yield from splitter.split_documents([doc])
+
+    def iter_batches(self, documents: Iterable[Any], batch_size: int = 64) -> Iterator[List[Any]]:
+        """Fixed-size chunk batches; at most one batch of chunks is held at a time."""
+        batch = []
+        for chunk in self.iter_chunks(documents):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def embed_chunks(self, chunks: List[Any], show_progress: bool = True) -> np.ndarray:
         texts = [chunk.page_content for chunk in chunks]
-        print(f"[INFO] Generating embeddings for {len(texts)} chunks...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype="float32")
+
+        cache = get_embedding_cache(cache_name(self.model_name), self.cache_dir)
+        if cache is None:
+            print(f"[INFO] Generating embeddings for {len(texts)} chunks...")
+            with telemetry.span("embed.encode", texts=len(texts)):
+                embeddings = self.model.encode(texts, show_progress_bar=show_progress)
+            print(f"[INFO] Embeddings shape: {embeddings.shape}")
+            return embeddings
+
+        # Only encode chunks whose text has not been embedded by this model before
+        keys = [text_key(t) for t in texts]
+        hits, misses = cache.lookup(keys)
+        print(f"[INFO] Embedding cache: {len(hits)} hits, {len(misses)} misses out of {len(texts)} chunks.")
+        telemetry.inc("rag_embedding_cache_hits_total", len(hits))
+        telemetry.inc("rag_embedding_cache_misses_total", len(misses))
+
+        if misses:
+            with telemetry.span("embed.encode", texts=len(misses)):
+                fresh = self.model.encode([texts[i] for i in misses], show_progress_bar=show_progress)
+            fresh = np.asarray(fresh, dtype="float32")
+            cache.store([keys[i] for i in misses], fresh)
+            dim = fresh.shape[1]
+        else:
+            dim = next(iter(hits.values())).shape[0]
+
+        embeddings = np.empty((len(texts), dim), dtype="float32")
+        for pos, vector in hits.items():
+            embeddings[pos] = vector
+        if misses:
+            embeddings[misses] = fresh
         print(f"[INFO] Embeddings shape: {embeddings.shape}")
         return embeddings
 
@@ -36,4 +100,5 @@ if __name__ == "__main__":
     emb_pipe = EmbeddingPipeline()
     chunks = emb_pipe.chunk_documents(docs)
     embeddings = emb_pipe.embed_chunks(chunks)
+    emb_pipe.close()
     print("[INFO] Example embedding:", embeddings[0] if len(embeddings) > 0 else None)
\ No newline at end of file
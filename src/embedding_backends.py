@@ -0,0 +1,94 @@
+"""
+Runtime backends for the sentence-transformers embedding model.
+
+  torch      PyTorch, the reference implementation
+  onnx       the same weights exported to ONNX, run by onnxruntime
+  onnx-int8  ONNX with int8 dynamic quantization (weights quantized offline,
+             activations at run time); smallest and fastest on CPU
+
+EMBEDDING_BACKEND selects the default. ONNX exports are written once to
+EMBEDDING_ONNX_DIR (default .onnx_models/<model>) and reused on later starts, so
+only the first start pays for the export. ONNX_THREADS sets onnxruntime's
+intra-op threads (default: all cores).
+"""
+import os
+import platform
+from typing import Optional
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def default_backend() -> str:
+    return os.getenv("EMBEDDING_BACKEND", "torch")
+
+
+def cache_name(model_name: str, backend: Optional[str] = None) -> str:
+    """Name under which a backend's vectors are cached: int8 vectors differ slightly from float ones."""
+    backend = backend or default_backend()
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def onnx_export_dir(model_name: str) -> str:
+    root = os.getenv("EMBEDDING_ONNX_DIR", ".onnx_models")
+    return os.path.join(root, model_name.strip("/\\").replace("/", "__").replace("\\", "__"))
+
+
+def quantization_target() -> str:
+    """Best int8 kernel set for this CPU, as named by export_dynamic_quantized_onnx_model."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def _session_options():
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    # One model call at a time per session (EmbeddingService batches queries), so all cores go intra-op
+    options.intra_op_num_threads = int(os.getenv("ONNX_THREADS", "0") or 0) or (os.cpu_count() or 1)
+    options.inter_op_num_threads = 1
+    return options
+
+
+def load_sentence_transformer(model_name: str, device: str = "cpu", backend: Optional[str] = None):
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from {BACKENDS}.")
+    if backend == "torch":
+        return SentenceTransformer(model_name, device=device)
+
+    export_dir = onnx_export_dir(model_name)
+    if not os.path.exists(os.path.join(export_dir, "onnx", "model.onnx")):
+        print(f"[INFO] Exporting {model_name} to ONNX at {export_dir} (one-time)...")
+        SentenceTransformer(model_name, device="cpu", backend="onnx").save_pretrained(export_dir)
+
+    file_name = "onnx/model.onnx"
+    if backend == "onnx-int8":
+        target = quantization_target()
+        file_name = f"onnx/model_qint8_{target}.onnx"
+        if not os.path.exists(os.path.join(export_dir, file_name)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"[INFO] Quantizing {model_name} to int8 ({target})...")
+            fp32 = SentenceTransformer(export_dir, device="cpu", backend="onnx")
+            export_dynamic_quantized_onnx_model(fp32, target, export_dir)
+
+    return SentenceTransformer(
+        export_dir,
+        device="cpu",
+        backend="onnx",
+        model_kwargs={"file_name": file_name, "provider": "CPUExecutionProvider", "session_options": _session_options()},
+    )
@@ -0,0 +1,192 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one writer process at a time
+    fcntl = None
+
+KEY_BYTES = 16
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent (model name, chunk text hash) -> embedding cache.
+
+    On disk, per model:
+      keys.bin     - 16-byte blake2b digests, one per row, append-only
+      vectors.f32  - raw float32 rows in the same order, memory-mapped for reads
+      meta.json    - model name and vector dimension
+      .lock        - flock'ed for every append
+    Rows are only ever appended, so a crash mid-write at worst loses the tail.
+    Several processes (server workers, bulk_ingest next to the app) may share a
+    directory: appends hold the file lock, and row numbers always come from the
+    files themselves, after picking up rows the other processes appended.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.dir = os.path.join(cache_dir, safe_name)
+        self.model_name = model_name
+        self.keys_path = os.path.join(self.dir, "keys.bin")
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        # Rows on disk this process has indexed (>= len(_rows) when texts were appended twice)
+        self._n_rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            self.dim = json.load(f)["dim"]
+        with self._file_lock():
+            self._repair()
+            self._refresh()
+        print(f"[INFO] Embedding cache: {len(self._rows)} cached vectors for {self.model_name}")
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Exclusive across processes (and threads: callers also hold self._lock or are in __init__)."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _disk_rows(self) -> int:
+        """Rows complete in both files; vectors are written before keys, so keys bound it."""
+        keys = os.path.getsize(self.keys_path) // KEY_BYTES if os.path.exists(self.keys_path) else 0
+        vectors = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+        return min(keys, vectors)
+
+    def _repair(self):
+        # Cut off a torn tail so future appends stay row-aligned across both files.
+        # Only under the file lock: an unlocked reader could mistake a write in progress for one.
+        n_rows = self._disk_rows()
+        for path, size in ((self.keys_path, n_rows * KEY_BYTES), (self.vectors_path, n_rows * self.dim * 4)):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+
+    def _refresh(self):
+        """Index the rows appended (by any process) since this one last looked."""
+        n_rows = self._disk_rows()
+        known = self._n_rows
+        if n_rows <= known:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(known * KEY_BYTES)
+            raw = f.read((n_rows - known) * KEY_BYTES)
+        for i in range(n_rows - known):
+            # First row wins if two processes raced to append the same text
+            self._rows.setdefault(raw[i * KEY_BYTES:(i + 1) * KEY_BYTES], known + i)
+        self._n_rows = n_rows
+
+    def _vectors(self) -> np.ndarray:
+        # Re-map when rows were appended since the last mapping
+        if self._mmap is None or self._mmap.shape[0] < self._n_rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                   shape=(self._n_rows, self.dim))
+        return self._mmap
+
+    def lookup(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """Return ({position: vector} for hits, [positions of misses])."""
+        hits, misses = {}, []
+        with self._lock:
+            if self.dim is not None and any(key not in self._rows for key in keys):
+                # Another process may have embedded them meanwhile; reading whole rows needs no lock
+                self._refresh()
+            if not self._rows:
+                return hits, list(range(len(keys)))
+            vectors = self._vectors()
+            for pos, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None:
+                    misses.append(pos)
+                else:
+                    hits[pos] = np.array(vectors[row])
+        return hits, misses
+
+    def store(self, keys: List[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            if self.dim is None:
+                if os.path.exists(self.meta_path):
+                    # Another process created the cache after this one started
+                    with open(self.meta_path, "r", encoding="utf-8") as f:
+                        self.dim = json.load(f)["dim"]
+                else:
+                    self.dim = int(vectors.shape[1])
+                    os.makedirs(self.dir, exist_ok=True)
+                    with open(self.meta_path, "w", encoding="utf-8") as f:
+                        json.dump({"model": self.model_name, "dim": self.dim}, f)
+            self._repair()
+            self._refresh()
+            fresh, seen = [], set()
+            for i, key in enumerate(keys):
+                # Skip rows already cached and duplicates inside this batch
+                if key in self._rows or key in seen:
+                    continue
+                seen.add(key)
+                fresh.append(i)
+            if not fresh:
+                return
+            # Row numbers come from the files, which every writer appends to under the lock
+            start = self._disk_rows()
+            # Vectors first, keys second: a key on disk always has its row
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors[fresh].tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(keys[i] for i in fresh))
+            for offset, i in enumerate(fresh):
+                self._rows[keys[i]] = start + offset
+            self._n_rows = start + len(fresh)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+_caches: Dict[Tuple[str, str], EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str, cache_dir: Optional[str] = None) -> Optional[EmbeddingCache]:
+    """
+    Process-wide cache for `model_name` under `cache_dir` (default: EMBEDDING_CACHE_DIR).
+    Set EMBEDDING_CACHE_DIR='' to disable caching everywhere, including per-user caches.
+    """
+    root = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+    if not root:
+        return None
+    key = (cache_dir or root, model_name)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(key[0], model_name)
+        return _caches[key]
+
+
+def close_embedding_caches(cache_dir: str):
+    """Forget the caches under `cache_dir` (e.g. a user's, before their directory is deleted)."""
+    with _caches_lock:
+        for key in [k for k in _caches if k[0] == cache_dir]:
+            del _caches[key]
@@ -0,0 +1,153 @@
+"""
+Micro-batching front end for query embeddings.
+
+Concurrent callers of encode() are queued; a single worker thread takes the first
+waiting request, keeps collecting for up to `max_wait_ms` (or until `max_batch_size`
+texts), runs one model.encode() over the whole batch and hands each caller its rows.
+On CPU a batch of 16 short queries costs little more than a batch of one, so under
+load throughput goes up and tail latency goes down; an idle service adds at most
+the window to a lone request. max_wait_ms=0 turns batching off (callers encode
+directly). The model is acquired per batch, not for the service's lifetime, so the
+registry can unload it once queries stop (EMBEDDING_IDLE_UNLOAD_SECONDS).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import telemetry
+from model_registry import using_model
+
+_STOP = object()
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class EmbeddingService:
+    def __init__(self, model_name: str, max_batch_size: int = 32, max_wait_ms: float = 3.0,
+                 device: Optional[str] = None, backend: Optional[str] = None):
+        self.model_name = model_name
+        self.device = device
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._metrics = {
+            "requests": 0, "texts": 0, "batches": 0, "max_batch": 0,
+            "max_queue_depth": 0, "wait_s": 0.0, "encode_s": 0.0,
+        }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"embed-batcher-{self.model_name}", daemon=True)
+                self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Same contract as SentenceTransformer.encode(texts) -> float32 array, one row per text."""
+        if self.max_wait <= 0:
+            with self._lock:
+                self._metrics["requests"] += 1
+                self._metrics["texts"] += len(texts)
+            return self._encode(texts)
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((list(texts), future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], depth)
+        return future.result()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        with using_model(self.model_name, self.device, self.backend) as model:
+            return np.asarray(model.encode(texts, show_progress_bar=False), dtype="float32")
+
+    def _collect(self, first) -> list:
+        """Gather requests for one batch: stop at max_batch_size texts or when the window closes."""
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            texts = [t for item in batch for t in item[0]]
+            started = time.perf_counter()
+            try:
+                vectors = self._encode(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for item_texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+            with self._lock:
+                m = self._metrics
+                m["requests"] += len(batch)
+                m["texts"] += len(texts)
+                m["batches"] += 1
+                m["max_batch"] = max(m["max_batch"], len(texts))
+                m["wait_s"] += sum(started - enqueued for _, _, enqueued in batch)
+                m["encode_s"] += finished - started
+            telemetry.observe("rag_query_batch_size", len(texts), BATCH_BUCKETS)
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            m = dict(self._metrics)
+        batches = m["batches"] or 1
+        requests = m["requests"] or 1
+        m["queue_depth"] = self._queue.qsize()
+        m["mean_batch"] = m["texts"] / batches if m["batches"] else 0.0
+        m["mean_wait_ms"] = 1000 * m.pop("wait_s") / requests
+        m["mean_encode_ms"] = 1000 * m.pop("encode_s") / batches
+        return m
+
+    def close(self):
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join()
+
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: str) -> EmbeddingService:
+    """One batcher per model, shared by every store that embeds queries with it."""
+    with _services_lock:
+        service = _services.get(model_name)
+        if service is None:
+            service = EmbeddingService(
+                model_name,
+                max_batch_size=int(os.getenv("QUERY_BATCH_MAX", "32")),
+                max_wait_ms=float(os.getenv("QUERY_BATCH_WINDOW_MS", "3")),
+            )
+            _services[model_name] = service
+        return service
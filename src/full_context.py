@@ -0,0 +1,88 @@
+"""
+Small-corpus fast path: answer from the whole store instead of searching it.
+
+When every chunk of a store, stitched back into its documents, fits in
+`token_budget` prompt tokens, retrieval has nothing to choose: the answer can
+see the entire corpus. Such queries skip the query embedding, the vector and
+BM25 search and the per-query context build. The prompt is laid out as
+
+    <persona> CONTEXT: <whole corpus>     the prefix, identical for every question
+    USER QUESTION: <query> ANSWER:        the only part that changes
+
+so consecutive requests share a long, byte-identical prefix (what an LLM
+provider's prompt cache can reuse), and the prefix is built once per store
+version rather than per query.
+
+Entries are keyed by store and checked against store.version, so a corpus that
+grows past the budget falls back to retrieval on its next query, and one that
+shrinks below it switches back. "Too large" is remembered per version as well;
+deciding it stops reading chunks once their text alone rules the store out.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from context_builder import Block, ContextBuilder
+
+# Text longer than this many characters per budget token is not tokenized at all:
+# English runs ~4 characters per token, so such a store cannot fit
+MAX_CHARS_PER_TOKEN = 8
+
+
+@dataclass
+class FullContext:
+    version: str
+    text: str
+    blocks: List[Block]
+    stats: Dict[str, int]
+    prefixes: Dict[str, str]
+
+    def prefix(self, persona: str) -> str:
+        """The stable part of the prompt for `persona`; built once, reused by every query."""
+        prefix = self.prefixes.get(persona)
+        if prefix is None:
+            prefix = self.prefixes[persona] = f"{persona}\n\nCONTEXT:\n{self.text}\n\n"
+        return prefix
+
+
+class FullContextCache:
+    def __init__(self, builder: ContextBuilder, token_budget: int = 3000, max_entries: int = 64):
+        self.builder = builder
+        self.token_budget = token_budget
+        self.max_entries = max_entries
+        # store key -> (version, FullContext or None when the store is too large)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store: Any) -> Optional[FullContext]:
+        """The whole-corpus context of `store`, or None when it needs retrieval."""
+        if self.token_budget <= 0 or store.index is None:
+            return None
+        key = store.persist_dir
+        version = store.version
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # Built outside the lock; two queries racing on a new version just build it twice
+        full = None
+        chunks = store.all_chunks(max_chars=self.token_budget * MAX_CHARS_PER_TOKEN)
+        if chunks is not None:
+            built = self.builder.build_full(chunks, token_budget=self.token_budget)
+            if built is not None:
+                full = FullContext(version, built.text, built.blocks, built.stats, {})
+        state = f"full context ({full.stats['tokens_packed']} tokens)" if full else "retrieval"
+        print(f"[INFO] '{key}' @ {version}: {state}, budget {self.token_budget} tokens")
+
+        with self._lock:
+            self._entries[key] = (version, full)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return full
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,204 @@
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+import faiss
+import numpy as np
+
+BACKENDS = ("auto", "flat", "hnsw", "ivf", "ivfpq")
+METRICS = ("l2", "cosine")
+# Vector codes kept in the index (ignored by ivfpq, which is already compressed)
+STORAGES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+# Auto-selection thresholds (vector counts)
+FLAT_MAX_VECTORS = 20_000
+HNSW_MAX_VECTORS = 1_000_000
+# IVF k-means wants ~39 training points per list; below this we stay exact
+IVF_MIN_TRAIN_PER_LIST = 39
+# k-means quality plateaus well before this; larger samples only cost build time
+MAX_TRAIN_VECTORS = 100_000
+# Filters matching at most this many vectors are answered by scoring just those vectors
+SUBSET_SCAN_MAX = 4096
+
+
+@dataclass
+class IndexConfig:
+    """
+    Which FAISS structure backs a FaissVectorStore, and how it is searched.
+    Saved in the store's manifest so a reloaded index is searched the way it was built.
+    """
+    backend: str = "auto"
+    # "cosine" L2-normalises vectors and searches by inner product, so scores are
+    # comparable across stores; "l2" is the raw-distance layout of older indexes
+    metric: str = "cosine"
+    storage: str = "float32"
+    # HNSW
+    hnsw_m: int = 32
+    ef_construction: int = 80
+    ef_search: int = 64
+    # IVF / IVF-PQ (nlist=None -> 4 * sqrt(n))
+    nlist: Optional[int] = None
+    nprobe: int = 16
+    pq_m: int = 48
+    pq_bits: int = 8
+    # Filled in once the index is built
+    resolved: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndexConfig":
+        known = {k: v for k, v in (data or {}).items() if k in cls.__dataclass_fields__}
+        # Manifests written before metric/storage existed describe raw L2 float32 indexes
+        known.setdefault("metric", "l2")
+        known.setdefault("storage", "float32")
+        return cls(**known)
+
+    @property
+    def faiss_metric(self) -> int:
+        if self.metric not in METRICS:
+            raise ValueError(f"Unknown metric: {self.metric} (expected one of {METRICS})")
+        return faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+
+
+def select_backend(n_vectors: int) -> str:
+    if n_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivfpq"
+
+
+def _nlist_for(config: IndexConfig, n_vectors: int) -> int:
+    nlist = config.nlist or int(4 * math.sqrt(max(n_vectors, 1)))
+    # Never ask k-means for more lists than the training set can support
+    return max(1, min(nlist, n_vectors // IVF_MIN_TRAIN_PER_LIST))
+
+
+def factory_string(backend: str, dim: int, config: IndexConfig, n_vectors: int) -> str:
+    if config.storage not in STORAGES:
+        raise ValueError(f"Unknown storage: {config.storage} (expected one of {tuple(STORAGES)})")
+    codes = STORAGES[config.storage]
+    if backend == "flat":
+        return codes
+    if backend == "hnsw":
+        return f"HNSW{config.hnsw_m}" if codes == "Flat" else f"HNSW{config.hnsw_m}_{codes}"
+    nlist = _nlist_for(config, n_vectors)
+    if backend == "ivf":
+        return f"IVF{nlist},{codes}"
+    if backend == "ivfpq":
+        pq_m = config.pq_m if dim % config.pq_m == 0 else 8
+        return f"IVF{nlist},PQ{pq_m}x{config.pq_bits}"
+    raise ValueError(f"Unknown index backend: {backend} (expected one of {BACKENDS})")
+
+
+def prepare_vectors(vectors: np.ndarray, config: IndexConfig) -> np.ndarray:
+    """float32, C-contiguous, and unit-length when the store uses cosine similarity."""
+    vectors = np.array(vectors, dtype="float32", order="C", copy=True)
+    if config.metric == "cosine":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def to_score(value: float, config: IndexConfig) -> float:
+    """Higher-is-better similarity from a raw FAISS result (cosine sim, or 1/(1+L2))."""
+    if config.metric == "cosine":
+        return float(value)
+    return 1.0 / (1.0 + float(value))
+
+
+def build_index(dim: int, config: IndexConfig, sample: np.ndarray):
+    """
+    Create (and train, if needed) an IDMap2-wrapped index for `config`.
+    `sample` is the first batch of (already prepared) vectors; it drives
+    auto-selection and IVF / scalar-quantizer training.
+    """
+    n = sample.shape[0]
+    backend = config.backend if config.backend != "auto" else select_backend(n)
+    if backend in ("ivf", "ivfpq") and n < IVF_MIN_TRAIN_PER_LIST * 4:
+        print(f"[WARN] Only {n} vectors to train {backend}; falling back to flat.")
+        backend = "flat"
+    if backend == "ivfpq" and n < IVF_MIN_TRAIN_PER_LIST * (1 << config.pq_bits):
+        # PQ codebooks need 39 * 2^bits points per sub-quantizer
+        print(f"[WARN] Only {n} vectors to train PQ codebooks; using plain IVF.")
+        backend = "ivf"
+
+    description = factory_string(backend, dim, config, n)
+    inner = faiss.index_factory(dim, description, config.faiss_metric)
+    if backend == "hnsw":
+        faiss.downcast_index(inner).hnsw.efConstruction = config.ef_construction
+    if not inner.is_trained:
+        train = sample
+        if n > MAX_TRAIN_VECTORS:
+            rows = np.random.default_rng(0).choice(n, MAX_TRAIN_VECTORS, replace=False)
+            train = sample[np.sort(rows)]
+        print(f"[INFO] Training {description} on {len(train)} vectors...")
+        inner.train(train)
+
+    config.resolved = {"backend": backend, "factory": description, "dim": dim, "metric": config.metric}
+    index = faiss.IndexIDMap2(inner)
+    apply_search_params(index, config)
+    print(f"[INFO] Created index: {description}")
+    return index
+
+
+def apply_search_params(index, config: IndexConfig):
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if hasattr(inner, "hnsw"):
+        inner.hnsw.efSearch = config.ef_search
+    if hasattr(inner, "nprobe"):
+        inner.nprobe = config.nprobe
+
+
+def filtered_search_params(index, config: IndexConfig, selector, top_k: int):
+    """SearchParameters restricting a search to the IDs accepted by `selector`."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if hasattr(inner, "hnsw"):
+        # Filtered-out nodes are still traversed but never returned; keep the beam at least k wide
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=max(config.ef_search, top_k))
+    if hasattr(inner, "nprobe"):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=config.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def supports_reconstruct(index) -> bool:
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    # IVF lists need a direct map to look vectors up by ID
+    return not hasattr(inner, "invlists")
+
+
+def vectors_scanned(index) -> int:
+    """Estimated vectors one query is compared against (exact for flat), for telemetry."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    n = index.ntotal
+    if hasattr(inner, "hnsw"):
+        # Each node expanded during the beam search visits its level-0 neighbours
+        return min(n, inner.hnsw.efSearch * inner.hnsw.nb_neighbors(0))
+    if hasattr(inner, "nprobe"):
+        return int(n * min(inner.nprobe, inner.nlist) / max(inner.nlist, 1))
+    return n
+
+
+def supports_remove(index) -> bool:
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    # HNSW graphs cannot drop nodes in place. IVF can, but keeps the removed entries' positions:
+    # the IDMap2 wrapper renumbers its id_map as if they shifted down, and every later lookup
+    # maps to the wrong (or no) ID. Only flat storage shifts its rows the way IDMap2 expects.
+    return not hasattr(inner, "hnsw") and not hasattr(inner, "invlists")
+
+
+def reconstruct_all(index):
+    """(ids, vectors) currently stored in an IDMap2 index (approximate for PQ)."""
+    ids = faiss.vector_to_array(index.id_map).astype("int64")
+    if len(ids) == 0:
+        return ids, np.zeros((0, index.d), dtype="float32")
+    inner = faiss.downcast_index(index.index)
+    if hasattr(inner, "make_direct_map"):
+        inner.make_direct_map()
+    # id_map[i] is the external ID of the i-th stored vector
+    vectors = inner.reconstruct_n(0, inner.ntotal).astype("float32")
+    if hasattr(inner, "make_direct_map"):
+        # An array direct map blocks remove_ids(); drop it again
+        inner.make_direct_map(False)
+    return ids, vectors
@@ -0,0 +1,212 @@
+"""
+In-process background queue for indexing jobs.
+
+A job is a callable run on one of `workers` threads. Jobs are deduplicated by key
+(the caller uses session + file hash: submitting the same file again returns the
+job already queued or running), and at most one job per group (session) is
+live: a newer submission cancels the older one. Cancellation is cooperative:
+the job calls check() between batches and stops with JobCancelled.
+
+The UI polls job.snapshot() for status and progress instead of blocking on the work.
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_STOP = object()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IndexJob:
+    def __init__(self, key: str, name: str, fn: Callable[["IndexJob"], Any] = None, group: str = None):
+        # Random, not a counter: ids are handed to HTTP clients and must not be guessable
+        self.job_id = f"job-{uuid.uuid4().hex}"
+        self.key = key
+        self.name = name
+        self.group = group
+        self.fn = fn
+        self.status = QUEUED
+        self.message = "Waiting for an indexing worker..."
+        self.progress: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @classmethod
+    def completed(cls, key: str, name: str, message: str, status: str = DONE, group: str = None) -> "IndexJob":
+        """An already-finished job, for requests that need no work (e.g. the file is indexed already)."""
+        job = cls(key, name, group=group)
+        job._finish(status, message)
+        return job
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Called by the job between units of work; raises JobCancelled once cancel() was called."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"{self.name} was cancelled")
+
+    def update(self, **progress):
+        self.progress.update(progress)
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def run(self):
+        """Run the job in the calling thread (the queue's workers use this too)."""
+        if self.cancelled:
+            self._finish(CANCELLED, "Cancelled before it started.")
+            return
+        self.status, self.started_at = RUNNING, time.time()
+        self.message = f"Indexing {self.name}..."
+        try:
+            result = self.fn(self)
+        except JobCancelled:
+            self._finish(CANCELLED, f"Cancelled indexing {self.name}.")
+        except Exception as e:
+            print(f"❌ [Jobs] {self.job_id} ({self.name}) failed: {e}")
+            self._finish(FAILED, str(e))
+        else:
+            self._finish(DONE, result if isinstance(result, str) else f"Indexed {self.name}")
+
+    def _finish(self, status: str, message: str):
+        self.status, self.message = status, message
+        self.finished_at = time.time()
+        self._finished.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id, "name": self.name, "status": self.status, "message": self.message,
+            "progress": dict(self.progress),
+            "elapsed_s": end - self.started_at if self.started_at else 0.0,
+        }
+
+
+class IndexJobQueue:
+    def __init__(self, workers: int = 2, keep_finished: int = 200):
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+        self._by_key: Dict[str, IndexJob] = {}
+        self._latest: Dict[str, IndexJob] = {}
+        self._threads = []
+
+    def _ensure_workers(self):
+        # Caller holds self._lock
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"index-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key: str, name: str, fn: Callable[[IndexJob], Any], group: str = None) -> IndexJob:
+        """
+        Queue fn(job). A live job with the same key is returned instead of queueing a duplicate;
+        any other live job in the same group is cancelled (the new file replaces it).
+        """
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and not existing.done and not existing.cancelled:
+                return existing
+            self._supersede(group, name)
+            job = IndexJob(key, name, fn, group)
+            self._track(job)
+            self._ensure_workers()
+        self._queue.put(job)
+        return job
+
+    def track(self, job: IndexJob):
+        """
+        Register a job that did not go through the queue (e.g. IndexJob.completed) for polling.
+        Like submit(), it replaces the live job of its group.
+        """
+        with self._lock:
+            self._supersede(job.group, job.name)
+            self._track(job)
+
+    def _supersede(self, group: Optional[str], name: str):
+        # Caller holds self._lock
+        if group is None:
+            return
+        for job in self._jobs.values():
+            if job.group == group and not job.done:
+                print(f"🛑 [Jobs] Cancelling {job.job_id} ({job.name}): replaced by {name}")
+                job.cancel()
+
+    def _track(self, job: IndexJob):
+        self._jobs[job.job_id] = job
+        self._by_key[job.key] = job
+        if job.group is not None:
+            self._latest[job.group] = job
+        # Forget the oldest finished jobs
+        finished = [j for j in self._jobs.values() if j.done]
+        for old in finished[:max(0, len(finished) - self.keep_finished)]:
+            self._jobs.pop(old.job_id, None)
+            if self._by_key.get(old.key) is old:
+                self._by_key.pop(old.key)
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        return self._jobs.get(job_id)
+
+    def find(self, key: str) -> Optional[IndexJob]:
+        return self._by_key.get(key)
+
+    def latest(self, group: str) -> Optional[IndexJob]:
+        return self._latest.get(group)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts["workers"] = len(self._threads)
+        return counts
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            job.run()
+
+    def close(self, cancel: bool = True):
+        with self._lock:
+            if cancel:
+                for job in self._jobs.values():
+                    if not job.done:
+                        job.cancel()
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join()
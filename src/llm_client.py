@@ -0,0 +1,294 @@
+"""
+Async streaming client for the Groq (OpenAI-compatible) chat completions API.
+
+All requests share one httpx.AsyncClient, so TLS connections to the API are
+pooled and kept alive across answers. HedgedLLM always starts with the first
+configured model (the one whose answers we want); if it has not produced a first
+token in time, the next model is started as well and whichever answers first
+wins (the others are cancelled). Time-to-first-token is tracked per model and
+only decides how long to wait before hedging: about twice a model's usual TTFT,
+never longer than `hedge_after`. A slow or failed response therefore costs one
+hedge, and never demotes the preferred model for later requests.
+
+Synchronous callers (Streamlit) use HedgedLLM.stream(), which runs the async
+generator on a shared background event loop and hands tokens over a queue.
+"""
+import asyncio
+import json
+import math
+import os
+import queue
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+import telemetry
+
+DEFAULT_BASE_URL = "https://api.groq.com/openai/v1"
+_DONE = object()
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class GroqStreamClient:
+    """Thin SSE client for POST /chat/completions with stream=true."""
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, max_connections: int = 20,
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the loop that actually runs the requests
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def stream(self, model: str, prompt: str, **params) -> AsyncIterator[str]:
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": True, **params}
+        async with self.client.stream("POST", "/chat/completions", json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", "replace")[:200]
+                raise LLMError(f"{model}: HTTP {response.status_code} {body}")
+            done = False
+            # Read through to the end of the body even after [DONE] so the connection goes back to the pool
+            async for line in response.aiter_lines():
+                if done or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    done = True
+                    continue
+                event = json.loads(data)
+                if "error" in event:
+                    raise LLMError(f"{model}: {event['error']}")
+                for choice in event.get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LatencyStats:
+    """EWMA of time-to-first-token per model; failures count as a slow sample."""
+
+    def __init__(self, alpha: float = 0.3, failure_penalty: float = 10.0):
+        self.alpha = alpha
+        self.failure_penalty = failure_penalty
+        self._lock = threading.Lock()
+        self._ttft: Dict[str, float] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _update(self, model: str, sample: float):
+        prev = self._ttft.get(model)
+        self._ttft[model] = sample if prev is None else (1 - self.alpha) * prev + self.alpha * sample
+
+    def record_success(self, model: str, ttft: float):
+        with self._lock:
+            self._update(model, ttft)
+            self._counts.setdefault(model, {"ok": 0, "failed": 0, "cancelled": 0})["ok"] += 1
+
+    def record_failure(self, model: str):
+        with self._lock:
+            self._update(model, self.failure_penalty)
+            self._counts.setdefault(model, {"ok": 0, "failed": 0, "cancelled": 0})["failed"] += 1
+
+    def record_cancelled(self, model: str, waited: Optional[float] = None):
+        """A hedge loser. If it had not answered yet, it was at least `waited` seconds slow."""
+        with self._lock:
+            if waited is not None:
+                self._update(model, waited)
+            self._counts.setdefault(model, {"ok": 0, "failed": 0, "cancelled": 0})["cancelled"] += 1
+
+    def hedge_delay(self, model: str, cap: float, factor: float = 2.0, floor: float = 0.25) -> float:
+        """
+        Seconds to wait for `model`'s first token before starting the next model: `factor` times
+        its usual TTFT, clamped to [floor, cap]. Unmeasured models (and cap=inf) wait `cap`.
+        """
+        with self._lock:
+            ttft = self._ttft.get(model)
+        if ttft is None or not math.isfinite(cap):
+            return cap
+        return min(cap, max(floor, factor * ttft))
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {m: {"ttft_ewma": self._ttft.get(m), **self._counts.get(m, {})}
+                    for m in set(self._ttft) | set(self._counts)}
+
+
+class _EventLoopThread:
+    """One daemon event loop per process; owns the pooled HTTP client."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-event-loop", daemon=True)
+        self.thread.start()
+
+
+_loop_thread: Optional[_EventLoopThread] = None
+_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None:
+            _loop_thread = _EventLoopThread()
+    return _loop_thread.loop
+
+
+class HedgedLLM:
+    def __init__(self, models: List[str], api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 hedge_after: float = 1.5, temperature: float = 0.1, max_tokens: int = 512,
+                 top_p: float = 0.9, max_connections: int = 20):
+        self.models = list(models)
+        self.hedge_after = hedge_after
+        self.params = {"temperature": temperature, "max_tokens": max_tokens, "top_p": top_p}
+        self.client = GroqStreamClient(api_key, base_url, max_connections=max_connections)
+        self.stats = LatencyStats()
+
+    async def _run(self, model: str, prompt: str, events: asyncio.Queue, tokens: asyncio.Queue):
+        """Stream one model into `tokens`; report the first token or an early failure on `events`."""
+        start = time.perf_counter()
+        first = True
+        try:
+            async for token in self.client.stream(model, prompt, **self.params):
+                if first:
+                    first = False
+                    self.stats.record_success(model, time.perf_counter() - start)
+                    await events.put(("first", model, None))
+                await tokens.put(token)
+            if first:
+                # Finished without a single token: treat like a failure so another model can answer
+                self.stats.record_failure(model)
+                await events.put(("error", model, LLMError(f"{model}: empty response")))
+            await tokens.put(_DONE)
+        except asyncio.CancelledError:
+            self.stats.record_cancelled(model, time.perf_counter() - start if first else None)
+            raise
+        except Exception as e:
+            if first:
+                self.stats.record_failure(model)
+                await events.put(("error", model, e))
+            else:
+                await tokens.put(e)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        # Configured priority, always: latency decides when to hedge, not who answers first
+        pending = list(self.models)
+        events: asyncio.Queue = asyncio.Queue()
+        runners: Dict[str, tuple] = {}
+        errors = []
+
+        def launch():
+            nonlocal latest
+            model = latest = pending.pop(0)
+            tokens: asyncio.Queue = asyncio.Queue()
+            runners[model] = (asyncio.create_task(self._run(model, prompt, events, tokens)), tokens)
+            if len(runners) > 1:
+                print(f"⏱️ [LLM] Hedging with {model}")
+                telemetry.inc("rag_llm_hedges_total", model=model)
+
+        latest = None
+        launch()
+        winner = None
+        try:
+            while winner is None:
+                try:
+                    timeout = self.stats.hedge_delay(latest, self.hedge_after) if pending else None
+                    kind, model, error = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    launch()
+                    continue
+                if kind == "first":
+                    winner = model
+                    telemetry.inc("rag_llm_wins_total", model=model)
+                    break
+                print(f"⚠️ [LLM] {model} failed: {error}")
+                telemetry.inc("rag_llm_failures_total", model=model)
+                errors.append(error)
+                runners.pop(model)
+                if pending:
+                    launch()
+                elif not runners:
+                    raise LLMError(f"All models failed: {errors[-1]}")
+
+            for model, (task, _) in runners.items():
+                if model != winner:
+                    task.cancel()
+
+            tokens = runners[winner][1]
+            while True:
+                item = await tokens.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task, _ in runners.values():
+                task.cancel()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Blocking iterator over astream(), driven by the shared background loop."""
+        loop = background_loop()
+        handoff: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for token in self.astream(prompt):
+                    handoff.put(token)
+                handoff.put(_DONE)
+            except Exception as e:
+                handoff.put(e)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = handoff.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early (e.g. Streamlit rerun): stop the request too
+            future.cancel()
+
+    def close(self):
+        loop = background_loop()
+        asyncio.run_coroutine_threadsafe(self.client.aclose(), loop).result(timeout=5)
+
+
+def llm_from_env(models: List[str], temperature: float = 0.1) -> HedgedLLM:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("❌ GROQ_API_KEY not found.")
+    return HedgedLLM(
+        models,
+        api_key,
+        base_url=os.getenv("GROQ_BASE_URL", DEFAULT_BASE_URL),
+        hedge_after=float(os.getenv("LLM_HEDGE_AFTER", "1.5")),
+        temperature=temperature,
+        max_tokens=512,
+        top_p=0.9,
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+    )
@@ -1,16 +1,21 @@
+import hashlib
 import os
+import shutil
 import tempfile
-from langchain_community.document_loaders import (
-    PyPDFLoader, 
-    Docx2txtLoader, 
-    TextLoader, 
-    CSVLoader,
-    UnstructuredMarkdownLoader
-)
+import time
+
+import telemetry
 
 def get_loader_for_file(file_path):
     """Factory to choose the right loader based on extension."""
     ext = os.path.splitext(file_path)[1].lower()
+    # langchain_community's loaders cost ~1s to import; only pay it when a file is actually loaded
+    from langchain_community.document_loaders import (
+        PyPDFLoader, 
+        Docx2txtLoader, 
+        TextLoader, 
+        CSVLoader,
+    )
     
     if ext == ".pdf":
         return PyPDFLoader(file_path)
@@ -21,63 +26,116 @@ def get_loader_for_file(file_path):
     elif ext == ".txt":
         return TextLoader(file_path)
     elif ext == ".md":
-        return UnstructuredMarkdownLoader(file_path)
+        # Raw Markdown: the chunker splits on its headings (Unstructured would flatten them away)
+        return TextLoader(file_path, encoding="utf-8")
     return None
 
-def load_documents(source):
+def _timed_pages(pages, name: str):
+    """Yield pages, timing only the loader's own work (not the consumer's) as one "load.file" stage."""
+    elapsed, count = 0.0, 0
+    it = iter(pages)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                page = next(it)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            count += 1
+            yield page
+    finally:
+        telemetry.record("load.file", elapsed, file=os.path.basename(name), pages=count)
+        telemetry.inc("rag_pages_loaded_total", count)
+
+def file_digest(source, length: int = 16, block_size: int = 1 << 20):
     """
-    Loads documents from a file path (str) or Streamlit upload (object).
-    Does NOT auto-load profile data; passes strict single source.
+    Content hash of a file path (str) or Streamlit upload (object).
+    Used as a stable document ID: the same bytes always map to the same index.
+    Read in `block_size` blocks, never as one bytes object; an upload's position is restored.
+    """
+    hasher = hashlib.sha256()
+    if isinstance(source, str):
+        if not os.path.exists(source):
+            return None
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                hasher.update(block)
+    elif hasattr(source, "read") and hasattr(source, "seek"):
+        position = source.tell()
+        source.seek(0)
+        try:
+            for block in iter(lambda: source.read(block_size), b""):
+                hasher.update(block)
+        finally:
+            source.seek(position)
+    else:
+        return None
+    return hasher.hexdigest()[:length]
+
+def iter_documents(source, copy_block_size: int = 1 << 20):
+    """
+    Lazily yields documents (pages, for PDFs) from a file path (str) or Streamlit upload (object).
+    Nothing is materialised up front: uploads are copied to disk in blocks and
+    pages are produced one at a time by the loader's lazy_load().
+    A loader error is logged and re-raised, even after some pages were yielded, so a
+    half-read file fails its indexing job instead of becoming a partial index.
     """
     if not source:
-        return []
+        return
 
     # CASE 1: Source is a File Path (String)
     if isinstance(source, str):
         if not os.path.exists(source):
             print(f"❌ [Loader] File not found: {source}")
-            return []
+            return
         
         loader = get_loader_for_file(source)
         if loader:
             try:
                 print(f"📄 [Loader] Loading file: {source}")
-                return loader.load()
+                yield from _timed_pages(loader.lazy_load(), source)
             except Exception as e:
-                print(f"❌ [Loader] Error: {e}")
+                print(f"❌ [Loader] Error reading {source}: {e}")
+                raise
         else:
             print(f"⚠️ [Loader] Unsupported file type: {source}")
-        return []
+        return
 
     # CASE 2: Source is a Streamlit UploadedFile Object
     elif hasattr(source, 'name'):
         print(f"📂 [Loader] Processing Streamlit upload: {source.name}")
         suffix = os.path.splitext(source.name)[1]
         
-        # Save to temp file because loaders need a path
+        # Save to temp file because loaders need a path; stream it instead of getvalue()
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(source.getvalue())
+            source.seek(0)
+            shutil.copyfileobj(source, tmp, copy_block_size)
             tmp_path = tmp.name
 
-        docs = []
         try:
             loader = get_loader_for_file(tmp_path)
             if loader:
-                docs = loader.load()
-                # Fix metadata since temp file loses original name
-                for doc in docs:
+                for doc in _timed_pages(loader.lazy_load(), source.name):
+                    # Fix metadata since temp file loses original name
                     doc.metadata["source"] = source.name
+                    yield doc
             else:
                 print(f"⚠️ [Loader] Unsupported format: {source.name}")
         except Exception as e:
-            print(f"❌ [Loader] Streamlit Error: {e}")
+            print(f"❌ [Loader] Error reading upload {source.name}: {e}")
+            raise
         finally:
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
-        
-        return docs
 
-    return []
+def load_documents(source):
+    """
+    Loads documents from a file path (str) or Streamlit upload (object).
+    Does NOT auto-load profile data; passes strict single source.
+    """
+    return list(iter_documents(source))
 
 if __name__ == "__main__":
     # Test with string path
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from embedding_backends import default_backend, load_sentence_transformer
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded embedding models.
+    Every store, pipeline and query path asks the registry for a model instead of
+    constructing its own SentenceTransformer, so one process holds one copy per
+    (model name, device, backend) no matter how many stores are created.
+    Callers hold a reference only while they use the model (see using_model), so with
+    an idle_timeout a model nobody has used for that long is unloaded.
+    """
+
+    def __init__(self, idle_timeout: Optional[float] = None):
+        # idle_timeout=None keeps models loaded forever once their refcount hits 0
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, str, str], "SentenceTransformer"] = {}
+        self._refcounts: Dict[Tuple[str, str, str], int] = {}
+        self._released_at: Dict[Tuple[str, str, str], float] = {}
+        self._reaper = None
+
+    @staticmethod
+    def _key(model_name: str, device: Optional[str], backend: Optional[str] = None) -> Tuple[str, str, str]:
+        return (model_name, device or "cpu", backend or default_backend())
+
+    def acquire(self, model_name: str, device: Optional[str] = None, backend: Optional[str] = None) -> "SentenceTransformer":
+        key = self._key(model_name, device, backend)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                # sentence_transformers is imported lazily, so modules that only chunk never pull in torch
+                print(f"[INFO] Loading embedding model: {model_name} ({key[1]}, {key[2]})...")
+                start = time.perf_counter()
+                model = load_sentence_transformer(model_name, device=key[1], backend=key[2])
+                self._models[key] = model
+                print(f"[INFO] Loaded {model_name} in {time.perf_counter() - start:.2f}s")
+            self._refcounts[key] = self._refcounts.get(key, 0) + 1
+            self._released_at.pop(key, None)
+            return model
+
+    def release(self, model_name: str, device: Optional[str] = None, backend: Optional[str] = None):
+        key = self._key(model_name, device, backend)
+        with self._lock:
+            count = self._refcounts.get(key, 0)
+            if count <= 0:
+                return
+            self._refcounts[key] = count - 1
+            if count - 1 == 0 and self.idle_timeout is not None:
+                self._released_at[key] = time.monotonic()
+                self._ensure_reaper()
+
+    def _ensure_reaper(self):
+        # Caller holds self._lock
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name="model-registry-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(max(1.0, self.idle_timeout / 4))
+            with self._lock:
+                self._unload_idle_locked()
+                if not self._released_at:
+                    self._reaper = None
+                    return
+
+    def unload_idle(self, now: Optional[float] = None):
+        """Drop models whose refcount has been 0 for longer than idle_timeout."""
+        with self._lock:
+            self._unload_idle_locked(now)
+
+    def _unload_idle_locked(self, now: Optional[float] = None):
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic() if now is None else now
+        for key, released in list(self._released_at.items()):
+            if self._refcounts.get(key, 0) == 0 and now - released >= self.idle_timeout:
+                self._models.pop(key, None)
+                self._refcounts.pop(key, None)
+                self._released_at.pop(key, None)
+                print(f"[INFO] Unloaded idle embedding model: {key[0]} ({key[1]}, {key[2]})")
+
+    def stats(self):
+        with self._lock:
+            return {f"{name}@{device}/{backend}": self._refcounts.get((name, device, backend), 0)
+                    for name, device, backend in self._models}
+
+
+def _idle_timeout_from_env() -> Optional[float]:
+    value = os.getenv("EMBEDDING_IDLE_UNLOAD_SECONDS")
+    return float(value) if value else None
+
+
+_registry = ModelRegistry(idle_timeout=_idle_timeout_from_env())
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
+
+
+def acquire_model(model_name: str, device: Optional[str] = None, backend: Optional[str] = None) -> "SentenceTransformer":
+    return _registry.acquire(model_name, device, backend)
+
+
+def release_model(model_name: str, device: Optional[str] = None, backend: Optional[str] = None):
+    _registry.release(model_name, device, backend)
+
+
+@contextmanager
+def using_model(model_name: str, device: Optional[str] = None, backend: Optional[str] = None):
+    """Hold a reference on the shared model for the duration of one use."""
+    model = _registry.acquire(model_name, device, backend)
+    try:
+        yield model
+    finally:
+        _registry.release(model_name, device, backend)
@@ -0,0 +1,114 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+_WS = re.compile(r"\s+")
+_TOKEN = re.compile(r"\s*\S+|\s+$")
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer."""
+    return _WS.sub(" ", query.strip().lower()).rstrip(" ?!.")
+
+
+class QueryCache:
+    """
+    Two-level answer cache in front of retrieval + generation.
+
+    Level 1: exact match on (namespace, normalized query, mode, index version).
+    Level 2: cosine similarity between query embeddings, within the same
+             (namespace, mode, index version), above `similarity_threshold`.
+    `namespace` identifies the store that answered (its persist_dir), so one
+    session's document answers can never be returned to another session, even
+    when their index versions happen to match. It is a required argument.
+    Entries are LRU-ordered and expire after `ttl` seconds. Because the index
+    version is part of every key, rebuilding an index makes its old answers
+    unreachable; invalidate() also drops them eagerly.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600, similarity_threshold: float = 0.93):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, str, str], dict]" = OrderedDict()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return self.ttl is not None and now - entry["created"] > self.ttl
+
+    def get_exact(self, query: str, mode: str, index_version: str, *, namespace: str) -> Optional[str]:
+        key = (namespace, normalize_query(query), mode, index_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, time.monotonic()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.stats["exact_hits"] += 1
+            return entry["answer"]
+
+    def get_similar(self, embedding: np.ndarray, mode: str, index_version: str, *, namespace: str) -> Optional[str]:
+        query_vec = self._unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_sim = None, self.similarity_threshold
+            for key, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    continue
+                if key[0] != namespace or key[2] != mode or key[3] != index_version or entry["embedding"] is None:
+                    continue
+                sim = float(np.dot(entry["embedding"], query_vec))
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.stats["semantic_hits"] += 1
+            return self._entries[best_key]["answer"]
+
+    def put(self, query: str, mode: str, index_version: str, answer: str, embedding: np.ndarray = None, *,
+            namespace: str):
+        key = (namespace, normalize_query(query), mode, index_version)
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "embedding": None if embedding is None else self._unit(embedding),
+                "created": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, mode: str = None, namespace: str = None):
+        """Drop entries of `mode` and/or `namespace` (everything when neither is given)."""
+        with self._lock:
+            if mode is None and namespace is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries
+                        if (mode is None or k[2] == mode) and (namespace is None or k[0] == namespace)]:
+                del self._entries[key]
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        vec = np.asarray(embedding, dtype="float32").reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    @staticmethod
+    def replay(answer: str) -> Iterator[str]:
+        """Re-emit a cached answer word by word so the UI streams it like a live one."""
+        for match in _TOKEN.finditer(answer):
+            yield match.group(0)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,329 @@
+"""
+Headless HTTP API for the RAG engine, decoupled from Streamlit: a plain ASGI app.
+
+    pip install -e ".[server]"
+    python src/server.py --port 8000
+    uvicorn server:app --app-dir src --port 8000          # or any ASGI server, one worker
+
+Endpoints
+  POST   /query        JSON {"query", "mode": "profile"|"document", "session_id", "doc_id", "top_k"}
+                       -> text/event-stream: "token" events ({"text": ...}) then "done" (or "error")
+                       session_id is required in document mode; top_k is an int, clamped to 1..50
+  POST   /upload       ?session_id=...&filename=report.pdf, body = raw file bytes -> 202 + job
+  GET    /jobs/<id>    indexing job status;  DELETE /jobs/<id> cancels it
+  GET    /health       engine state and current load
+  GET    /metrics      Prometheus text (see telemetry)
+
+The server runs as ONE process: it builds one engine (chat.get_engine) at startup
+and shares it between all requests. Upload sessions, indexing jobs and the answer
+cache live in that process's memory, so with several workers a job poll or a
+document question routed to another worker would not find them. At most MAX_CONCURRENT_QUERIES answers stream at a
+time; up to MAX_QUEUED_QUERIES more wait for a slot (for QUERY_QUEUE_TIMEOUT
+seconds at most) and anything beyond that gets 503 + Retry-After right away, so
+overload sheds requests instead of growing every request's latency. Tokens are
+pulled from the answer generator one at a time, only after the previous one was
+sent, and a client that disconnects stops its LLM stream.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import tempfile
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+import telemetry
+
+_END = object()
+MAX_TOP_K = 50
+# Session ids name a directory of the user's uploads; there is no shared default session
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: list = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or []
+
+
+def session_id_from(value) -> str:
+    if value is None:
+        raise HTTPError(400, "'session_id' is required")
+    if not isinstance(value, str) or not _SESSION_ID.match(value):
+        raise HTTPError(400, "'session_id' must be 1-64 letters, digits, '-' or '_'")
+    return value
+
+
+class RAGServer:
+    def __init__(self, engine_factory: Callable = None, max_concurrent: int = 16, max_queued: int = 64,
+                 queue_timeout: float = 10.0, max_upload_mb: float = 50.0):
+        self.engine_factory = engine_factory
+        self.engine = None
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_upload_bytes = int(max_upload_mb * 1024 * 1024)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+        # Answer generators block (embedding, LLM stream); each in-flight answer needs a thread
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent + 4, thread_name_prefix="rag-answer")
+
+    # --- ASGI plumbing -----------------------------------------------------
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            await self._route(scope, receive, send)
+        except HTTPError as e:
+            await self._json(send, e.status, {"error": str(e)}, e.headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.start()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def start(self):
+        """Build this process's engine (once) before the first request is accepted."""
+        if self.engine is None:
+            factory = self.engine_factory
+            if factory is None:
+                from chat import get_engine
+                factory = get_engine
+            self.engine = await asyncio.get_running_loop().run_in_executor(None, factory)
+
+    async def _route(self, scope, receive, send):
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        if path == "/health" and method == "GET":
+            await self._json(send, 200, self.health())
+        elif path == "/metrics" and method == "GET":
+            body = telemetry.get_telemetry().registry.render().encode("utf-8")
+            await self._respond(send, 200, body, [(b"content-type", b"text/plain; version=0.0.4")])
+        elif self.engine is None:
+            raise HTTPError(503, "Engine is starting", [(b"retry-after", b"5")])
+        elif path == "/query" and method == "POST":
+            await self.query(scope, receive, send)
+        elif path == "/upload" and method == "POST":
+            await self.upload(scope, receive, send)
+        elif path.startswith("/jobs/") and method in ("GET", "DELETE"):
+            job = self.engine.index_jobs.get(path[len("/jobs/"):])
+            if job is None:
+                raise HTTPError(404, "Unknown job")
+            if method == "DELETE":
+                job.cancel()
+            await self._json(send, 200, job.snapshot())
+        else:
+            raise HTTPError(404, f"No route for {method} {path}")
+
+    async def _respond(self, send, status: int, body: bytes, headers: list = None):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-length", str(len(body)).encode())] + (headers or [])})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _json(self, send, status: int, payload: dict, headers: list = None):
+        body = json.dumps(payload).encode("utf-8")
+        await self._respond(send, status, body, [(b"content-type", b"application/json")] + (headers or []))
+
+    @staticmethod
+    async def _read_body(receive, limit: int) -> bytes:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise HTTPError(413, "Request body too large")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    # --- endpoints ---------------------------------------------------------
+
+    def health(self) -> dict:
+        status = {
+            "status": "ok" if self.engine is not None else "starting",
+            "active_queries": self.active, "queued_queries": self.waiting,
+            "max_concurrent": self.max_concurrent, "max_queued": self.max_queued, "rejected": self.rejected,
+        }
+        if self.engine is not None:
+            status["index_jobs"] = self.engine.index_jobs.stats()
+            status["boot"] = self.engine.boot_timings
+        return status
+
+    async def _acquire(self) -> bool:
+        """A streaming slot, waiting in a bounded queue; False means shed the request."""
+        if self.active >= self.max_concurrent and self.waiting >= self.max_queued:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def _release(self):
+        self.active -= 1
+        self._slots.release()
+
+    async def query(self, scope, receive, send):
+        try:
+            body = json.loads(await self._read_body(receive, 64 * 1024) or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        query = body.get("query")
+        mode = body.get("mode", "profile")
+        if not isinstance(query, str) or not query.strip():
+            raise HTTPError(400, "'query' is required")
+        if mode not in ("profile", "document"):
+            raise HTTPError(400, "'mode' must be 'profile' or 'document'")
+        top_k = body.get("top_k", 6)
+        if isinstance(top_k, bool) or not isinstance(top_k, int):
+            raise HTTPError(400, "'top_k' must be an integer")
+        top_k = max(1, min(top_k, MAX_TOP_K))
+        # Profile answers are the same for everyone; documents belong to one session
+        session_id = session_id_from(body.get("session_id")) if mode == "document" else "default"
+        doc_id = body.get("doc_id")
+        if doc_id is not None and not isinstance(doc_id, str):
+            raise HTTPError(400, "'doc_id' must be a string")
+
+        if not await self._acquire():
+            self.rejected += 1
+            telemetry.inc("rag_http_rejected_total")
+            raise HTTPError(503, "Server busy, retry later", [(b"retry-after", b"1")])
+        try:
+            await self._stream_answer(query, mode, top_k, session_id, doc_id, receive, send)
+        finally:
+            self._release()
+
+    async def _stream_answer(self, query: str, mode: str, top_k: int, session_id: str, doc_id: Optional[str],
+                             receive, send):
+        loop = asyncio.get_running_loop()
+        answer = self.engine.search_and_answer(query, top_k=top_k, mode=mode, session_id=session_id, doc_id=doc_id)
+        # One context per request: the generator (and its trace) resumes on different pool threads
+        context = contextvars.copy_context()
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch_disconnect())
+        start = time.perf_counter()
+        ttft: Optional[float] = None
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]})
+        try:
+            while not disconnected.is_set():
+                token = await loop.run_in_executor(self._executor, context.run, next, answer, _END)
+                if token is _END:
+                    break
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                await send({"type": "http.response.body", "body": sse("token", {"text": token}), "more_body": True})
+            else:
+                return
+            done = {"ttft_ms": round((ttft or 0.0) * 1000, 1), "total_ms": round((time.perf_counter() - start) * 1000, 1)}
+            await send({"type": "http.response.body", "body": sse("done", done)})
+        except Exception as e:
+            if not disconnected.is_set():
+                await send({"type": "http.response.body", "body": sse("error", {"error": str(e)})})
+        finally:
+            watcher.cancel()
+            # Closing the generator cancels the LLM stream if the client went away mid-answer
+            await loop.run_in_executor(self._executor, context.run, answer.close)
+
+    async def upload(self, scope, receive, send):
+        params = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        filename = os.path.basename(params.get("filename", ""))
+        suffix = os.path.splitext(filename)[1].lower()
+        if suffix not in (".pdf", ".txt", ".md", ".docx", ".csv"):
+            raise HTTPError(400, "'filename' with a .pdf, .txt, .md, .docx or .csv extension is required")
+        session_id = session_id_from(params.get("session_id"))
+
+        # Stream the body to disk; never hold a whole upload in memory
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        size = 0
+        try:
+            with tmp:
+                while True:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        raise HTTPError(400, "Client disconnected")
+                    chunk = message.get("body", b"")
+                    size += len(chunk)
+                    if size > self.max_upload_bytes:
+                        raise HTTPError(413, f"Upload larger than {self.max_upload_bytes // (1024 * 1024)} MB")
+                    tmp.write(chunk)
+                    if not message.get("more_body"):
+                        break
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(
+            None, lambda: self.engine.submit_upload(tmp.name, session_id, name=filename, delete_after=True),
+        )
+        await self._json(send, 202, job.snapshot())
+
+
+def _from_env() -> RAGServer:
+    return RAGServer(
+        max_concurrent=int(os.getenv("MAX_CONCURRENT_QUERIES", "16")),
+        max_queued=int(os.getenv("MAX_QUEUED_QUERIES", "64")),
+        queue_timeout=float(os.getenv("QUERY_QUEUE_TIMEOUT", "10")),
+        max_upload_mb=float(os.getenv("MAX_UPLOAD_MB", "50")),
+    )
+
+
+app = _from_env()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit('❌ uvicorn is not installed: pip install -e ".[server]"')
+    src = os.path.dirname(os.path.abspath(__file__))
+    # A single worker: sessions and jobs are per-process state (see above)
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=1, app_dir=src,
+                log_level="warning", timeout_graceful_shutdown=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+A vector store split across N shard processes, searched by scatter-gather.
+
+Each shard is an ordinary FaissVectorStore (own directory, own FAISS index, BM25
+and chunk store) living in its own process, reached over a local socket pair
+(multiprocessing.Pipe). The parent embeds (one model, shared with the rest of the
+app), places every chunk on a shard, and keeps the chunk -> shard routing table:
+
+    placement="hash"         shard = chunk_id % n   (chunk IDs are already hashes)
+    placement="round_robin"  shard = next in turn   (even fill, order-dependent)
+
+A query embeds once, sends one request per shard concurrently, and merges: dense
+hits by score (cosine scores are comparable across stores), BM25 hits by score,
+then the same reciprocal-rank fusion as FaissVectorStore.query(). A shard only
+holds its slice of the corpus, so the corpus can outgrow one process and every
+query scans 1/n of it per process.
+
+add_shard() starts an empty shard that new chunks are placed on; rebuild_shard()
+rebuilds a copy in a new process and swaps it in, so the shard keeps answering
+from its old index until the new one is ready.
+
+Shard processes are spawned (not forked from a process holding torch/OpenMP
+threads), so a script that creates a ShardedVectorStore needs the usual
+`if __name__ == "__main__":` guard.
+
+    store = ShardedVectorStore("faiss_sharded", shards=4)
+    store.build_from_stream(iter_documents("corpus.pdf"))
+    store.query("revenue by region", top_k=5)
+"""
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+import telemetry
+from bm25 import reciprocal_rank_fusion
+from chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS
+from embedding import EmbeddingPipeline
+from embedding_service import get_embedding_service
+from index_factory import IndexConfig
+from vector_database import FaissVectorStore, atomic_write
+
+PLACEMENTS = ("hash", "round_robin")
+
+
+def _serve_shard(conn, persist_dir: str, store_kwargs: dict, threads: int):
+    """Shard process main loop: one FaissVectorStore, requests answered in order."""
+    import faiss
+    faiss.omp_set_num_threads(threads)
+    store = FaissVectorStore(persist_dir, **store_kwargs)
+    if os.path.exists(os.path.join(persist_dir, "faiss.index")):
+        store.load()
+
+    def retrieve(query_embedding, query_text, top_k, candidates, allowed_ids, lexical):
+        dense = store.search(query_embedding, top_k=candidates or top_k, allowed_ids=allowed_ids)
+        if not lexical or len(store.bm25) == 0:
+            return dense, []
+        return dense, store.lexical_search(query_text, top_k=candidates, allowed_ids=allowed_ids)
+
+    def stats():
+        return {"vectors": store.index.ntotal if store.index is not None else 0,
+                "chunks": len(store.metadata), "version": store.version,
+                "index": store.index_config.resolved.get("factory")}
+
+    ops = {"retrieve": retrieve, "stats": stats}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        request_id, op, args, kwargs = message
+        try:
+            fn = ops.get(op) or getattr(store, op)
+            conn.send((request_id, True, fn(*args, **kwargs)))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class ShardError(RuntimeError):
+    pass
+
+
+class Shard:
+    """Parent-side handle on one shard process: call() returns a Future for the shard's answer."""
+
+    def __init__(self, persist_dir: str, store_kwargs: dict, threads: int = 1):
+        self.persist_dir = persist_dir
+        context = multiprocessing.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self.process = context.Process(target=_serve_shard, args=(child, persist_dir, store_kwargs, threads),
+                                       name=os.path.basename(persist_dir), daemon=True)
+        self.process.start()
+        child.close()
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name=f"{self.process.name}-reader", daemon=True)
+        self._reader.start()
+
+    def call(self, op: str, *args, **kwargs) -> Future:
+        future: Future = Future()
+        with self._send_lock:
+            if not self._reader.is_alive():
+                raise ShardError(f"Shard {self.persist_dir} is not running")
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            self._conn.send((request_id, op, args, kwargs))
+        return future
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, result = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(ShardError(f"{self.persist_dir}: {result}"))
+        # The process exited (or was closed): nothing pending will ever be answered
+        for future in list(self._pending.values()):
+            future.set_exception(ShardError(f"Shard {self.persist_dir} stopped"))
+        self._pending.clear()
+
+    def close(self, timeout: float = 30.0):
+        """Stop after answering everything already sent."""
+        with self._send_lock:
+            if self.process.is_alive():
+                self._conn.send(None)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._reader.join(timeout)
+        self._conn.close()
+
+
+def _gather(futures: List[Future]) -> list:
+    return [future.result() for future in futures]
+
+
+class ShardedVectorStore:
+    def __init__(self, persist_dir: str = "faiss_sharded", embedding_model: str = "all-MiniLM-L6-v2",
+                 shards: int = 4, placement: str = "hash", chunk_size: int = CHUNK_TOKENS, chunk_overlap: int = CHUNK_OVERLAP_TOKENS,
+                 index_config: IndexConfig = None, hybrid: bool = True, threads_per_shard: int = None):
+        if placement not in PLACEMENTS:
+            raise ValueError(f"placement must be one of {PLACEMENTS}, not {placement!r}")
+        self.persist_dir = persist_dir
+        self.embedding_model = embedding_model
+        self.placement = placement
+        self.hybrid = hybrid
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.store_kwargs = {"embedding_model": embedding_model, "chunk_size": chunk_size,
+                             "chunk_overlap": chunk_overlap, "index_config": index_config or IndexConfig(),
+                             "hybrid": hybrid}
+        # Shards share the machine: by default their FAISS threads split the cores between them
+        self.threads_per_shard = threads_per_shard
+        # chunk ID -> shard position; persisted as routes.npz
+        self.routes: Dict[int, int] = {}
+        # Shard directory names inside persist_dir, by position
+        self.shard_names: List[str] = []
+        self.shards: List[Shard] = []
+        self._next = 0
+        # Writes (placement + routing) are serialised; searches only read the shard list
+        self._write_lock = threading.RLock()
+
+        manifest = self._read_manifest()
+        if manifest:
+            self.placement = manifest.get("placement", self.placement)
+            self._next = manifest.get("next", 0)
+            self.shard_names = manifest["shards"]
+            self._load_routes()
+        else:
+            self.shard_names = [self._new_shard_name(i) for i in range(shards)]
+        self.shards = [self._start(name) for name in self.shard_names]
+        print(f"[INFO] Sharded store '{persist_dir}': {len(self.shards)} shards, {len(self.routes)} chunks "
+              f"({self.placement} placement)")
+
+    # --- layout ------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.persist_dir, "shards.json")
+
+    @property
+    def routes_path(self) -> str:
+        return os.path.join(self.persist_dir, "routes.npz")
+
+    @staticmethod
+    def _new_shard_name(position: int) -> str:
+        return f"shard-{position:02d}-{uuid.uuid4().hex[:6]}"
+
+    def _shard_path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def _threads(self) -> int:
+        if self.threads_per_shard:
+            return self.threads_per_shard
+        return max(1, (os.cpu_count() or 1) // max(1, len(self.shard_names)))
+
+    def _start(self, name: str) -> Shard:
+        return Shard(self._shard_path(name), self.store_kwargs, self._threads())
+
+    def _read_manifest(self) -> Optional[dict]:
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        manifest = {"shards": self.shard_names, "placement": self.placement, "next": self._next}
+        atomic_write(self.manifest_path, json.dumps(manifest).encode("utf-8"))
+
+    def _load_routes(self):
+        if os.path.exists(self.routes_path):
+            with np.load(self.routes_path) as data:
+                self.routes = dict(zip(data["ids"].tolist(), data["shards"].tolist()))
+
+    def _save_routes(self):
+        buf = io.BytesIO()
+        np.savez(buf, ids=np.fromiter(self.routes.keys(), dtype="int64", count=len(self.routes)),
+                 shards=np.fromiter(self.routes.values(), dtype="int32", count=len(self.routes)))
+        atomic_write(self.routes_path, buf.getvalue())
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    # --- writes ------------------------------------------------------------
+
+    def _place(self, ids: List[int]) -> List[int]:
+        n = len(self.shards)
+        if self.placement == "hash":
+            return [cid % n for cid in ids]
+        start, self._next = self._next, self._next + len(ids)
+        return [(start + i) % n for i in range(len(ids))]
+
+    def add_embeddings(self, embeddings: np.ndarray, metadatas: List[Dict[str, Any]], ids: List[int],
+                       wait: bool = True) -> List[Future]:
+        """
+        Place and send one batch; every shard adds its part in parallel. Chunks already routed are
+        skipped. With wait=False the shards' futures are returned so the caller can overlap the
+        next batch's embedding with this batch's indexing.
+        """
+        embeddings = np.asarray(embeddings, dtype="float32")
+        with self._write_lock:
+            fresh = [i for i, cid in enumerate(ids) if int(cid) not in self.routes]
+            if not fresh:
+                return []
+            fresh_ids = [int(ids[i]) for i in fresh]
+            placed = self._place(fresh_ids)
+            futures = []
+            with telemetry.span("shard.add", vectors=len(fresh), shards=len(self.shards)):
+                for position, shard in enumerate(self.shards):
+                    rows = [i for i, p in zip(fresh, placed) if p == position]
+                    if rows:
+                        futures.append(shard.call("add_embeddings", embeddings[rows],
+                                                  [metadatas[i] for i in rows], [int(ids[i]) for i in rows]))
+                self.routes.update(zip(fresh_ids, placed))
+        if wait:
+            _gather(futures)
+        return futures
+
+    def build_from_stream(self, documents: Iterable[Any], batch_size: int = 64,
+                          progress_callback: Callable[[dict], None] = None) -> int:
+        """
+        Same contract as FaissVectorStore.build_from_stream(). Batches are embedded here and indexed
+        by the shards; one batch is indexed while the next one is embedded.
+        """
+        progress = {"pages": 0, "total_pages": None, "chunks": 0}
+
+        def counted(docs):
+            for doc in docs:
+                progress["pages"] += 1
+                progress["total_pages"] = progress["total_pages"] or doc.metadata.get("total_pages")
+                yield doc
+
+        print(f"[INFO] Streaming documents into {len(self.shards)} shards of '{self.persist_dir}' (batch size {batch_size})...")
+        emb_pipe = EmbeddingPipeline(model_name=self.embedding_model, chunk_size=self.chunk_size,
+                                     chunk_overlap=self.chunk_overlap)
+        seen, in_flight = {}, []
+        try:
+            for batch in emb_pipe.iter_batches(counted(documents), batch_size=batch_size):
+                ids = FaissVectorStore._assign_ids(batch, seen)
+                with self._write_lock:
+                    keep = [i for i, cid in enumerate(ids) if cid not in self.routes]
+                if keep:
+                    chunks = [batch[i] for i in keep]
+                    with telemetry.span("index.embed", chunks=len(chunks)):
+                        vectors = emb_pipe.embed_chunks(chunks, show_progress=False)
+                    metadatas = [dict(c.metadata, text=c.page_content, chunk_id=ids[i]) for i, c in zip(keep, chunks)]
+                    _gather(in_flight)
+                    in_flight = self.add_embeddings(vectors, metadatas, [ids[i] for i in keep], wait=False)
+                progress["chunks"] += len(batch)
+                if progress_callback:
+                    progress_callback(dict(progress))
+            _gather(in_flight)
+        finally:
+            emb_pipe.close()
+        if not self.routes:
+            print("[WARN] No chunks created. Check document content.")
+            return 0
+        self.save()
+        return progress["chunks"]
+
+    def delete(self, ids: List[int]):
+        with self._write_lock:
+            by_shard: Dict[int, List[int]] = {}
+            for cid in ids:
+                position = self.routes.pop(int(cid), None)
+                if position is not None:
+                    by_shard.setdefault(position, []).append(int(cid))
+            _gather([self.shards[p].call("delete", part) for p, part in by_shard.items()])
+
+    def save(self):
+        with self._write_lock:
+            _gather([shard.call("save") for shard in self.shards])
+            os.makedirs(self.persist_dir, exist_ok=True)
+            self._save_routes()
+            self._write_manifest()
+
+    # --- topology ----------------------------------------------------------
+
+    def add_shard(self) -> int:
+        """Start an empty shard; new chunks are placed across it too. Existing chunks stay where they are."""
+        with self._write_lock:
+            name = self._new_shard_name(len(self.shard_names))
+            self.shard_names = self.shard_names + [name]
+            self.shards = self.shards + [self._start(name)]
+            self._write_manifest()
+            print(f"[INFO] Added shard {len(self.shards) - 1} ({name})")
+            return len(self.shards) - 1
+
+    def rebuild_shard(self, position: int, backend: str = "auto"):
+        """
+        Rebuild one shard's index (e.g. with another backend) without taking it offline:
+        a copy is rebuilt in a new process while the old one keeps answering, then swapped in.
+        Writes wait for the swap; reads do not.
+        """
+        with self._write_lock:
+            old, old_name = self.shards[position], self.shard_names[position]
+            old.call("save").result()
+            new_name = self._new_shard_name(position)
+            shutil.copytree(self._shard_path(old_name), self._shard_path(new_name))
+            replacement = self._start(new_name)
+            try:
+                replacement.call("rebuild_index", backend).result()
+                replacement.call("save").result()
+            except Exception:
+                replacement.close()
+                shutil.rmtree(self._shard_path(new_name), ignore_errors=True)
+                raise
+            shards, names = list(self.shards), list(self.shard_names)
+            shards[position], names[position] = replacement, new_name
+            # Searches pick up the new list atomically; in-flight ones finish on the old shard
+            self.shards, self.shard_names = shards, names
+            self._write_manifest()
+        old.close()
+        shutil.rmtree(self._shard_path(old_name), ignore_errors=True)
+        print(f"[INFO] Rebuilt shard {position} ({new_name})")
+
+    # --- reads -------------------------------------------------------------
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        with telemetry.span("query.embed"):
+            return get_embedding_service(self.embedding_model).encode([query_text])
+
+    def _split_allowed(self, allowed_ids: np.ndarray, n: int) -> List[Optional[np.ndarray]]:
+        if allowed_ids is None:
+            return [None] * n
+        parts = [[] for _ in range(n)]
+        for cid in np.asarray(allowed_ids, dtype="int64").tolist():
+            position = self.routes.get(cid)
+            if position is not None:
+                parts[position].append(cid)
+        return [np.asarray(p, dtype="int64") for p in parts]
+
+    def _scatter(self, query_embedding, query_text, top_k, candidates, allowed_ids, lexical):
+        shards = self.shards
+        allowed = self._split_allowed(allowed_ids, len(shards))
+        with telemetry.span("shard.scatter", shards=len(shards)):
+            futures = [
+                shard.call("retrieve", query_embedding, query_text, top_k, candidates, part, lexical)
+                for shard, part in zip(shards, allowed)
+                if part is None or len(part)
+            ]
+            return _gather(futures)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, allowed_ids: np.ndarray = None):
+        """Each shard returns its top_k; the global top_k is among them."""
+        parts = self._scatter(query_embedding, "", top_k, top_k, allowed_ids, lexical=False)
+        with telemetry.span("shard.merge"):
+            return sorted((hit for dense, _ in parts for hit in dense), key=lambda r: -r["score"])[:top_k]
+
+    def query(self, query_text: str, top_k: int = 3, query_embedding: np.ndarray = None,
+              hybrid: bool = None, candidates: int = None, rrf_k: int = 60, allowed_ids: np.ndarray = None):
+        """
+        FaissVectorStore.query() over all shards, with the same "score"/"similarity" fields.
+        BM25 scores use per-shard term statistics, which is close to global IDF when placement
+        spreads documents evenly.
+        """
+        if not self.routes:
+            print("[WARN] Index is empty. Cannot query.")
+            return []
+        query_emb = query_embedding if query_embedding is not None else self.embed_query(query_text)
+        if not (self.hybrid if hybrid is None else hybrid):
+            return self.search(query_emb, top_k=top_k, allowed_ids=allowed_ids)
+
+        candidates = candidates or 4 * top_k
+        parts = self._scatter(query_emb, query_text, top_k, candidates, allowed_ids, lexical=True)
+        with telemetry.span("shard.merge"):
+            dense = sorted((hit for d, _ in parts for hit in d), key=lambda r: -r["score"])[:candidates]
+            lexical = sorted((hit for _, l in parts for hit in l), key=lambda r: -r["score"])[:candidates]
+            by_id = {r["id"]: r for r in lexical}
+            by_id.update({r["id"]: r for r in dense})
+            fused = reciprocal_rank_fusion([[r["id"] for r in dense], [r["id"] for r in lexical]], k=rrf_k)
+
+        results = []
+        for cid, rrf_score in fused[:top_k]:
+            hit = by_id[cid]
+            results.append({"id": cid, "metadata": hit["metadata"], "distance": hit["distance"],
+                            "score": rrf_score, "similarity": hit["similarity"]})
+        return results
+
+    def stats(self) -> List[dict]:
+        return _gather([shard.call("stats") for shard in self.shards])
+
+    @property
+    def version(self) -> str:
+        return "|".join(s["version"] for s in self.stats())
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
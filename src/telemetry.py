@@ -0,0 +1,270 @@
+"""
+Lightweight tracing and metrics for the RAG request path.
+
+    with telemetry.trace("rag.request", mode="profile"):     # one per user request
+        with telemetry.span("query.embed"):                  # any stage, any module
+            ...
+        telemetry.inc("rag_cache_misses_total")
+        telemetry.observe("rag_prompt_tokens", 812)
+
+Every span's duration goes into the `rag_stage_seconds{stage=...}` histogram of an
+in-process, Prometheus-style MetricsRegistry (render() gives the text exposition
+format). When a trace finishes, one record with its per-stage breakdown is sent to
+each sink. Sinks are plain callables taking a dict:
+
+  JsonLogSink         one JSON object per line (TELEMETRY_JSON_LOG=path, or "-" for stdout)
+  recent traces       kept in memory for the Streamlit debug panel (recent_traces())
+
+Individual spans are sent to sinks too when TELEMETRY_SPANS=1 (uploads and index
+builds have no request trace, so this is how to see them). The current span lives
+in a ContextVar, so nested code needs no extra arguments.
+"""
+import bisect
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 1536, 2048, 4096, 8192)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("rag_current_span", default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (name, labels); thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, list]] = {}
+        self._buckets: Dict[str, tuple] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple = None, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            bounds = self._buckets.setdefault(name, buckets or DEFAULT_BUCKETS)
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                # [bucket counts..., +Inf count, sum]
+                state = series[key] = [0] * (len(bounds) + 1) + [0.0]
+            state[bisect.bisect_left(bounds, value)] += 1
+            state[-1] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{"counters": {name: {labels: value}}, "histograms": {name: {labels: {count, sum, mean}}}}"""
+        with self._lock:
+            counters = {n: {",".join(f"{k}={v}" for k, v in key): val for key, val in s.items()}
+                        for n, s in self._counters.items()}
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = {}
+                for key, state in series.items():
+                    count = sum(state[:-1])
+                    histograms[name][",".join(f"{k}={v}" for k, v in key)] = {
+                        "count": count, "sum": state[-1], "mean": state[-1] / count if count else 0.0,
+                    }
+        return {"counters": counters, "histograms": histograms}
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        def fmt(key, extra=()):
+            pairs = list(key) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{fmt(key)} {value:g}" for key, value in series.items())
+            for name, series in sorted(self._histograms.items()):
+                bounds = self._buckets[name]
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(bounds) + ["+Inf"], state[:-1]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{fmt(key)} {state[-1]:g}")
+                    lines.append(f"{name}_count{fmt(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    def __init__(self, telemetry: "Telemetry", name: str, attrs: Dict[str, Any], is_trace: bool = False):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+        self.is_trace = is_trace
+        self.parent: Optional["Span"] = None
+        self.trace: Optional["Span"] = None
+        self.stages: Dict[str, float] = {}
+        self.span_id = uuid.uuid4().hex[:16]
+        self.duration = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.parent = _current.get()
+        if self.is_trace:
+            self.trace_id = uuid.uuid4().hex
+            self.trace = self
+        else:
+            self.trace = self.parent.trace if self.parent is not None else None
+            self.trace_id = self.trace.trace_id if self.trace is not None else None
+        self._token = _current.set(self)
+        self.start_wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited in another context (e.g. a generator closed from elsewhere)
+            _current.set(self.parent)
+        if exc_type is GeneratorExit:
+            self.attrs.setdefault("outcome", "cancelled")
+        elif exc_type is not None:
+            self.attrs.setdefault("outcome", "error")
+            self.attrs.setdefault("error", f"{exc_type.__name__}: {exc}")
+        self.telemetry._finish(self)
+        return False
+
+
+class Telemetry:
+    def __init__(self, emit_spans: bool = False, recent: int = 50):
+        self.registry = MetricsRegistry()
+        self.emit_spans = emit_spans
+        self.sinks: List[Callable[[dict], None]] = []
+        self._recent: deque = deque(maxlen=recent)
+
+    def add_sink(self, sink: Callable[[dict], None]):
+        self.sinks.append(sink)
+
+    def span(self, name: str, **attrs) -> Span:
+        return Span(self, name, attrs)
+
+    def trace(self, name: str, **attrs) -> Span:
+        return Span(self, name, attrs, is_trace=True)
+
+    def current(self) -> Optional[Span]:
+        return _current.get()
+
+    def record(self, name: str, seconds: float, **attrs):
+        """A stage timed by the caller (e.g. work interleaved with a consumer's)."""
+        span = Span(self, name, attrs)
+        span.parent = _current.get()
+        span.trace = span.parent.trace if span.parent is not None else None
+        span.trace_id = span.trace.trace_id if span.trace is not None else None
+        span.start_wall = time.time() - seconds
+        span.duration = seconds
+        self._finish(span)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        self.registry.inc(name, value, **labels)
+
+    def observe(self, name: str, value: float, buckets: tuple = None, **labels):
+        self.registry.observe(name, value, buckets, **labels)
+
+    def recent_traces(self) -> List[dict]:
+        return list(self._recent)
+
+    def _finish(self, span: Span):
+        self.registry.observe("rag_stage_seconds", span.duration, stage=span.name)
+        if span.is_trace:
+            record = {
+                "type": "trace", "name": span.name, "trace_id": span.trace_id, "ts": span.start_wall,
+                "duration_ms": round(span.duration * 1000, 3), "attrs": span.attrs,
+                "stages_ms": {k: round(v * 1000, 3) for k, v in span.stages.items()},
+            }
+            self._recent.append(record)
+            self._emit(record)
+            return
+        if span.trace is not None:
+            span.trace.stages[span.name] = span.trace.stages.get(span.name, 0.0) + span.duration
+        if self.emit_spans:
+            self._emit({
+                "type": "span", "name": span.name, "trace_id": span.trace_id, "span_id": span.span_id,
+                "parent_id": span.parent.span_id if span.parent is not None else None, "ts": span.start_wall,
+                "duration_ms": round(span.duration * 1000, 3), "attrs": span.attrs,
+            })
+
+    def _emit(self, record: dict):
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                print(f"⚠️ [Telemetry] Sink failed: {e}")
+
+
+class JsonLogSink:
+    """Append one JSON object per record to a file (or stdout for "-")."""
+
+    def __init__(self, path: str = "-"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self.path == "-":
+                sys.stdout.write(line + "\n")
+                sys.stdout.flush()
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+
+
+def _from_env() -> Telemetry:
+    telemetry = Telemetry(emit_spans=os.getenv("TELEMETRY_SPANS", "0") == "1")
+    json_log = os.getenv("TELEMETRY_JSON_LOG")
+    if json_log:
+        telemetry.add_sink(JsonLogSink(json_log))
+    return telemetry
+
+
+_telemetry = _from_env()
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def span(name: str, **attrs) -> Span:
+    return _telemetry.span(name, **attrs)
+
+
+def trace(name: str, **attrs) -> Span:
+    return _telemetry.trace(name, **attrs)
+
+
+def record(name: str, seconds: float, **attrs):
+    _telemetry.record(name, seconds, **attrs)
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    _telemetry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, buckets: tuple = None, **labels):
+    _telemetry.observe(name, value, buckets, **labels)
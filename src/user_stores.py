@@ -0,0 +1,299 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from embedding_cache import close_embedding_caches
+from vector_database import FaissVectorStore, atomic_write
+
+# Expired session directories are renamed to this prefix under the lock, deleted outside it
+_TRASH_PREFIX = ".gc-"
+
+
+class UserSession:
+    """
+    The uploaded documents of one browser session.
+    Each document has its own FaissVectorStore under <session_dir>/<doc_id>, so switching
+    between documents is a dictionary lookup rather than a re-embed.
+    """
+
+    def __init__(self, session_dir: str, embedding_model: str):
+        self.session_dir = session_dir
+        self.embedding_model = embedding_model
+        self.stores: Dict[str, FaissVectorStore] = {}
+        self.names: Dict[str, str] = {}
+        # Documents still being built (see UserStoreManager.begin): listed, never persisted
+        self.pending: Set[str] = set()
+        self.active_doc: Optional[str] = None
+        self._load_manifest()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.session_dir, "session.json")
+
+    @property
+    def embedding_cache_dir(self) -> str:
+        # Vectors of private uploads stay with the session and are deleted with its directory
+        return os.path.join(self.session_dir, ".embedding_cache")
+
+    def new_store(self, doc_id: str) -> FaissVectorStore:
+        return FaissVectorStore(os.path.join(self.session_dir, doc_id), self.embedding_model,
+                                embedding_cache_dir=self.embedding_cache_dir)
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.names = manifest.get("documents", {})
+        self.active_doc = manifest.get("active")
+
+    def save_manifest(self):
+        os.makedirs(self.session_dir, exist_ok=True)
+        documents = {doc_id: name for doc_id, name in self.names.items() if doc_id not in self.pending}
+        active = self.active_doc if self.active_doc in documents else next(iter(documents), None)
+        payload = json.dumps({"documents": documents, "active": active}).encode("utf-8")
+        atomic_write(self.manifest_path, payload)
+
+    def has_document(self, doc_id: str) -> bool:
+        return doc_id in self.names
+
+    def is_indexed(self, doc_id: str) -> bool:
+        return doc_id in self.names and doc_id not in self.pending
+
+    def store_for(self, doc_id: str) -> FaissVectorStore:
+        store = self.stores.get(doc_id)
+        if store is None:
+            store = self.new_store(doc_id)
+            if os.path.exists(os.path.join(store.persist_dir, "faiss.index")):
+                store.load()
+            self.stores[doc_id] = store
+        return store
+
+    def active_store(self) -> Optional[FaissVectorStore]:
+        if self.active_doc is None or self.active_doc not in self.names:
+            return None
+        return self.store_for(self.active_doc)
+
+    def remove_document(self, doc_id: str):
+        store = self.stores.pop(doc_id, None)
+        if store is not None:
+            store.clear()
+            store.close()
+        else:
+            shutil.rmtree(os.path.join(self.session_dir, doc_id), ignore_errors=True)
+        self.names.pop(doc_id, None)
+        self.pending.discard(doc_id)
+        if self.active_doc == doc_id:
+            self.active_doc = next(iter(self.names), None)
+
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+        self.stores = {}
+        close_embedding_caches(self.embedding_cache_dir)
+
+
+class UserStoreManager:
+    """
+    Per-session user-upload stores for the shared engine.
+    Indexes live under <base_dir>/<session_id>/<doc_id>, so concurrent sessions never
+    write to, clear or reload each other's documents. Their chunk embeddings are cached in
+    <base_dir>/<session_id>/.embedding_cache, not the shared cache, so they go with the session.
+    Only `max_sessions` sessions are kept in memory; the least recently used one is
+    evicted first, and sessions idle for longer than `idle_ttl` seconds are dropped.
+    Evicted sessions stay on disk until `disk_ttl` expires and collect_garbage() removes them;
+    it runs at start-up and then at most every `gc_interval` seconds, from get_session(), so a
+    long-lived process (cached Streamlit engine, HTTP server) keeps enforcing `disk_ttl`.
+    """
+
+    def __init__(self, base_dir: str = "faiss_user", embedding_model: str = "all-MiniLM-L6-v2",
+                 max_sessions: int = 32, idle_ttl: Optional[float] = 3600,
+                 disk_ttl: Optional[float] = 24 * 3600, max_docs_per_session: int = 5,
+                 gc_interval: float = 600):
+        self.base_dir = base_dir
+        self.embedding_model = embedding_model
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.disk_ttl = disk_ttl
+        self.max_docs_per_session = max_docs_per_session
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._last_used = {}
+        self.gc_interval = gc_interval
+        self._next_gc = 0.0
+        self.collect_garbage()
+
+    def _session_dir(self, session_id: str) -> str:
+        # Session ids come from the UI; never let them escape base_dir
+        safe_id = "".join(c for c in session_id if c.isalnum() or c in "-_")
+        if not safe_id:
+            raise ValueError("Invalid session id")
+        return os.path.join(self.base_dir, safe_id)
+
+    def session_lock(self, session_id: str) -> threading.Lock:
+        """Serialises uploads within one session; different sessions never wait on each other."""
+        with self._lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def get_session(self, session_id: str) -> UserSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = UserSession(self._session_dir(session_id), self.embedding_model)
+                self._sessions[session_id] = session
+            self._touch(session_id)
+            self._evict()
+            doomed = self._collect_garbage() if time.monotonic() >= self._next_gc else []
+        self._remove(doomed)
+        return session
+
+    def get(self, session_id: str, doc_id: Optional[str] = None) -> Optional[FaissVectorStore]:
+        """Return the store for `doc_id` (default: the session's active document), or None."""
+        session = self.get_session(session_id)
+        if doc_id is None:
+            return session.active_store()
+        return session.store_for(doc_id) if session.has_document(doc_id) else None
+
+    def documents(self, session_id: str) -> Dict[str, str]:
+        return dict(self.get_session(session_id).names)
+
+    def active_document(self, session_id: str) -> Optional[str]:
+        return self.get_session(session_id).active_doc
+
+    def is_indexed(self, session_id: str, doc_id: str) -> bool:
+        """True once `doc_id` was fully built and registered (not while it is still being indexed)."""
+        return self.get_session(session_id).is_indexed(doc_id)
+
+    def activate(self, session_id: str, doc_id: str) -> bool:
+        session = self.get_session(session_id)
+        if not session.is_indexed(doc_id):
+            return False
+        session.active_doc = doc_id
+        session.save_manifest()
+        return True
+
+    def register(self, session_id: str, doc_id: str, name: str):
+        """Record a freshly built document and make it the active one."""
+        session = self.get_session(session_id)
+        session.names[doc_id] = name
+        session.pending.discard(doc_id)
+        session.active_doc = doc_id
+        # Keep the newest documents; drop the oldest beyond the per-session cap
+        while len(session.names) > self.max_docs_per_session:
+            oldest = next(iter(session.names))
+            session.remove_document(oldest)
+        session.save_manifest()
+
+    def new_store(self, session_id: str, doc_id: str) -> FaissVectorStore:
+        """Empty store for a document that is about to be indexed."""
+        session = self.get_session(session_id)
+        store = session.stores.get(doc_id)
+        if store is None:
+            store = session.stores[doc_id] = session.new_store(doc_id)
+        store.clear()
+        return store
+
+    def begin(self, session_id: str, doc_id: str, name: str) -> FaissVectorStore:
+        """
+        Empty store for a document that is about to be indexed, made the session's active
+        document right away so questions can be asked while it fills. Not persisted until register().
+        """
+        store = self.new_store(session_id, doc_id)
+        session = self.get_session(session_id)
+        session.names[doc_id] = name
+        session.pending.add(doc_id)
+        session.active_doc = doc_id
+        return store
+
+    def abort(self, session_id: str, doc_id: str):
+        """Drop a document whose indexing failed or was cancelled."""
+        session = self.get_session(session_id)
+        session.remove_document(doc_id)
+        session.save_manifest()
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._drop(session_id)
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = time.monotonic()
+        session_dir = self._session_dir(session_id)
+        if os.path.isdir(session_dir):
+            # Directory mtime is what collect_garbage() uses as "last seen"
+            os.utime(session_dir)
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        if session is not None:
+            session.close()
+            print(f"[INFO] Evicted user stores for session {session_id}")
+        # A lock still held belongs to a running upload; it is pruned on a later eviction
+        lock = self._session_locks.get(session_id)
+        if lock is not None and not lock.locked():
+            del self._session_locks[session_id]
+
+    def _evict(self):
+        # Caller holds self._lock
+        if self.idle_ttl is not None:
+            now = time.monotonic()
+            for session_id, last_used in list(self._last_used.items()):
+                if now - last_used > self.idle_ttl:
+                    self._drop(session_id)
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._drop(oldest)
+
+    def collect_garbage(self):
+        """Delete on-disk session indexes that nobody has touched for `disk_ttl` seconds."""
+        with self._lock:
+            doomed = self._collect_garbage()
+        self._remove(doomed)
+
+    def _collect_garbage(self) -> List[str]:
+        """
+        Caller holds self._lock. Moves expired session directories out of the way and returns
+        them; the caller deletes them with _remove() after releasing the lock, so a large store
+        being deleted never blocks other sessions.
+        """
+        self._next_gc = time.monotonic() + self.gc_interval
+        if self.disk_ttl is None or not os.path.isdir(self.base_dir):
+            return []
+        cutoff = time.time() - self.disk_ttl
+        active = {os.path.basename(self._session_dir(s)) for s in self._sessions}
+        # A session with an upload in progress may not be in memory; never delete under it
+        busy = {os.path.basename(self._session_dir(s)) for s, lock in self._session_locks.items() if lock.locked()}
+        doomed = []
+        for entry in os.scandir(self.base_dir):
+            if not entry.is_dir():
+                continue
+            if entry.name.startswith(_TRASH_PREFIX):
+                # Left behind by a process that stopped before deleting it
+                doomed.append(entry.path)
+                continue
+            if entry.name in active or entry.name in busy or entry.stat().st_mtime >= cutoff:
+                continue
+            # Session ids never start with ".", so the renamed directory cannot be reused
+            trash = os.path.join(self.base_dir, f"{_TRASH_PREFIX}{entry.name}-{uuid.uuid4().hex[:8]}")
+            try:
+                os.rename(entry.path, trash)
+            except OSError:
+                continue
+            doomed.append(trash)
+            print(f"[INFO] Garbage-collected stale user index: {entry.name}")
+        return doomed
+
+    @staticmethod
+    def _remove(paths: List[str]):
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def __len__(self):
+        return len(self._sessions)
@@ -1,24 +1,100 @@
+import functools
+import hashlib
+import json
 import os
 import shutil  
+import threading
 import faiss
 import numpy as np
-import pickle
-from typing import List, Any
-from sentence_transformers import SentenceTransformer
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS
 from embedding import EmbeddingPipeline
 from load_data import load_documents
+from embedding_service import get_embedding_service
+from chunk_store import ChunkStore
+from bm25 import BM25Index, reciprocal_rank_fusion
+from index_factory import (
+    SUBSET_SCAN_MAX, IndexConfig, apply_search_params, build_index, filtered_search_params, prepare_vectors,
+    reconstruct_all, select_backend, supports_reconstruct, supports_remove, to_score, vectors_scanned,
+)
+import telemetry
+
+def atomic_write(path: str, data: bytes):
+    """Write to a temp file in the same directory, then rename over `path`."""
+    tmp_path = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def chunk_id(source: str, text: str, occurrence: int = 0, doc_id: str = "") -> int:
+    """Stable 63-bit ID for a chunk: same document + source + text -> same ID across rebuilds."""
+    # doc_id keeps two uploads with the same file name apart; chunks without one keep their old IDs
+    key = f"{doc_id}\0{source}" if doc_id else source
+    digest = hashlib.blake2b(f"{key}\0{occurrence}\0{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & ((1 << 63) - 1)
+
+
+def _locked(method):
+    """Serialise index reads and writes, so a store can be searched while it is being built."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class FaissVectorStore:
-    def __init__(self, persist_dir: str = "faiss_store", embedding_model: str = "all-MiniLM-L6-v2", chunk_size: int = 800, chunk_overlap: int = 200):
+    def __init__(self, persist_dir: str = "faiss_store", embedding_model: str = "all-MiniLM-L6-v2", chunk_size: int = CHUNK_TOKENS, chunk_overlap: int = CHUNK_OVERLAP_TOKENS,
+                 index_config: IndexConfig = None, hybrid: bool = True, embedding_cache_dir: str = None):
         self.persist_dir = persist_dir
         self.index = None
-        self.metadata = []
+        # Flat / HNSW / IVF / IVF-PQ; "auto" picks by vector count when the index is created
+        self.index_config = index_config or IndexConfig()
+        # chunk ID -> metadata (incl. "text"); IDs are the FAISS IDs in the IndexIDMap.
+        # Memory-mapped on load; records are decoded only when looked up.
+        self.metadata = ChunkStore()
+        # Lexical index over the same chunk IDs; fused with dense results in query()
+        self.bm25 = BM25Index()
+        self.hybrid = hybrid
+        # Source file hashes + per-chunk content hashes of what is currently indexed
+        self.manifest = {"sources": {}, "chunks": {}}
+        # Never held by the store: pipelines and the query service acquire it per use (see
+        # ModelRegistry), so loading a saved index needs no model
         self.embedding_model = embedding_model
-        print(f"[INFO] Loading embedding model: {embedding_model}...")
-        self.model = SentenceTransformer(embedding_model)
+        # Where chunk embeddings are cached (None: the shared cache); user stores keep their own
+        self.embedding_cache_dir = embedding_cache_dir
         
+        # In embedding-model tokens (see chunker.TokenChunker)
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # Writes since the last save/load; part of `version` so caches see partial builds change
+        self._revision = 0
+        self._lock = threading.RLock()
+
+    def embedding_pipeline(self) -> EmbeddingPipeline:
+        return EmbeddingPipeline(model_name=self.embedding_model, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap,
+                                 cache_dir=self.embedding_cache_dir)
+
+    @staticmethod
+    def _assign_ids(chunks: List[Any], seen: Dict[Tuple[str, str, str], int]) -> List[int]:
+        ids = []
+        for chunk in chunks:
+            source = str(chunk.metadata.get("source", ""))
+            doc_id = str(chunk.metadata.get("doc_id") or "")
+            # Identical text repeated in one source still needs distinct IDs
+            key = (doc_id, source, chunk.page_content)
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            ids.append(chunk_id(source, chunk.page_content, occurrence, doc_id))
+        return ids
 
     def build_from_documents(self, documents: List[Any]):
         if not documents:
@@ -26,99 +102,400 @@ class FaissVectorStore:
             return
 
         print(f"[INFO] Building vector store in '{self.persist_dir}' from {len(documents)} docs...")
-        
-        # 1. Chunking
-        emb_pipe = EmbeddingPipeline(model_name=self.embedding_model, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
-        chunks = emb_pipe.chunk_documents(documents)
-        
-        if not chunks:
+        self.upsert_documents(documents)
+        self.save()
+
+    def build_from_stream(self, documents: Iterable[Any], batch_size: int = 64,
+                          progress_callback: Callable[[dict], None] = None) -> int:
+        """
+        Bounded-memory ingestion: pages are pulled lazily, chunked as they arrive,
+        embedded in fixed-size batches and added to the index batch by batch.
+        Peak memory is ~one page + `batch_size` chunks + their embeddings, plus the index.
+        `progress_callback` receives {"pages", "total_pages", "chunks"} after every batch.
+        """
+        progress = {"pages": 0, "total_pages": None, "chunks": 0}
+
+        def counted(docs):
+            for doc in docs:
+                progress["pages"] += 1
+                progress["total_pages"] = progress["total_pages"] or doc.metadata.get("total_pages")
+                yield doc
+
+        print(f"[INFO] Streaming documents into '{self.persist_dir}' (batch size {batch_size})...")
+        emb_pipe = self.embedding_pipeline()
+        seen = {}
+        try:
+            for batch in emb_pipe.iter_batches(counted(documents), batch_size=batch_size):
+                self.add_chunk_batch(batch, emb_pipe, seen)
+                progress["chunks"] += len(batch)
+                if progress_callback:
+                    progress_callback(dict(progress))
+        finally:
+            emb_pipe.close()
+
+        if self.index is None:
             print("[WARN] No chunks created. Check document content.")
+            return 0
+        self.finalize()
+        return progress["chunks"]
+
+    def add_chunk_batch(self, chunks: List[Any], emb_pipe: EmbeddingPipeline, seen: Dict[Tuple[str, str, str], int]) -> int:
+        """
+        Embed and add one batch of already-split chunks.
+        `seen` carries per-source occurrence counts across batches so IDs stay stable.
+        """
+        ids = self._assign_ids(chunks, seen)
+        return self._upsert_chunks(ids, chunks, emb_pipe, show_progress=False)
+
+    def finalize(self):
+        """End of a batched build: re-pick an "auto" backend for the final size, then save."""
+        if self.index is None:
             return
+        if self.index_config.backend == "auto" and select_backend(self.index.ntotal) != self.index_config.resolved.get("backend"):
+            # The first batch was too small to judge; re-pick now that the size is known
+            self.rebuild_index("auto")
+        self.save()
+
+    def upsert_documents(self, documents: List[Any]) -> int:
+        """Chunk `documents` and embed/add only chunks whose ID is not indexed yet."""
+        emb_pipe = self.embedding_pipeline()
+        try:
+            chunks = emb_pipe.chunk_documents(documents)
+            if not chunks:
+                print("[WARN] No chunks created. Check document content.")
+                return 0
+            return self._upsert_chunks(self._assign_ids(chunks, {}), chunks, emb_pipe)
+        finally:
+            emb_pipe.close()
+
+    def sync_documents(self, documents: List[Any], source_hashes: Dict[str, str] = None) -> Tuple[int, int]:
+        """
+        Make the index match `documents` exactly: add new/changed chunks, delete chunks
+        that disappeared. Cost is proportional to the edit, not the corpus.
+        """
+        emb_pipe = self.embedding_pipeline()
+        try:
+            chunks = emb_pipe.chunk_documents(documents)
+            ids = self._assign_ids(chunks, {})
+            wanted = set(ids)
+            stale = [cid for cid in self.metadata if cid not in wanted]
+            if stale:
+                self.delete(stale)
+            added = self._upsert_chunks(ids, chunks, emb_pipe)
+        finally:
+            emb_pipe.close()
+        if source_hashes:
+            self.manifest["sources"].update(source_hashes)
+        print(f"[INFO] Synced '{self.persist_dir}': +{added} / -{len(stale)} chunks ({len(self.metadata)} total)")
+        self.save()
+        return added, len(stale)
+
+    def _upsert_chunks(self, ids: List[int], chunks: List[Any], emb_pipe: EmbeddingPipeline, show_progress: bool = True) -> int:
+        fresh = [(cid, chunk) for cid, chunk in zip(ids, chunks) if cid not in self.metadata]
+        if not fresh:
+            return 0
+        with telemetry.span("index.embed", chunks=len(fresh)):
+            embeddings = emb_pipe.embed_chunks([chunk for _, chunk in fresh], show_progress=show_progress)
 
-        # 2. Embedding
-        embeddings = emb_pipe.embed_chunks(chunks)
-        
         metadatas = []
-        for chunk in chunks:
+        for cid, chunk in fresh:
             meta = chunk.metadata.copy()
             meta["text"] = chunk.page_content
+            meta["chunk_id"] = cid
             metadatas.append(meta)
+            self.manifest["chunks"][str(cid)] = hashlib.blake2b(chunk.page_content.encode("utf-8"), digest_size=16).hexdigest()
 
-        self.add_embeddings(np.array(embeddings).astype('float32'), metadatas)
-        
-        self.save()
+        self.add_embeddings(np.array(embeddings).astype('float32'), metadatas, ids=[cid for cid, _ in fresh])
+        return len(fresh)
 
-    def add_embeddings(self, embeddings: np.ndarray, metadatas: List[Any] = None):
+    @_locked
+    def add_embeddings(self, embeddings: np.ndarray, metadatas: List[Any] = None, ids: List[int] = None):
+        embeddings = prepare_vectors(embeddings, self.index_config)
         dim = embeddings.shape[1]
         if self.index is None:
-            self.index = faiss.IndexFlatL2(dim)
+            self.index = build_index(dim, self.index_config, embeddings)
         
-        self.index.add(embeddings)
-        if metadatas:
-            self.metadata.extend(metadatas)
+        if ids is None:
+            metas = metadatas or [{}] * embeddings.shape[0]
+            ids = [chunk_id(str(m.get("source", "")), m.get("text", ""), len(self.metadata) + i) for i, m in enumerate(metas)]
+        with telemetry.span("index.add", vectors=embeddings.shape[0]):
+            self.index.add_with_ids(embeddings, np.asarray(ids, dtype="int64"))
+            if metadatas:
+                for cid, meta in zip(ids, metadatas):
+                    self.metadata[int(cid)] = meta
+                self.bm25.add(ids, [m.get("text", "") for m in metadatas])
         
+        self._revision += 1
         print(f"[INFO] Added {embeddings.shape[0]} vectors to index.")
 
+    @_locked
+    def delete(self, ids: List[int]):
+        if self.index is None or not ids:
+            return
+        if supports_remove(self.index):
+            removed = self.index.remove_ids(np.asarray(ids, dtype="int64"))
+        else:
+            # HNSW and IVF cannot delete in place (see supports_remove): re-add the surviving
+            # vectors. reset() keeps IVF's trained centroids and codebooks, so nothing is retrained.
+            doomed = set(int(i) for i in ids)
+            all_ids, vectors = reconstruct_all(self.index)
+            keep = np.array([int(i) not in doomed for i in all_ids], dtype=bool)
+            removed = int((~keep).sum())
+            if keep.any():
+                self.index.reset()
+                self.index.add_with_ids(vectors[keep], all_ids[keep])
+            else:
+                self.index = None
+        for cid in ids:
+            self.metadata.pop(int(cid), None)
+            self.manifest["chunks"].pop(str(cid), None)
+        self.bm25.remove(ids)
+        self._revision += 1
+        print(f"[INFO] Removed {removed} vectors from index.")
+
+    @_locked
+    def rebuild_index(self, backend: str = "auto"):
+        """Re-create the index with another (or auto-selected) backend, keeping all IDs."""
+        if self.index is None:
+            return
+        ids, vectors = reconstruct_all(self.index)
+        self.index_config.backend = backend
+        self.index = build_index(vectors.shape[1], self.index_config, vectors)
+        self.index.add_with_ids(vectors, ids)
+        print(f"[INFO] Rebuilt index as {self.index_config.resolved.get('factory')} ({len(ids)} vectors)")
+
+    def set_search_params(self, ef_search: int = None, nprobe: int = None):
+        """Trade recall for latency at query time (HNSW efSearch, IVF nprobe)."""
+        if ef_search is not None:
+            self.index_config.ef_search = ef_search
+        if nprobe is not None:
+            self.index_config.nprobe = nprobe
+        if self.index is not None:
+            apply_search_params(self.index, self.index_config)
+
+    @_locked
     def save(self):
-        if not os.path.exists(self.persist_dir):
-            os.makedirs(self.persist_dir)
+        os.makedirs(self.persist_dir, exist_ok=True)
 
         faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
+        bm25_path = os.path.join(self.persist_dir, "bm25.npz")
+        manifest_path = os.path.join(self.persist_dir, "manifest.json")
         
         if self.index is not None:
-            faiss.write_index(self.index, faiss_path)
-            with open(meta_path, "wb") as f:
-                pickle.dump(self.metadata, f)
+            # New chunk-store generation first; the manifest rename is what publishes it
+            previous = self.manifest.get("chunk_store")
+            generation = f"chunks-{uuid.uuid4().hex[:12]}"
+            self.metadata = self.metadata.save(self.persist_dir, generation)
+            # Readers never observe a half-written file: all go through temp file + rename
+            atomic_write(faiss_path, faiss.serialize_index(self.index).tobytes())
+            atomic_write(bm25_path, self.bm25.to_bytes())
+            self.manifest["index"] = self.index_config.to_dict()
+            self.manifest["chunk_store"] = generation
+            atomic_write(manifest_path, json.dumps(self.manifest).encode("utf-8"))
+            if previous and previous != generation:
+                ChunkStore.remove_generation(self.persist_dir, previous)
+            legacy_pickle = os.path.join(self.persist_dir, "metadata.pkl")
+            if os.path.exists(legacy_pickle):
+                os.remove(legacy_pickle)
+            self._revision = 0
             print(f"[INFO] Saved index to {self.persist_dir}")
         else:
             print("[WARN] No index to save!")
 
+    @_locked
     def load(self):
         faiss_path = os.path.join(self.persist_dir, "faiss.index")
-        meta_path = os.path.join(self.persist_dir, "metadata.pkl")
+        manifest_path = os.path.join(self.persist_dir, "manifest.json")
         
-        if not (os.path.exists(faiss_path) and os.path.exists(meta_path)):
+        if not (os.path.exists(faiss_path) and os.path.exists(manifest_path)):
             print(f"[WARN] No existing index found at {self.persist_dir}")
             return False
 
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if "chunk_store" not in manifest:
+            # Pickled metadata from older builds is never unpickled; rebuild instead
+            print(f"[WARN] {self.persist_dir} uses the legacy pickle format; it will be rebuilt.")
+            return False
+
+        self.manifest = manifest
         self.index = faiss.read_index(faiss_path)
-        with open(meta_path, "rb") as f:
-            self.metadata = pickle.load(f)
+        self.metadata = ChunkStore.open(self.persist_dir, manifest["chunk_store"])
+        bm25_path = os.path.join(self.persist_dir, "bm25.npz")
+        if os.path.exists(bm25_path):
+            self.bm25 = BM25Index.load(bm25_path)
+        else:
+            # Stores saved before hybrid retrieval: index the chunk texts once
+            self.bm25 = BM25Index()
+            ids = list(self.metadata)
+            self.bm25.add(ids, [self.metadata[cid].get("text", "") for cid in ids])
+        if "index" in self.manifest:
+            # Backend choice and search params travel with the index
+            self.index_config = IndexConfig.from_dict(self.manifest["index"])
+            apply_search_params(self.index, self.index_config)
         
+        self._revision = 0
         print(f"[INFO] Loaded index from {self.persist_dir} ({self.index.ntotal} vectors)")
         return True
 
+    def close(self):
+        """Nothing to release: the store holds no model reference between uses."""
+
+    @_locked
     def clear(self):
         if os.path.exists(self.persist_dir):
             shutil.rmtree(self.persist_dir)
         self.index = None
-        self.metadata = []
+        self.metadata = ChunkStore()
+        self.bm25 = BM25Index()
+        self.manifest = {"sources": {}, "chunks": {}}
+        self.index_config.resolved = {}
+        self._revision += 1
         print(f"[INFO] Cleared database at {self.persist_dir}")
 
-    def search(self, query_embedding: np.ndarray, top_k: int = 5):
+    def _search_subset(self, query: np.ndarray, ids: np.ndarray, top_k: int):
+        """Exact search over just `ids` (small filters): look the vectors up and score them directly."""
+        vectors = self.index.reconstruct_batch(ids)
+        if self.index_config.metric == "cosine":
+            dist = vectors @ query[0]
+            order = np.argsort(-dist, kind="stable")[:top_k]
+        else:
+            dist = np.sum((vectors - query[0]) ** 2, axis=1)
+            order = np.argsort(dist, kind="stable")[:top_k]
+        return dist[order][None, :], ids[order][None, :]
+
+    @_locked
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, allowed_ids: np.ndarray = None):
+        """
+        Nearest chunks to `query_embedding`. `allowed_ids` (chunk IDs) restricts the search to
+        those chunks: small sets are scored directly, larger ones via a FAISS ID selector,
+        so a filter never means scanning and post-filtering the whole index.
+        """
         if self.index is None or self.index.ntotal == 0:
             return []
+        if allowed_ids is not None and len(allowed_ids) == 0:
+            return []
 
-        D, I = self.index.search(query_embedding, top_k)
+        with telemetry.span("faiss.search", top_k=top_k, filtered=allowed_ids is not None) as span:
+            query = prepare_vectors(query_embedding, self.index_config)
+            if allowed_ids is None:
+                D, I = self.index.search(query, top_k)
+                scanned = vectors_scanned(self.index)
+            elif len(allowed_ids) <= SUBSET_SCAN_MAX and supports_reconstruct(self.index):
+                D, I = self._search_subset(query, np.asarray(allowed_ids, dtype="int64"), top_k)
+                scanned = len(allowed_ids)
+            else:
+                selector = faiss.IDSelectorBatch(np.asarray(allowed_ids, dtype="int64"))
+                params = filtered_search_params(self.index, self.index_config, selector, top_k)
+                D, I = self.index.search(query, top_k, params=params)
+                # The selector skips distance computations but still visits the same vectors
+                scanned = vectors_scanned(self.index)
+            span.set(vectors_scanned=scanned)
+        telemetry.inc("rag_vectors_scanned_total", scanned)
         
         results = []
         for idx, dist in zip(I[0], D[0]):
-            if idx < len(self.metadata) and idx >= 0:
+            meta = self.metadata.get(int(idx)) if idx >= 0 else None
+            if meta is not None:
+                # Higher-is-better, comparable across stores; "similarity" is the same value, so
+                # dense and hybrid (see query()) hits share one comparable field
+                score = to_score(dist, self.index_config)
                 results.append({
-                    "metadata": self.metadata[idx],
-                    "distance": float(dist) # Convert numpy float to standard float
+                    "id": int(idx),
+                    "metadata": meta,
+                    "distance": float(dist), # Raw FAISS value: L2 distance or inner product
+                    "score": score,
+                    "similarity": score,
                 })
         return results
 
-    def query(self, query_text: str, top_k: int = 3):
+    @property
+    def version(self) -> str:
+        """
+        Changes on every save; caches key on it so rebuilt indexes invalidate old answers.
+        Not unique across stores (two unsaved stores both start at "unsaved+1"): caches must
+        key on the store's persist_dir as well.
+        """
+        generation = self.manifest.get("chunk_store") or "unsaved"
+        # Unsaved writes (an upload that is still indexing) also change what a query can see
+        return generation if not self._revision else f"{generation}+{self._revision}"
+
+    @property
+    def unsaved(self) -> bool:
+        """True while the index holds writes that are not saved yet (e.g. an upload still indexing)."""
+        return not self.manifest.get("chunk_store") or bool(self._revision)
+
+    @_locked
+    def all_chunks(self, max_chars: int = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Metadata (with "text") of every chunk, in no particular order; None as soon as the
+        texts add up to more than `max_chars`, so a large store is ruled out cheaply.
+        """
+        chunks, chars = [], 0
+        for cid in self.metadata:
+            meta = self.metadata[cid]
+            chars += len(meta.get("text", ""))
+            if max_chars is not None and chars > max_chars:
+                return None
+            chunks.append(meta)
+        return chunks
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        # Concurrent queries are encoded together in one batch (see EmbeddingService)
+        with telemetry.span("query.embed"):
+            return get_embedding_service(self.embedding_model).encode([query_text])
+
+    @_locked
+    def lexical_search(self, query_text: str, top_k: int = 5, allowed_ids: np.ndarray = None):
+        results = []
+        for cid, score in self.bm25.search(query_text, top_k, allowed=allowed_ids):
+            meta = self.metadata.get(cid)
+            if meta is not None:
+                results.append({"id": cid, "metadata": meta, "distance": None, "score": score, "similarity": None})
+        return results
+
+    def query(self, query_text: str, top_k: int = 3, query_embedding: np.ndarray = None,
+              hybrid: bool = None, candidates: int = None, rrf_k: int = 60, allowed_ids: np.ndarray = None):
+        """
+        Dense search, fused with BM25 by reciprocal rank when hybrid (default: self.hybrid).
+        Each retriever contributes `candidates` results (default 4 * top_k) to the fusion.
+        `allowed_ids` restricts both retrievers to those chunk IDs (see search()).
+
+        "score" ranks the hits: the dense similarity, or the RRF value when hybrid, which only
+        orders one result list. "similarity" is always the dense (cosine) score, comparable
+        across queries and stores; None for a hit that only BM25 found.
+        """
         # print(f"[INFO] Querying: '{query_text}'")
         if self.index is None:
             print("[WARN] Index is empty. Cannot query.")
             return []
             
-        query_emb = self.model.encode([query_text]).astype('float32')
-        return self.search(query_emb, top_k=top_k)
+        query_emb = query_embedding if query_embedding is not None else self.embed_query(query_text)
+        if not (self.hybrid if hybrid is None else hybrid) or len(self.bm25) == 0:
+            return self.search(query_emb, top_k=top_k, allowed_ids=allowed_ids)
+
+        candidates = candidates or 4 * top_k
+        dense = self.search(query_emb, top_k=candidates, allowed_ids=allowed_ids)
+        with telemetry.span("bm25.search", candidates=candidates), self._lock:
+            lexical = self.bm25.search(query_text, candidates, allowed=allowed_ids)
+        by_id = {r["id"]: r for r in dense}
+        with telemetry.span("rrf.fuse"):
+            fused = reciprocal_rank_fusion([list(by_id), [cid for cid, _ in lexical]], k=rrf_k)
+
+        results = []
+        for cid, rrf_score in fused[:top_k]:
+            hit = by_id.get(cid)
+            meta = hit["metadata"] if hit else self.metadata.get(cid)
+            if meta is None:
+                continue
+            results.append({
+                "id": cid,
+                "metadata": meta,
+                "distance": hit["distance"] if hit else None,  # None: found by BM25 only
+                "score": rrf_score,
+                "similarity": hit["similarity"] if hit else None,
+            })
+        return results
 
 if __name__ == "__main__":
 
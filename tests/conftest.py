@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+# The benchmarks' LLM stub (stub_groq.py) doubles as a test fixture
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# The engine's model (RAGSearch.embedding_model); tests that need it skip when it cannot load
+MODEL = "all-MiniLM-L6-v2"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_caches(tmp_path_factory):
+    """Keep the embedding cache and ONNX exports out of the working tree."""
+    os.environ["EMBEDDING_CACHE_DIR"] = str(tmp_path_factory.mktemp("embedding_cache"))
+    os.environ["EMBEDDING_ONNX_DIR"] = str(tmp_path_factory.mktemp("onnx_models"))
+
+
+@pytest.fixture(scope="session")
+def embedding_model():
+    from model_registry import acquire_model, release_model
+
+    try:
+        acquire_model(MODEL)
+    except Exception as e:
+        pytest.skip(f"Embedding model {MODEL} is not available: {e}")
+    release_model(MODEL)
+    return MODEL
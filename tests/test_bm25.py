@@ -0,0 +1,107 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from index_factory import IndexConfig
+from vector_database import FaissVectorStore
+
+DOCS = {
+    11: "Built a ROS2 navigation stack with lidar SLAM for a warehouse robot",
+    22: "Deployed YOLOv8 models on Jetson devices; wrote the pipeline in C++ and Python",
+    33: "Improved production yield at Tata Electronics with computer vision inspection",
+    44: "Fine-tuned llama-3.1 for retrieval with FAISS and BM25 fusion",
+    55: "Python tooling for the robot: ROS2 launch files and lidar calibration in Python",
+}
+
+
+def reference_scores(query, docs, k1=1.5, b=0.75):
+    """Textbook Okapi BM25, to check the CSR implementation against."""
+    tokenized = {cid: tokenize(text) for cid, text in docs.items()}
+    avg_len = sum(map(len, tokenized.values())) / len(tokenized)
+    scores = {}
+    for cid, tokens in tokenized.items():
+        counts, score = Counter(tokens), 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in t for t in tokenized.values())
+            if not counts[term]:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * counts[term] * (k1 + 1) / (counts[term] + k1 * (1 - b + b * len(tokens) / avg_len))
+        if score:
+            scores[cid] = score
+    return scores
+
+
+def index_of(docs):
+    index = BM25Index()
+    index.add(list(docs), list(docs.values()))
+    return index
+
+
+def test_tokenize_keeps_technical_names():
+    assert tokenize("C++, YOLOv8 and llama-3.1 on ROS2; the C# port") == ["c++", "yolov8", "llama-3.1", "ros2", "c#", "port"]
+
+
+@pytest.mark.parametrize("query", ["python lidar", "ROS2 robot", "yolov8 jetson c++", "unknown words only"])
+def test_scores_match_textbook_bm25(query):
+    results = index_of(DOCS).search(query, top_k=10)
+    expected = reference_scores(query, DOCS)
+    assert {cid for cid, _ in results} == set(expected)
+    for cid, score in results:
+        assert score == pytest.approx(expected[cid], rel=1e-5)
+    assert [s for _, s in results] == sorted((s for _, s in results), reverse=True)
+
+
+def test_remove_and_replace_documents():
+    index = index_of(DOCS)
+    index.remove([55])
+    index.add([11], ["Replaced text about gardening"])
+    remaining = {cid: text for cid, text in DOCS.items() if cid != 55}
+    remaining[11] = "Replaced text about gardening"
+    assert len(index) == 4
+    for query in ("python lidar", "gardening", "ros2"):
+        assert dict(index.search(query)) == pytest.approx(reference_scores(query, remaining))
+
+
+def test_allowed_ids_restrict_results():
+    results = index_of(DOCS).search("python ros2", allowed=np.array([55, 33]))
+    assert [cid for cid, _ in results] == [55]
+
+
+def test_top_k_keeps_the_best():
+    full = index_of(DOCS).search("python ros2 lidar yolov8", top_k=10)
+    assert index_of(DOCS).search("python ros2 lidar yolov8", top_k=2) == full[:2]
+
+
+def test_round_trip(tmp_path):
+    index = index_of(DOCS)
+    index.remove([22])
+    path = tmp_path / "bm25.npz"
+    path.write_bytes(index.to_bytes())
+    loaded = BM25Index.load(str(path))
+    assert len(loaded) == 4
+    for query in ("python lidar", "yolov8", "tata yield"):
+        assert loaded.search(query) == index.search(query)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [cid for cid, _ in fused] == [1, 3, 2, 4]
+    assert dict(fused)[1] == pytest.approx(1 / 61 + 1 / 62)
+    assert dict(fused)[4] == pytest.approx(1 / 63)
+
+
+def test_hybrid_query_finds_an_exact_term_the_dense_search_misses(tmp_path):
+    store = FaissVectorStore(str(tmp_path / "store"), index_config=IndexConfig(backend="flat"))
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(DOCS), 16)).astype("float32")
+    store.add_embeddings(vectors, [{"text": text, "source": "cv.md"} for text in DOCS.values()], ids=list(DOCS))
+    # A query vector right next to doc 11, asking for a term only doc 33 contains
+    query_emb = vectors[0][None, :]
+    dense = [hit["id"] for hit in store.query("tata", top_k=1, query_embedding=query_emb, hybrid=False)]
+    hybrid = [hit["id"] for hit in store.query("tata", top_k=2, query_embedding=query_emb, candidates=2)]
+    assert dense == [11]
+    assert 33 in hybrid
@@ -0,0 +1,74 @@
+import pytest
+from langchain_core.documents import Document
+
+
+class EchoLLM:
+    """Answers with the prompt's context, so an answer shows which store produced it."""
+
+    def stream(self, prompt):
+        yield prompt.split("CONTEXT:", 1)[1].split("USER QUESTION:", 1)[0].strip()
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch, embedding_model):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.chdir(tmp_path)  # no data/MyData.md: the profile stays empty
+    from chat import RAGSearch
+
+    engine = RAGSearch(str(tmp_path / "profile"), str(tmp_path / "users"), startup_mode="lazy")
+    engine._llm = EchoLLM()
+    yield engine
+    engine.index_jobs.close()
+
+
+def ask(engine, session_id, question="What is in the file?"):
+    return "".join(engine.search_and_answer(question, mode="document", session_id=session_id))
+
+
+def test_citations_count_pages_from_one(engine):
+    store = engine.user_stores.begin("alice", "doc", "notes.txt")
+    store.upsert_documents([Document(page_content="A one-page text file.", metadata={"source": "notes.txt", "page": 0})])
+    assert "notes.txt (Pg 1)" in ask(engine, "alice")
+
+
+def test_sessions_never_share_cached_answers(engine):
+    secrets = {"alice": "marigold", "bob": "tungsten"}
+    stores = {}
+    for session_id in ("alice", "bob"):
+        # Both sessions upload a file with the same doc id and are mid-indexing (unsaved)
+        store = stores[session_id] = engine.user_stores.begin(session_id, "doc", "notes.txt")
+        store.upsert_documents([Document(page_content=f"The secret word is {secrets[session_id]}.",
+                                         metadata={"source": "notes.txt", "page": 0})])
+    assert stores["alice"].version == stores["bob"].version
+
+    alice, bob = ask(engine, "alice"), ask(engine, "bob")
+    assert "marigold" in alice and "tungsten" not in alice
+    assert "tungsten" in bob and "marigold" not in bob
+    # Partial (unsaved) stores are never cached
+    assert len(engine.query_cache) == 0
+
+    for session_id, store in stores.items():
+        store.save()
+        engine.user_stores.register(session_id, "doc", "notes.txt")
+    assert ask(engine, "alice") == alice
+    assert ask(engine, "bob") == bob
+    assert len(engine.query_cache) == 2
+    # Replayed from each session's own entry
+    assert ask(engine, "bob") == bob and engine.query_cache.stats["exact_hits"] == 1
+
+
+def test_switching_to_an_indexed_file_cancels_the_upload_in_flight(engine, tmp_path):
+    done = tmp_path / "done.txt"
+    done.write_text("A finished document.", encoding="utf-8")
+    assert engine.submit_upload(str(done), "alice").wait(60)
+    doc_id = engine.user_stores.active_document("alice")
+
+    pending = tmp_path / "pending.txt"
+    pending.write_text("A document still being indexed.", encoding="utf-8")
+    with engine.user_stores.session_lock("alice"):  # the new upload waits for its turn
+        in_flight = engine.submit_upload(str(pending), "alice")
+        switched = engine.submit_upload(str(done), "alice")
+    assert switched.status == "done"
+    assert in_flight.wait(60) and in_flight.status == "cancelled"
+    assert engine.user_stores.active_document("alice") == doc_id
+    assert list(engine.user_stores.documents("alice")) == [doc_id]
@@ -0,0 +1,60 @@
+import os
+
+from chunk_store import ChunkStore
+
+
+def records():
+    return {
+        3: {"text": "third chunk", "source": "a.md", "page": 0},
+        1: {"text": "first chunk — ünïcode ✓", "source": "a.md", "page": 0, "start_index": 0},
+        -7: {"text": "", "source": "b.pdf", "page": 4},
+        2 ** 62: {"text": "large id", "source": "c.txt", "page": 1, "doc_id": "abc"},
+    }
+
+
+def test_round_trip(tmp_path):
+    store = ChunkStore()
+    for cid, meta in records().items():
+        store[cid] = meta
+    saved = store.save(str(tmp_path), "gen-1")
+
+    reopened = ChunkStore.open(str(tmp_path), "gen-1")
+    for chunks in (saved, reopened):
+        assert len(chunks) == 4
+        assert sorted(chunks) == sorted(records())
+        for cid, meta in records().items():
+            assert cid in chunks
+            assert chunks[cid] == meta
+        assert 99 not in chunks
+        assert chunks.get(99) is None
+
+
+def test_overlay_is_merged_into_a_new_generation(tmp_path):
+    store = ChunkStore()
+    for cid, meta in records().items():
+        store[cid] = meta
+    store = store.save(str(tmp_path), "gen-1")
+
+    store[1] = {"text": "first chunk, edited", "source": "a.md", "page": 0}
+    store[10] = {"text": "new chunk", "source": "d.md", "page": 2}
+    assert store.pop(3)["text"] == "third chunk"
+    assert store.pop(12345, "missing") == "missing"
+    # The overlay is visible before it is saved
+    assert 3 not in store and store[1]["text"] == "first chunk, edited" and len(store) == 4
+
+    merged = store.save(str(tmp_path), "gen-2")
+    assert sorted(merged) == sorted([1, 10, -7, 2 ** 62])
+    assert merged[1]["text"] == "first chunk, edited"
+    assert merged[10] == {"text": "new chunk", "source": "d.md", "page": 2}
+    assert merged[2 ** 62] == records()[2 ** 62]
+
+    # The old generation is untouched until it is removed
+    assert ChunkStore.open(str(tmp_path), "gen-1")[3]["text"] == "third chunk"
+    ChunkStore.remove_generation(str(tmp_path), "gen-1")
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("gen-1")]
+
+
+def test_empty_store_round_trip(tmp_path):
+    empty = ChunkStore().save(str(tmp_path), "empty")
+    assert len(empty) == 0 and list(empty) == []
+    assert ChunkStore.open(str(tmp_path), "empty").get(1) is None
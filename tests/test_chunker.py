@@ -0,0 +1,88 @@
+import re
+
+import pytest
+from langchain_core.documents import Document
+
+import chunker as chunker_module
+from chunker import SPECIAL_TOKENS, TokenChunker, _RegexTokenizer, markdown_sections
+
+SENTENCE = "Chetan deployed YOLOv8 models on Jetson devices for real-time defect detection."
+
+
+@pytest.fixture
+def model(embedding_model, monkeypatch):
+    # Tokenizers are cached per process; one loaded by a test that ran from another
+    # working directory may be the word-based fallback
+    monkeypatch.setattr(chunker_module, "_tokenizers", {})
+    return embedding_model
+
+
+@pytest.fixture
+def chunker(model):
+    return TokenChunker(model, chunk_size=40, chunk_overlap=8)
+
+
+def long_text(paragraphs=12):
+    return "\n\n".join(" ".join(f"{SENTENCE[:-1]} number {p}.{s}." for s in range(3)) for p in range(paragraphs))
+
+
+def test_chunks_are_exact_slices_within_the_token_budget(chunker):
+    text = long_text()
+    chunks = chunker.chunk_text(text)
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert chunk.tokens <= chunker.chunk_size
+        assert chunker.count_tokens(text[chunk.start:chunk.end]) == chunk.tokens
+    assert chunks[0].start == 0 and chunks[-1].end == len(text)
+
+
+def test_chunks_end_at_boundaries_never_inside_a_word(chunker):
+    text = long_text()
+    for chunk in chunker.chunk_text(text):
+        assert chunk.end == len(text) or not re.match(r"\w\w", text[chunk.end - 1:chunk.end + 1])
+        assert text[chunk.end - 1] == "."  # sentence ends are always available in the window
+
+
+def test_consecutive_windows_overlap_by_at_most_the_overlap(chunker):
+    text = " ".join(f"{SENTENCE[:-1]} {i}." for i in range(20))  # one long paragraph
+    chunks = chunker.chunk_text(text)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.start < nxt.start <= prev.end
+        assert chunker.count_tokens(text[nxt.start:prev.end]) <= chunker.chunk_overlap
+
+
+def test_markdown_sections_are_packed_and_titled(chunker):
+    text = "# Profile\nShort intro.\n\n## Skills\nPython and C++.\n\n## Projects\n\n### Robot\n" + long_text(3)
+    chunks = chunker.chunk_text(text)
+    # The two small sections share a chunk, titled by the first
+    first = text[chunks[0].start:chunks[0].end]
+    assert first.startswith("# Profile") and first.endswith("Python and C++.")
+    assert chunks[0].section == "Profile"
+    # A heading with no body of its own opens the next section's chunk
+    robot = [c for c in chunks if c.section == "Profile > Projects > Robot"]
+    assert robot and text[robot[0].start:].startswith("## Projects")
+
+
+def test_heading_paths_follow_the_heading_levels():
+    text = "# A\nx\n## B\ny\n### C\nz\n## D\nw\n"
+    assert [title for _, _, title in markdown_sections(text)] == ["A", "A > B", "A > B > C", "A > D"]
+
+
+def test_split_documents_keeps_documents_apart_and_records_offsets(chunker):
+    pages = [Document(page_content=long_text(2), metadata={"source": "a.pdf", "page": p}) for p in range(2)]
+    chunks = chunker.split_documents(pages)
+    assert {c.metadata["page"] for c in chunks} == {0, 1}
+    for c in chunks:
+        page = pages[c.metadata["page"]].page_content
+        assert page[c.metadata["start_index"]:c.metadata["end_index"]] == c.page_content
+        assert c.metadata["tokens"] <= chunker.chunk_size
+
+
+def test_chunk_size_is_capped_at_the_model_window(model):
+    chunker = TokenChunker(model, chunk_size=10_000)
+    assert chunker.chunk_size == 256 - SPECIAL_TOKENS
+
+
+def test_regex_fallback_counts_words_and_punctuation():
+    offsets = _RegexTokenizer().offsets(["C++ is fast."])[0]
+    assert [tuple(span) for span in offsets] == [(0, 1), (1, 2), (2, 3), (4, 6), (7, 11), (11, 12)]
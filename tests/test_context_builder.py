@@ -0,0 +1,71 @@
+from context_builder import ContextBuilder
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def hit(text, source="doc.pdf", page=0):
+    return {"metadata": {"text": text, "source": source, "page": page}}
+
+
+def builder(budget=100, **kwargs):
+    return ContextBuilder(token_budget=budget, token_counter=words, min_overlap=10, **kwargs)
+
+
+def test_overlapping_chunks_of_a_page_are_stitched():
+    left = "The robot maps the warehouse with lidar. It then plans a path around the shelves"
+    right = "plans a path around the shelves and docks at the charging station."
+    built = builder().build([hit(left), hit(right)])
+    assert built.text == left + " and docks at the charging station."
+    assert built.stats["merged"] == 1 and built.blocks[0].chunks == 2
+
+
+def test_contained_chunk_is_merged_into_its_container():
+    outer = "Chetan improved production yield with computer vision inspection at Tata Electronics."
+    built = builder().build([hit("computer vision inspection"), hit(outer)])
+    assert built.text == outer and built.stats["blocks_out"] == 1
+
+
+def test_chunks_of_different_pages_are_not_stitched():
+    text = "the same sentence repeated on two different pages of the report"
+    built = builder(dedup_threshold=1.1).build([hit(text, page=1), hit(text, page=2)])
+    assert built.stats["merged"] == 0 and built.stats["blocks_out"] == 2
+
+
+def test_near_duplicates_are_dropped():
+    a = "Chetan deployed YOLO models on Jetson devices for real time defect detection on the line"
+    b = "Chetan deployed YOLO models on Jetson devices for real time defect detection on the line today"
+    built = builder().build([hit(a, "a.pdf"), hit(b, "b.pdf")])
+    assert built.stats["deduplicated"] == 1
+    assert [block.source for block in built.blocks] == ["a.pdf"]
+
+
+def test_packing_skips_blocks_that_do_not_fit_but_keeps_smaller_ones():
+    hits = [hit("one two three four five", "a"), hit(" ".join(["long"] * 50), "b"), hit("six seven eight", "c")]
+    built = builder(budget=12).build(hits)
+    assert [block.source for block in built.blocks] == ["a", "c"]
+    assert built.stats["dropped"] == 1
+    assert built.stats["tokens_packed"] <= 12
+    assert built.stats["tokens_saved"] == built.stats["tokens_raw"] - built.stats["tokens_packed"]
+
+
+def test_an_oversized_best_block_is_truncated_not_dropped():
+    built = builder(budget=10).build([hit(" ".join(f"w{i}" for i in range(40)))])
+    assert built.blocks and 0 < words(built.text) <= 10
+
+
+def test_build_full_restores_document_order_from_offsets():
+    chunks = [
+        {"text": "world. Goodbye", "source": "a.md", "page": 0, "start_index": 7},
+        {"text": "Hello, world.", "source": "a.md", "page": 0, "start_index": 0},
+    ]
+    full = builder().build_full(chunks)
+    assert full.text == "Hello, world. Goodbye"
+    assert builder(budget=2).build_full(chunks) is None
+
+
+def test_build_full_orders_pages_numerically():
+    chunks = [{"text": f"page {p}", "source": "a.pdf", "page": p} for p in (10, 2, 1)]
+    full = builder().build_full(chunks + [{"text": "b first", "source": "b.pdf", "page": 0}])
+    assert [(block.source, block.page) for block in full.blocks] == [("a.pdf", 1), ("a.pdf", 2), ("a.pdf", 10), ("b.pdf", 0)]
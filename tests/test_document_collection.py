@@ -0,0 +1,33 @@
+from document_collection import DocumentCollection
+
+SHARED = "Chetan built a ROS navigation stack for a warehouse robot with lidar SLAM."
+
+
+def upload(tmp_path, folder, extra):
+    path = tmp_path / folder / "notes.txt"
+    path.parent.mkdir()
+    path.write_text(f"{SHARED}\n\n{extra}", encoding="utf-8")
+    return str(path)
+
+
+def chunks_of(collection, doc_id):
+    return [collection.store.metadata[int(cid)] for cid in collection.allowed_ids(doc_ids=doc_id)]
+
+
+def test_uploads_with_the_same_name_and_text_keep_their_own_chunks(tmp_path, embedding_model):
+    collection = DocumentCollection(str(tmp_path / "store"), embedding_model, chunk_size=20, chunk_overlap=0)
+    first = collection.add_document(upload(tmp_path, "a", "He deployed YOLO models on Jetson devices."))
+    second = collection.add_document(upload(tmp_path, "b", "He now works on retrieval with FAISS."))
+    assert first != second
+
+    for doc_id in (first, second):
+        chunks = chunks_of(collection, doc_id)
+        assert SHARED in [meta["text"] for meta in chunks]
+        assert {meta["doc_id"] for meta in chunks} == {doc_id}
+        # Text files have no page numbers: they are page 0, like PDFs' first page
+        assert {meta["page"] for meta in chunks} == {0}
+
+    collection.remove_document(first)
+    assert SHARED in [meta["text"] for meta in chunks_of(collection, second)]
+    hits = collection.query("warehouse robot navigation", top_k=1, doc_ids=second)
+    assert hits and hits[0]["metadata"]["doc_id"] == second
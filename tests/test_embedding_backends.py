@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from embedding_backends import cache_name, load_sentence_transformer
+
+TEXTS = [
+    "What projects have you built with ROS?",
+    "Tell me about your experience at Tata Electronics",
+    "Chetan deployed YOLO models on Jetson devices for real-time defect detection.",
+    "A longer passage about retrieval-augmented generation, FAISS indexes and BM25 fusion, "
+    "repeated so that it spans more tokens than a short query does. " * 4,
+]
+
+# Minimum cosine similarity to the torch vectors, as in benchmarks/onnx_backend.py
+THRESHOLDS = {"onnx": 0.9999, "onnx-int8": 0.99}
+
+
+def unit(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module")
+def torch_vectors(embedding_model):
+    return unit(np.asarray(load_sentence_transformer(embedding_model, backend="torch").encode(TEXTS)))
+
+
+@pytest.mark.parametrize("backend", sorted(THRESHOLDS))
+def test_onnx_matches_torch(backend, embedding_model, torch_vectors):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum")
+    vectors = unit(np.asarray(load_sentence_transformer(embedding_model, backend=backend).encode(TEXTS)))
+    assert vectors.shape == torch_vectors.shape
+    cosine = np.sum(vectors * torch_vectors, axis=1)
+    assert cosine.min() >= THRESHOLDS[backend]
+
+
+def test_backends_cache_separately():
+    assert cache_name("m", "torch") == "m"
+    assert len({cache_name("m", b) for b in ("torch", "onnx", "onnx-int8")}) == 3
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_sentence_transformer("all-MiniLM-L6-v2", backend="tensorrt")
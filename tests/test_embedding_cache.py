@@ -0,0 +1,83 @@
+import multiprocessing
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, text_key
+
+DIM = 8
+
+
+def vector(text: str) -> np.ndarray:
+    rng = np.random.default_rng(int.from_bytes(text_key(text)[:4], "little"))
+    return rng.standard_normal(DIM).astype("float32")
+
+
+def append_rows(cache_dir: str, worker: int, rounds: int):
+    cache = EmbeddingCache(cache_dir, "test-model")
+    for i in range(rounds):
+        # Every worker also re-stores a text shared with the others
+        texts = [f"worker {worker} text {i}", f"shared text {i}"]
+        cache.store([text_key(t) for t in texts], np.stack([vector(t) for t in texts]))
+
+
+def test_round_trip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    texts = ["alpha", "beta"]
+    cache.store([text_key(t) for t in texts], np.stack([vector(t) for t in texts]))
+
+    reopened = EmbeddingCache(str(tmp_path), "test-model")
+    hits, misses = reopened.lookup([text_key(t) for t in ["beta", "gamma", "alpha"]])
+    assert misses == [1]
+    assert np.array_equal(hits[0], vector("beta")) and np.array_equal(hits[2], vector("alpha"))
+
+
+def test_concurrent_processes_never_corrupt_rows(tmp_path):
+    workers, rounds = 4, 25
+    context = multiprocessing.get_context("spawn")
+    procs = [context.Process(target=append_rows, args=(str(tmp_path), w, rounds)) for w in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+        assert proc.exitcode == 0
+
+    texts = [f"worker {w} text {i}" for w in range(workers) for i in range(rounds)]
+    texts += [f"shared text {i}" for i in range(rounds)]
+    hits, misses = EmbeddingCache(str(tmp_path), "test-model").lookup([text_key(t) for t in texts])
+    assert misses == []
+    for pos, text in enumerate(texts):
+        assert np.array_equal(hits[pos], vector(text)), text
+
+
+def test_refresh_reads_only_rows_it_has_not_seen(tmp_path, monkeypatch):
+    import embedding_cache
+
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    cache.store([text_key("alpha")], vector("alpha")[None, :])
+    # Two processes that raced appended the same text twice: 2 rows on disk, 1 distinct key
+    with open(cache.keys_path, "ab") as f:
+        f.write(text_key("alpha"))
+    with open(cache.vectors_path, "ab") as f:
+        f.write(vector("alpha").tobytes())
+
+    reopened = EmbeddingCache(str(tmp_path), "test-model")
+    assert len(reopened) == 1 and reopened._n_rows == 2
+
+    def no_reads(*args, **kwargs):
+        raise AssertionError("refresh re-read rows it had already indexed")
+
+    monkeypatch.setattr(embedding_cache, "open", no_reads, raising=False)
+    hits, misses = reopened.lookup([text_key("alpha"), text_key("beta")])
+    assert list(hits) == [0] and misses == [1]
+
+
+def test_caches_are_separate_per_directory(tmp_path):
+    from embedding_cache import close_embedding_caches, get_embedding_cache
+
+    shared = get_embedding_cache("test-model")
+    private = get_embedding_cache("test-model", str(tmp_path / "user"))
+    assert private is not shared and private.dir.startswith(str(tmp_path / "user"))
+    assert get_embedding_cache("test-model", str(tmp_path / "user")) is private
+    close_embedding_caches(str(tmp_path / "user"))
+    assert get_embedding_cache("test-model", str(tmp_path / "user")) is not private
+    assert get_embedding_cache("test-model") is shared
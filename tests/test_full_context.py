@@ -0,0 +1,81 @@
+from context_builder import ContextBuilder
+from full_context import FullContextCache
+
+
+class FakeStore:
+    def __init__(self, persist_dir, texts):
+        self.persist_dir = persist_dir
+        self.index = object()
+        self.texts = list(texts)
+        self.version = "v1"
+        self.reads = 0
+
+    def all_chunks(self, max_chars=None):
+        self.reads += 1
+        if max_chars is not None and sum(map(len, self.texts)) > max_chars:
+            return None
+        return [{"text": text, "source": "cv.md", "page": 0, "start_index": 100 * i} for i, text in enumerate(self.texts)]
+
+
+def cache(budget=20):
+    builder = ContextBuilder(token_budget=budget, token_counter=lambda text: len(text.split()))
+    return FullContextCache(builder, token_budget=budget, max_entries=2)
+
+
+def test_small_store_is_answered_from_its_whole_corpus():
+    store = FakeStore("a", ["Chetan builds robots.", "He uses ROS2 and lidar."])
+    contexts = cache()
+    full = contexts.get(store)
+    assert full.text == contexts.builder.separator.join(store.texts)
+    assert full.version == "v1" and full.stats["tokens_packed"] <= 20
+    prefix = full.prefix("You are Chetan.")
+    assert prefix.startswith("You are Chetan.\n\nCONTEXT:\n") and full.text in prefix
+    assert full.prefix("You are Chetan.") is prefix
+
+
+def test_entries_are_reused_until_the_store_changes():
+    contexts, store = cache(), FakeStore("a", ["Short text."])
+    first = contexts.get(store)
+    assert contexts.get(store) is first and store.reads == 1
+    store.texts.append("A new chunk.")
+    store.version = "v2"
+    second = contexts.get(store)
+    assert second is not first and "A new chunk." in second.text and store.reads == 2
+
+
+def test_a_store_that_grows_past_the_budget_falls_back_to_retrieval():
+    contexts, store = cache(budget=10), FakeStore("a", ["one two three"])
+    assert contexts.get(store) is not None
+    store.texts.append("four five six seven eight nine ten eleven")
+    store.version = "v2"
+    assert contexts.get(store) is None
+    # "Too large" is remembered for the version too
+    assert contexts.get(store) is None and store.reads == 2
+    store.texts.pop()
+    store.version = "v3"
+    assert contexts.get(store) is not None
+
+
+def test_text_far_over_the_budget_is_ruled_out_without_tokenizing():
+    counted = []
+    builder = ContextBuilder(token_budget=5, token_counter=lambda text: counted.append(text) or len(text.split()))
+    contexts = FullContextCache(builder, token_budget=5)
+    assert contexts.get(FakeStore("a", ["x" * 1000])) is None
+    assert counted == []
+
+
+def test_empty_stores_and_a_zero_budget_use_retrieval():
+    store = FakeStore("a", ["text"])
+    assert cache(budget=0).get(store) is None
+    store.index = None
+    assert cache().get(store) is None and store.reads == 0
+
+
+def test_least_recently_used_stores_are_forgotten():
+    contexts = cache()
+    stores = [FakeStore(name, ["text"]) for name in "abc"]
+    for store in stores:
+        contexts.get(store)
+    assert len(contexts) == 2
+    contexts.get(stores[0])
+    assert stores[0].reads == 2 and stores[2].reads == 1
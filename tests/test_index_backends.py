@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from index_factory import IndexConfig
+from vector_database import FaissVectorStore
+
+N, DIM = 2000, 32
+
+# (backend, storage): every index layout build_index can produce
+LAYOUTS = [
+    ("flat", "float32"), ("flat", "float16"), ("flat", "int8"),
+    ("hnsw", "float32"), ("hnsw", "int8"),
+    ("ivf", "float32"), ("ivf", "float16"), ("ivf", "int8"),
+    ("ivfpq", "float32"),
+]
+
+
+def corpus(seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((N, DIM)).astype("float32")
+    ids = np.random.default_rng(seed + 1).choice(2 ** 40, N, replace=False).astype("int64")
+    return vectors, ids
+
+
+def store_for(tmp_path, backend, storage, metric="cosine"):
+    # pq_bits=4: 8-bit codebooks would need ~10k training vectors and fall back to plain IVF
+    config = IndexConfig(backend=backend, storage=storage, metric=metric, pq_bits=4, nprobe=64)
+    store = FaissVectorStore(str(tmp_path / "store"), index_config=config, hybrid=False)
+    vectors, ids = corpus()
+    store.add_embeddings(vectors, [{"text": f"chunk {i}", "source": "s"} for i in range(N)], ids=ids.tolist())
+    return store, vectors, ids
+
+
+def self_hits(store, vectors, ids, k):
+    """Fraction of `vectors` whose own ID is among the top k results, plus every ID returned."""
+    found, returned = 0, set()
+    for vector, cid in zip(vectors, ids):
+        hits = [hit["id"] for hit in store.search(vector[None, :], top_k=k)]
+        returned.update(hits)
+        found += int(cid) in hits
+    return found / len(ids), returned
+
+
+@pytest.mark.parametrize("backend,storage", LAYOUTS)
+def test_search_after_delete_finds_every_remaining_vector(tmp_path, backend, storage):
+    store, vectors, ids = store_for(tmp_path, backend, storage)
+    assert store.index_config.resolved["backend"] == backend
+    doomed = ids[::4]
+    store.delete(doomed.tolist())
+    keep = np.ones(N, dtype=bool)
+    keep[::4] = False
+    assert store.index.ntotal == keep.sum() == len(store.metadata)
+
+    # PQ codes are lossy; everything else must find each vector itself
+    k, expected = (10, 0.9) if backend == "ivfpq" else (1, 1.0)
+    recall, returned = self_hits(store, vectors[keep], ids[keep], k)
+    assert recall >= expected
+    assert returned <= set(ids[keep].tolist())
+
+    # Vectors added after a delete get IDs of their own, not a removed vector's slot
+    extra, extra_ids = corpus(seed=7)
+    store.add_embeddings(extra[:50], [{"text": "new"}] * 50, ids=extra_ids[:50].tolist())
+    recall, _ = self_hits(store, extra[:50], extra_ids[:50], k)
+    assert recall >= expected
+
+
+@pytest.mark.parametrize("backend", ["flat", "ivf"])
+def test_delete_everything_empties_the_index(tmp_path, backend):
+    store, _, ids = store_for(tmp_path, backend, "float32")
+    store.delete(ids.tolist())
+    assert (store.index is None or store.index.ntotal == 0) and len(store.metadata) == 0
+    assert store.search(np.ones((1, DIM), dtype="float32")) == []
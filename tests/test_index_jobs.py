@@ -0,0 +1,88 @@
+import threading
+
+from index_jobs import CANCELLED, DONE, IndexJob, IndexJobQueue
+
+
+def blocking_job(started: threading.Event, release: threading.Event, batches: list):
+    def fn(job):
+        started.set()
+        while not release.wait(0.01):
+            job.check()
+            batches.append(1)
+        return "finished"
+    return fn
+
+
+def test_cancel_stops_a_running_job():
+    jobs = IndexJobQueue(workers=1)
+    started, release, batches = threading.Event(), threading.Event(), []
+    try:
+        job = jobs.submit("s1:doc", "doc.pdf", blocking_job(started, release, batches), group="s1")
+        assert started.wait(5)
+        assert jobs.cancel(job.job_id)
+        assert job.wait(5)
+        assert job.status == CANCELLED
+        # A finished job cannot be cancelled again
+        assert not jobs.cancel(job.job_id)
+    finally:
+        release.set()
+        jobs.close()
+
+
+def test_cancel_before_start():
+    job = IndexJob("s1:doc", "doc.pdf", fn=lambda job: "never runs")
+    job.cancel()
+    job.run()
+    assert job.status == CANCELLED
+    assert job.message == "Cancelled before it started."
+
+
+def test_new_upload_cancels_the_sessions_previous_job():
+    jobs = IndexJobQueue(workers=1)
+    started, release, batches = threading.Event(), threading.Event(), []
+    try:
+        first = jobs.submit("s1:old", "old.pdf", blocking_job(started, release, batches), group="s1")
+        assert started.wait(5)
+        other = jobs.submit("s2:doc", "other.pdf", lambda job: "ok", group="s2")
+        second = jobs.submit("s1:new", "new.pdf", lambda job: "ok", group="s1")
+        assert first.wait(5) and first.status == CANCELLED
+        assert second.wait(5) and second.status == DONE
+        assert other.wait(5) and other.status == DONE
+        assert jobs.latest("s1") is second
+    finally:
+        release.set()
+        jobs.close()
+
+
+def test_duplicate_submission_returns_the_live_job():
+    jobs = IndexJobQueue(workers=1)
+    started, release, batches = threading.Event(), threading.Event(), []
+    try:
+        job = jobs.submit("s1:doc", "doc.pdf", blocking_job(started, release, batches), group="s1")
+        assert jobs.submit("s1:doc", "doc.pdf", lambda job: "ok", group="s1") is job
+        release.set()
+        assert job.wait(5) and job.status == DONE and job.message == "finished"
+    finally:
+        release.set()
+        jobs.close()
+
+
+def test_a_tracked_job_replaces_the_sessions_live_job():
+    jobs = IndexJobQueue(workers=1)
+    started, release, batches = threading.Event(), threading.Event(), []
+    try:
+        running = jobs.submit("s1:new", "new.pdf", blocking_job(started, release, batches), group="s1")
+        assert started.wait(5)
+        switched = IndexJob.completed("s1:old", "old.pdf", "Switched to old.pdf", group="s1")
+        jobs.track(switched)
+        assert running.wait(5) and running.status == CANCELLED
+        assert jobs.latest("s1") is switched and switched.status == DONE
+    finally:
+        release.set()
+        jobs.close()
+
+
+def test_job_ids_are_not_sequential():
+    a, b = IndexJob("k", "a"), IndexJob("k", "b")
+    assert a.job_id != b.job_id
+    assert len(a.job_id) > len("job-") + 16
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_client import HedgedLLM, LLMError, LatencyStats, background_loop
+from stub_groq import DEFAULT_ANSWER, StubGroqServer, StubModel
+
+PRIMARY, FALLBACK = "llama-3.3-70b-versatile", "llama-3.1-8b-instant"
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(primary: StubModel, fallback: StubModel):
+        server = StubGroqServer({PRIMARY: primary, FALLBACK: fallback})
+        servers.append(asyncio.run_coroutine_threadsafe(server.start(), background_loop()).result())
+        return servers[-1]
+
+    clients = []
+
+    def client(server, hedge_after=1.0):
+        llm = HedgedLLM([PRIMARY, FALLBACK], "stub", base_url=server.base_url, hedge_after=hedge_after)
+        clients.append(llm)
+        return llm
+
+    yield start, client
+    for llm in clients:
+        llm.close()  # the stub waits for keep-alive connections to close
+    for server in servers:
+        asyncio.run_coroutine_threadsafe(server.stop(), background_loop()).result(timeout=10)
+
+
+def answer(llm):
+    start = time.perf_counter()
+    text = "".join(llm.stream("prompt"))
+    return text, time.perf_counter() - start
+
+
+def test_fast_primary_is_not_hedged(stub):
+    start, client = stub
+    server = start(StubModel(ttft=0.02, token_delay=0), StubModel(ttft=0.02, token_delay=0))
+    text, _ = answer(client(server))
+    assert text == DEFAULT_ANSWER
+    assert server.requests == {PRIMARY: 1}
+
+
+def test_slow_primary_is_hedged_with_the_fallback(stub):
+    start, client = stub
+    server = start(StubModel(ttft=2.0, token_delay=0), StubModel(ttft=0.02, token_delay=0))
+    text, elapsed = answer(client(server, hedge_after=0.2))
+    assert text == DEFAULT_ANSWER
+    assert elapsed < 1.5
+    assert server.requests == {PRIMARY: 1, FALLBACK: 1}
+
+
+def test_failed_primary_falls_back_without_waiting_for_the_hedge(stub):
+    start, client = stub
+    server = start(StubModel(ttft=0, fail="error"), StubModel(ttft=0.02, token_delay=0))
+    text, elapsed = answer(client(server, hedge_after=5.0))
+    assert text == DEFAULT_ANSWER
+    assert elapsed < 2.0
+
+
+def test_primary_keeps_its_place_after_a_failure(stub):
+    start, client = stub
+    primary = StubModel(ttft=0, fail="error")
+    server = start(primary, StubModel(ttft=0.02, token_delay=0))
+    llm = client(server)
+    answer(llm)
+    primary.fail = ""
+    text, _ = answer(llm)
+    assert text == DEFAULT_ANSWER
+    assert server.requests == {PRIMARY: 2, FALLBACK: 1}
+
+
+def test_all_models_failing_raises(stub):
+    start, client = stub
+    server = start(StubModel(ttft=0, fail="error"), StubModel(ttft=0, fail="error"))
+    with pytest.raises(LLMError):
+        answer(client(server))
+
+
+def test_hedge_delay_follows_measured_ttft():
+    stats = LatencyStats()
+    assert stats.hedge_delay("m", cap=1.5) == 1.5
+    stats.record_success("m", 0.3)
+    assert stats.hedge_delay("m", cap=1.5) == pytest.approx(0.6)
+    stats.record_success("fast", 0.01)
+    assert stats.hedge_delay("fast", cap=1.5) == 0.25
+    stats.record_failure("m")
+    assert stats.hedge_delay("m", cap=1.5) == 1.5
@@ -0,0 +1,24 @@
+import numpy as np
+
+from query_cache import QueryCache
+
+
+def test_entries_are_isolated_by_namespace():
+    cache = QueryCache()
+    emb = np.ones(8, dtype="float32")
+    cache.put("What is in the file?", "document", "unsaved+1:full", "Alice's answer", embedding=emb,
+              namespace="faiss_user/alice/doc")
+    # Same question, same mode, same (unsaved) index version, different store
+    assert cache.get_exact("What is in the file?", "document", "unsaved+1:full", namespace="faiss_user/bob/doc") is None
+    assert cache.get_similar(emb, "document", "unsaved+1:full", namespace="faiss_user/bob/doc") is None
+    assert cache.get_exact("what is in the  file", "document", "unsaved+1:full",
+                           namespace="faiss_user/alice/doc") == "Alice's answer"
+
+
+def test_invalidate_by_namespace():
+    cache = QueryCache()
+    for namespace in ("a", "b"):
+        cache.put("q", "document", "v1", f"answer {namespace}", namespace=namespace)
+    cache.invalidate(namespace="a")
+    assert cache.get_exact("q", "document", "v1", namespace="a") is None
+    assert cache.get_exact("q", "document", "v1", namespace="b") == "answer b"
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from index_jobs import IndexJob, IndexJobQueue
+from server import RAGServer
+
+
+class FakeEngine:
+    """Streams a fixed answer; with `gate`, each answer waits for it before its first token."""
+
+    def __init__(self, tokens=("Hello", ", ", "world"), gate: threading.Event = None):
+        self.tokens = tokens
+        self.gate = gate
+        self.calls, self.closed, self.uploads = [], [], []
+        self.index_jobs = IndexJobQueue(workers=1)
+        self.boot_timings = {}
+
+    def search_and_answer(self, query, top_k=6, mode="profile", session_id="default", doc_id=None):
+        self.calls.append({"query": query, "top_k": top_k, "mode": mode, "session_id": session_id, "doc_id": doc_id})
+        try:
+            if self.gate is not None:
+                assert self.gate.wait(10)
+            yield from self.tokens
+        finally:
+            self.closed.append(query)
+
+    def submit_upload(self, path, session_id, name=None, delete_after=False):
+        with open(path, "rb") as f:
+            self.uploads.append((session_id, name, f.read(), delete_after))
+        os.remove(path)
+        job = IndexJob.completed(f"{session_id}:x", name, f"Indexed {name}")
+        self.index_jobs.track(job)
+        return job
+
+
+def server_for(engine, **kwargs) -> RAGServer:
+    server = RAGServer(engine_factory=lambda: engine, **kwargs)
+    server.engine = engine
+    return server
+
+
+async def call(app, method, path, body=b"", query_string=b"", disconnect: asyncio.Event = None):
+    """Drive one ASGI request; returns (status, headers, body, messages sent)."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string, "headers": []}
+    received = False
+    sent = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await (disconnect.wait() if disconnect else asyncio.Event().wait())
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:]), sent
+
+
+def events(body: bytes):
+    out = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        event, data = block.split("\n")
+        out.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+def query(app, **payload):
+    return call(app, "POST", "/query", json.dumps(payload).encode("utf-8"))
+
+
+def test_answers_stream_as_server_sent_events():
+    engine = FakeEngine()
+    status, headers, body, sent = asyncio.run(query(server_for(engine), query="hi", top_k=500))
+    assert status == 200 and headers[b"content-type"].startswith(b"text/event-stream")
+    received = events(body)
+    assert [data["text"] for event, data in received if event == "token"] == ["Hello", ", ", "world"]
+    assert received[-1][0] == "done" and "ttft_ms" in received[-1][1]
+    # One body message per token: nothing is buffered until the answer ends
+    assert len(sent) == 1 + 3 + 1
+    assert engine.calls == [{"query": "hi", "top_k": 50, "mode": "profile", "session_id": "default", "doc_id": None}]
+
+
+@pytest.mark.parametrize("payload,error", [
+    ({}, "'query' is required"),
+    ({"query": "hi", "mode": "other"}, "'mode' must be"),
+    ({"query": "hi", "top_k": "5"}, "'top_k' must be an integer"),
+    ({"query": "hi", "top_k": True}, "'top_k' must be an integer"),
+    ({"query": "hi", "mode": "document"}, "'session_id' is required"),
+    ({"query": "hi", "mode": "document", "session_id": "../etc"}, "'session_id' must be"),
+    ({"query": "hi", "doc_id": 3}, "'doc_id' must be a string"),
+])
+def test_invalid_queries_are_rejected(payload, error):
+    engine = FakeEngine()
+    status, _, body, _ = asyncio.run(query(server_for(engine), **payload))
+    assert status == 400 and error in json.loads(body)["error"]
+    assert engine.calls == []
+
+
+def test_overload_is_shed_with_retry_after():
+    gate = threading.Event()
+    engine = FakeEngine(gate=gate)
+    server = server_for(engine, max_concurrent=1, max_queued=1, queue_timeout=10)
+
+    async def scenario():
+        running = asyncio.create_task(query(server, query="first"))
+        while server.active < 1:
+            await asyncio.sleep(0.01)
+        queued = asyncio.create_task(query(server, query="second"))
+        while server.waiting < 1:
+            await asyncio.sleep(0.01)
+        # Both the slot and the queue are full: rejected at once, not after the queue timeout
+        shed = await asyncio.wait_for(query(server, query="third"), 2)
+        gate.set()
+        return await running, await queued, shed
+
+    running, queued, shed = asyncio.run(scenario())
+    assert running[0] == queued[0] == 200
+    assert shed[0] == 503 and shed[1][b"retry-after"] == b"1"
+    assert [call["query"] for call in engine.calls] == ["first", "second"]
+    assert server.rejected == 1 and server.active == server.waiting == 0
+
+
+def test_queued_queries_give_up_after_the_queue_timeout():
+    gate = threading.Event()
+    engine = FakeEngine(gate=gate)
+    server = server_for(engine, max_concurrent=1, max_queued=4, queue_timeout=0.1)
+
+    async def scenario():
+        running = asyncio.create_task(query(server, query="first"))
+        while server.active < 1:
+            await asyncio.sleep(0.01)
+        timed_out = await query(server, query="second")
+        gate.set()
+        return await running, timed_out
+
+    running, timed_out = asyncio.run(scenario())
+    assert running[0] == 200 and timed_out[0] == 503
+
+
+def test_client_disconnect_closes_the_answer_stream():
+    gate = threading.Event()
+    engine = FakeEngine(tokens=["token"] * 1000, gate=gate)
+    server = server_for(engine)
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        task = asyncio.create_task(call(server, "POST", "/query", b'{"query": "hi"}', disconnect=disconnect))
+        while not engine.calls:
+            await asyncio.sleep(0.01)
+        # The client leaves while the first token is being generated
+        disconnect.set()
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await task
+
+    _, _, body, _ = asyncio.run(scenario())
+    assert [event for event, _ in events(body)] == ["token"]
+    assert engine.closed == ["hi"]
+
+
+def test_requests_wait_for_the_engine():
+    server = RAGServer(engine_factory=FakeEngine)
+    status, headers, _, _ = asyncio.run(query(server, query="hi"))
+    assert status == 503 and headers[b"retry-after"] == b"5"
+    status, _, body, _ = asyncio.run(call(server, "GET", "/health"))
+    assert status == 200 and json.loads(body)["status"] == "starting"
+
+
+def test_upload_is_streamed_to_the_engine_and_returns_its_job():
+    engine = FakeEngine()
+    server = server_for(engine, max_upload_mb=1)
+    status, _, body, _ = asyncio.run(call(server, "POST", "/upload", b"file bytes",
+                                          b"session_id=alice&filename=../notes.txt"))
+    job = json.loads(body)
+    assert status == 202 and job["status"] == "done"
+    assert engine.uploads == [("alice", "notes.txt", b"file bytes", True)]
+    status, _, body, _ = asyncio.run(call(server, "GET", f"/jobs/{job['job_id']}"))
+    assert status == 200 and json.loads(body)["job_id"] == job["job_id"]
+
+    status, _, _, _ = asyncio.run(call(server, "POST", "/upload", b"x", b"session_id=alice&filename=run.exe"))
+    assert status == 400
+    status, _, _, _ = asyncio.run(call(server, "POST", "/upload", b"x" * (2 << 20), b"session_id=alice&filename=a.txt"))
+    assert status == 413
+    assert len(engine.uploads) == 1
+    status, _, _, _ = asyncio.run(call(server, "GET", "/jobs/job-unknown"))
+    assert status == 404
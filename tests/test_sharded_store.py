@@ -0,0 +1,130 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from index_factory import IndexConfig
+from sharded_store import ShardedVectorStore
+from vector_database import FaissVectorStore
+
+N, DIM, SHARDS = 600, 16, 3
+WORDS = ["lidar", "jetson", "yield", "faiss", "ros2", "yolov8"]
+
+
+def corpus(seed=0, n=N):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, DIM)).astype("float32")
+    ids = rng.choice(2 ** 40, n, replace=False).astype("int64").tolist()
+    metadatas = [{"text": f"chunk {i} about {WORDS[i % len(WORDS)]}", "source": f"doc{i % 7}.md"} for i in range(n)]
+    return vectors, ids, metadatas
+
+
+def sharded(path, **kwargs):
+    config = IndexConfig(backend="flat")
+    return ShardedVectorStore(str(path), shards=SHARDS, index_config=config, threads_per_shard=1, **kwargs)
+
+
+def hit_ids(hits):
+    return [hit["id"] for hit in hits]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    vectors, ids, metadatas = corpus()
+    single = FaissVectorStore(str(tmp_path / "single"), index_config=IndexConfig(backend="flat"))
+    single.add_embeddings(vectors, metadatas, ids=ids)
+    store = sharded(tmp_path / "sharded")
+    store.add_embeddings(vectors[:400], metadatas[:400], ids[:400])
+    store.add_embeddings(vectors[350:], metadatas[350:], ids[350:])  # overlapping rows are skipped
+    yield store, single, vectors, ids
+    store.close()
+
+
+def test_chunks_are_routed_by_hash_and_searched_across_shards(stores):
+    store, single, vectors, ids = stores
+    assert len(store) == N
+    assert all(store.routes[cid] == cid % SHARDS for cid in ids)
+    assert [s["chunks"] for s in store.stats()] == [sum(cid % SHARDS == p for cid in ids) for p in range(SHARDS)]
+
+    queries = np.random.default_rng(5).standard_normal((5, DIM)).astype("float32")
+    for q in queries:
+        q = q[None, :]
+        assert hit_ids(store.search(q, top_k=10)) == hit_ids(single.search(q, top_k=10))
+        dense = single.query("lidar", top_k=8, query_embedding=q, hybrid=False)
+        assert hit_ids(store.query("lidar", top_k=8, query_embedding=q, hybrid=False)) == hit_ids(dense)
+        # BM25 statistics are per shard, so fused ranks can differ from one store's; the best
+        # dense hit and the lexical matches still make it in
+        fused = store.query("lidar", top_k=8, query_embedding=q, hybrid=True)
+        assert len(fused) == 8 and dense[0]["id"] in hit_ids(fused)
+        assert any("lidar" in hit["metadata"]["text"] for hit in fused)
+
+    allowed = np.asarray(ids[::5], dtype="int64")
+    hits = store.search(queries[:1], top_k=10, allowed_ids=allowed)
+    assert hit_ids(hits) == hit_ids(single.search(queries[:1], top_k=10, allowed_ids=allowed))
+
+
+def test_deletes_follow_the_routes_and_survive_a_restart(stores, tmp_path):
+    store, _, vectors, ids = stores
+    doomed = ids[:100]
+    store.delete(doomed)
+    assert len(store) == N - 100 and sum(s["chunks"] for s in store.stats()) == N - 100
+    store.save()
+    before = hit_ids(store.search(vectors[200:201], top_k=5))
+    store.close()
+
+    reopened = sharded(tmp_path / "sharded")
+    try:
+        assert reopened.routes == {cid: cid % SHARDS for cid in ids[100:]}
+        assert hit_ids(reopened.search(vectors[200:201], top_k=5)) == before
+        assert not set(hit_ids(reopened.search(vectors[:1], top_k=20))) & set(doomed)
+    finally:
+        reopened.close()
+
+
+def test_new_shards_take_new_chunks(stores):
+    store, _, _, _ = stores
+    assert store.add_shard() == SHARDS
+    vectors, ids, metadatas = corpus(seed=9, n=40)
+    store.add_embeddings(vectors, metadatas, ids)
+    assert {store.routes[cid] for cid in ids} == set(range(SHARDS + 1))
+    assert store.stats()[SHARDS]["chunks"] == sum(cid % (SHARDS + 1) == SHARDS for cid in ids)
+    assert hit_ids(store.search(vectors[:1], top_k=1)) == [ids[0]]
+
+
+def test_round_robin_fills_shards_evenly(tmp_path):
+    vectors, ids, metadatas = corpus(n=90)
+    store = sharded(tmp_path / "rr", placement="round_robin")
+    try:
+        store.add_embeddings(vectors, metadatas, ids)
+        assert [s["chunks"] for s in store.stats()] == [30, 30, 30]
+    finally:
+        store.close()
+
+
+def test_rebuilding_a_shard_keeps_it_answering(stores):
+    store, _, vectors, ids = stores
+    old_name = store.shard_names[1]
+    expected = [hit_ids(store.search(v[None, :], top_k=1)) for v in vectors[:50]]
+    errors, stop = [], threading.Event()
+
+    def keep_searching():
+        while not stop.is_set():
+            try:
+                store.search(vectors[:1], top_k=3)
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+
+    reader = threading.Thread(target=keep_searching)
+    reader.start()
+    try:
+        store.rebuild_shard(1, backend="hnsw")
+    finally:
+        stop.set()
+        reader.join()
+    assert errors == []
+    assert store.shard_names[1] != old_name
+    assert not os.path.exists(os.path.join(store.persist_dir, old_name))
+    assert store.stats()[1]["index"].startswith("HNSW")
+    assert [hit_ids(store.search(v[None, :], top_k=1)) for v in vectors[:50]] == expected
+    assert len(store) == N
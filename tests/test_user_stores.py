@@ -0,0 +1,140 @@
+import os
+import time
+
+import pytest
+
+import user_stores
+from user_stores import UserStoreManager
+
+
+def stale_dir(base, name, age=3600):
+    path = os.path.join(base, name)
+    os.makedirs(os.path.join(path, "doc"), exist_ok=True)
+    with open(os.path.join(path, "doc", "faiss.index"), "wb") as f:
+        f.write(b"x" * 1024)
+    past = time.time() - age
+    os.utime(path, (past, past))
+    return path
+
+
+def test_least_recently_used_sessions_are_evicted(tmp_path):
+    manager = UserStoreManager(str(tmp_path), max_sessions=2, idle_ttl=None)
+    for session_id in ("a", "b", "a", "c"):
+        manager.get_session(session_id)
+    assert list(manager._sessions) == ["a", "c"]
+
+
+def test_idle_sessions_are_dropped(tmp_path):
+    manager = UserStoreManager(str(tmp_path), idle_ttl=0.05)
+    manager.get_session("a")
+    time.sleep(0.1)
+    manager.get_session("b")
+    assert list(manager._sessions) == ["b"]
+
+
+def test_garbage_collection_keeps_live_and_busy_sessions(tmp_path):
+    base = str(tmp_path)
+    manager = UserStoreManager(base, disk_ttl=60, gc_interval=3600)
+    old = stale_dir(base, "old")
+    fresh = stale_dir(base, "fresh", age=0)
+    busy = stale_dir(base, "busy")
+    active = stale_dir(base, "active")
+    manager.get_session("active")  # in memory, though its directory looks stale
+    past = time.time() - 3600
+    os.utime(active, (past, past))
+    with manager.session_lock("busy"):  # an upload is running
+        manager.collect_garbage()
+    assert not os.path.exists(old)
+    assert all(os.path.exists(path) for path in (fresh, busy, active))
+    assert sorted(os.listdir(base)) == ["active", "busy", "fresh"]
+
+
+def test_garbage_collection_keeps_running_in_a_long_lived_process(tmp_path):
+    manager = UserStoreManager(str(tmp_path), disk_ttl=60, gc_interval=0)
+    old = stale_dir(str(tmp_path), "old")
+    manager.get_session("someone")
+    assert not os.path.exists(old)
+
+
+def test_expired_stores_are_deleted_outside_the_manager_lock(tmp_path, monkeypatch):
+    base = str(tmp_path)
+    stale_dir(base, "old")
+    manager = UserStoreManager(base, disk_ttl=None)
+    manager.disk_ttl = 60
+    held = []
+    rmtree = user_stores.shutil.rmtree
+
+    def checked_rmtree(path, *args, **kwargs):
+        held.append(manager._lock.locked())
+        return rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(user_stores.shutil, "rmtree", checked_rmtree)
+    manager.collect_garbage()
+    assert held == [False]
+    assert os.listdir(base) == []
+
+
+def test_unfinished_deletions_are_cleaned_up(tmp_path):
+    leftover = stale_dir(str(tmp_path), ".gc-old-1234abcd", age=0)
+    UserStoreManager(str(tmp_path), disk_ttl=60)
+    assert not os.path.exists(leftover)
+
+
+def test_evicted_sessions_release_their_upload_locks(tmp_path):
+    manager = UserStoreManager(str(tmp_path), max_sessions=1, idle_ttl=None)
+    manager.session_lock("a")
+    manager.get_session("a")
+    manager.get_session("b")
+    assert "a" not in manager._session_locks
+
+
+def test_session_ids_cannot_escape_the_base_dir(tmp_path):
+    manager = UserStoreManager(str(tmp_path))
+    assert manager._session_dir("../../etc") == os.path.join(str(tmp_path), "etc")
+    with pytest.raises(ValueError):
+        manager._session_dir("../")
+
+
+def test_upload_embeddings_are_cached_with_the_session(tmp_path, embedding_model):
+    from langchain_core.documents import Document
+
+    from embedding_backends import cache_name
+    from embedding_cache import get_embedding_cache, text_key
+
+    manager = UserStoreManager(str(tmp_path / "users"), embedding_model, disk_ttl=60, gc_interval=3600)
+    store = manager.begin("alice", "doc", "notes.txt")
+    store.upsert_documents([Document(page_content="A private note.", metadata={"source": "notes.txt", "page": 0})])
+    session_cache = os.path.join(str(tmp_path / "users"), "alice", ".embedding_cache")
+    assert store.embedding_cache_dir == session_cache
+    assert os.listdir(session_cache)
+    shared = get_embedding_cache(cache_name(embedding_model))
+    assert shared is None or shared.lookup([text_key("A private note.")])[1] == [0]
+
+    # Once the session expires, its cached vectors are deleted along with its indexes
+    manager.drop("alice")
+    past = time.time() - 3600
+    os.utime(os.path.join(str(tmp_path / "users"), "alice"), (past, past))
+    manager.collect_garbage()
+    assert not os.path.exists(session_cache)
+
+
+def test_documents_being_indexed_are_not_persisted(tmp_path):
+    manager = UserStoreManager(str(tmp_path), idle_ttl=None)
+    manager.begin("alice", "done", "done.txt")
+    manager.register("alice", "done", "done.txt")
+    manager.begin("alice", "building", "building.txt")
+    assert manager.active_document("alice") == "building"
+    assert not manager.is_indexed("alice", "building")
+    assert not manager.activate("alice", "building")
+
+    # Switching documents saves the manifest; the unfinished upload must not be in it
+    assert manager.activate("alice", "done")
+    manager.drop("alice")
+    assert manager.documents("alice") == {"done": "done.txt"}
+    assert manager.active_document("alice") == "done"
+
+    manager.begin("alice", "building", "building.txt")
+    manager.register("alice", "building", "building.txt")
+    manager.drop("alice")
+    assert manager.documents("alice") == {"done": "done.txt", "building": "building.txt"}
+    assert manager.active_document("alice") == "building"
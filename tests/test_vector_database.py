@@ -0,0 +1,66 @@
+from langchain_core.documents import Document
+
+from vector_database import FaissVectorStore
+
+PARAGRAPHS = [
+    "Chetan built a ROS navigation stack for a warehouse robot with lidar SLAM.",
+    "At Tata Electronics he improved production yield with computer vision inspection.",
+    "He deployed YOLO models on Jetson devices for real-time defect detection.",
+]
+
+
+def doc(paragraphs, source="profile.md"):
+    return Document(page_content="\n\n".join(paragraphs), metadata={"source": source, "page": 0})
+
+
+def texts(store):
+    return sorted(store.metadata[cid]["text"] for cid in store.metadata)
+
+
+def test_incremental_sync_adds_and_removes_only_the_edit(tmp_path, embedding_model):
+    # Small chunks: one per paragraph, so an edited paragraph is exactly one changed chunk
+    store = FaissVectorStore(str(tmp_path / "store"), embedding_model, chunk_size=24, chunk_overlap=0)
+    added, removed = store.sync_documents([doc(PARAGRAPHS)], {"profile.md": "v1"})
+    assert removed == 0 and added == len(store.metadata) == store.index.ntotal
+    before = set(store.metadata)
+
+    # Unchanged input is a no-op
+    assert store.sync_documents([doc(PARAGRAPHS)], {"profile.md": "v1"}) == (0, 0)
+
+    edited = PARAGRAPHS[:2] + ["He now works on retrieval-augmented generation with FAISS."]
+    added, removed = store.sync_documents([doc(edited)], {"profile.md": "v2"})
+    assert 0 < added < len(before) and 0 < removed < len(before)
+    after = set(store.metadata)
+    assert len(before & after) == len(before) - removed
+    assert store.index.ntotal == len(after)
+    assert any("retrieval-augmented" in t for t in texts(store))
+    assert not any("YOLO" in t for t in texts(store))
+    assert store.manifest["sources"]["profile.md"] == "v2"
+
+    # What was saved is what loads back, without re-embedding
+    store.save()
+    reloaded = FaissVectorStore(store.persist_dir, embedding_model)
+    assert reloaded.load()
+    assert texts(reloaded) == texts(store)
+    assert reloaded.index.ntotal == len(after)
+    assert reloaded.version == store.version and not reloaded.unsaved
+
+
+def test_removed_source_drops_its_chunks(tmp_path, embedding_model):
+    store = FaissVectorStore(str(tmp_path / "store"), embedding_model)
+    store.sync_documents([doc(PARAGRAPHS[:1], "a.md"), doc(PARAGRAPHS[1:], "b.md")])
+    added, removed = store.sync_documents([doc(PARAGRAPHS[:1], "a.md")])
+    assert added == 0 and removed > 0
+    assert {store.metadata[cid]["source"] for cid in store.metadata} == {"a.md"}
+
+
+def test_hybrid_hits_carry_the_dense_similarity(tmp_path, embedding_model):
+    store = FaissVectorStore(str(tmp_path / "store"), embedding_model, hybrid=True,
+                             chunk_size=24, chunk_overlap=0)
+    store.upsert_documents([doc(PARAGRAPHS)])
+    query = "YOLO defect detection"
+    query_emb = store.embed_query(query)
+    dense = {hit["id"]: hit["similarity"] for hit in store.query(query, top_k=5, query_embedding=query_emb, hybrid=False)}
+    for hit in store.query(query, top_k=5, query_embedding=query_emb):
+        if hit["similarity"] is not None:
+            assert abs(hit["similarity"] - dense[hit["id"]]) < 1e-5